@@ -110,6 +110,11 @@ async def add_sample_parking_lots():
         print(f"Found {existing_count} existing parking lots")
 
         if existing_count == 0:
+            # Mirror the GeoJSON point into the indexed geo field
+            for lot in sample_lots:
+                lot["location_coordinates"] = lot["coordinates"]
+                lot["longitude"], lot["latitude"] = lot["coordinates"]["coordinates"]
+
             # Insert sample data
             result = await parking_lots_collection.insert_many(sample_lots)
             print(
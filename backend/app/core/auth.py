@@ -2,8 +2,11 @@
 Authentication and security utilities
 """
 
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional, Union
+from functools import partial
+from typing import Optional, Tuple, Union
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import HTTPException, status, Depends
@@ -11,11 +14,25 @@ from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from app.core.config import get_settings
 from app.models.schemas import User, TokenData
 from app.database.connection import get_users_collection
+from app.core.user_cache import user_cache
 
 settings = get_settings()
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+# Secrets and bulky embedded data never enter the principal cache
+PRINCIPAL_PROJECTION = {"hashed_password": 0, "cart": 0}
+# Hashes made with a different cost are flagged by needs_update / verify_and_update
+pwd_context = CryptContext(
+    schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.BCRYPT_ROUNDS)
 security = HTTPBearer()
 
+# bcrypt releases the GIL, so a small thread pool keeps hashing off the event loop
+_password_executor = ThreadPoolExecutor(
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    thread_name_prefix="password-hash"
+)
+_password_slots = asyncio.Semaphore(settings.PASSWORD_HASH_WORKERS)
+_password_metrics = {"in_flight": 0, "queued": 0, "completed": 0, "rejected": 0}
+
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a plain password against its hash"""
@@ -27,6 +44,56 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
+async def _run_password_work(func, *args):
+    """Run a bcrypt call on the password pool, shedding load when backed up"""
+    if _password_metrics["queued"] >= settings.PASSWORD_HASH_MAX_QUEUE:
+        _password_metrics["rejected"] += 1
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Authentication service is busy, please retry shortly",
+            headers={"Retry-After": "1"},
+        )
+
+    _password_metrics["queued"] += 1
+    try:
+        await _password_slots.acquire()
+    finally:
+        _password_metrics["queued"] -= 1
+
+    _password_metrics["in_flight"] += 1
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_password_executor, partial(func, *args))
+    finally:
+        _password_metrics["in_flight"] -= 1
+        _password_metrics["completed"] += 1
+        _password_slots.release()
+
+
+async def hash_password_async(password: str) -> str:
+    """Generate password hash without blocking the event loop"""
+    return await _run_password_work(pwd_context.hash, password)
+
+
+async def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """
+    Verify a password without blocking the event loop.
+    Returns (is_valid, new_hash); new_hash is set when the stored hash
+    uses an outdated cost factor and should be replaced.
+    """
+    return await _run_password_work(
+        pwd_context.verify_and_update, plain_password, hashed_password)
+
+
+def password_hash_stats() -> dict:
+    """Pool saturation and queue depth for monitoring"""
+    return {
+        "workers": settings.PASSWORD_HASH_WORKERS,
+        "bcrypt_rounds": settings.BCRYPT_ROUNDS,
+        **_password_metrics
+    }
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """Create JWT access token"""
     to_encode = data.copy()
@@ -92,22 +159,28 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
     except JWTError:
         raise credentials_exception
 
-    # Get user from database
-    users_collection = get_users_collection()
-    from bson import ObjectId
-    try:
-        user_object_id = ObjectId(token_data.user_id)
-        user = await users_collection.find_one({"_id": user_object_id})
-    except Exception:
-        # Invalid ObjectId format
-        raise credentials_exception
+    # Serve the principal from cache, falling back to the database
+    user = await user_cache.get(token_data.user_id)
 
     if user is None:
-        raise credentials_exception
+        users_collection = get_users_collection()
+        from bson import ObjectId
+        try:
+            user_object_id = ObjectId(token_data.user_id)
+            user = await users_collection.find_one(
+                {"_id": user_object_id}, PRINCIPAL_PROJECTION)
+        except Exception:
+            # Invalid ObjectId format
+            raise credentials_exception
+
+        if user is None:
+            raise credentials_exception
+
+        # Convert ObjectId to string for Pydantic model
+        user["_id"] = str(user["_id"])
+        user = await user_cache.set(token_data.user_id, user)
 
-    # Convert ObjectId to string for Pydantic model
-    user["_id"] = str(user["_id"])
-    return User(**user)
+    return user
 
 
 async def get_current_active_user(current_user: User = Depends(get_current_user)) -> User:
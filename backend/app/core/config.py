@@ -21,6 +21,57 @@ class Settings(BaseSettings):
     # Database settings
     MONGODB_URL: str = "mongodb://localhost:27017"
     DATABASE_NAME: str = "gaadisetgo"
+    # Multi-document transactions need a replica set
+    MONGODB_USE_TRANSACTIONS: bool = False
+
+    # Service center proximity index
+    SERVICE_CENTER_GRID_CELL_DEG: float = 0.1
+    SERVICE_CENTER_INDEX_REFRESH_SECONDS: int = 60
+
+    # Type-ahead suggestion index
+    SUGGEST_INDEX_REFRESH_SECONDS: int = 60
+
+    # List endpoint totals cache
+    PAGINATION_COUNT_CACHE_SECONDS: int = 15
+
+    # Facet count cache (categories / brands)
+    FACET_CACHE_TTL_SECONDS: int = 30
+
+    # Composite dashboard; a slower section is reported as timed out
+    DASHBOARD_SECTION_TIMEOUT_SECONDS: float = 2.0
+
+    # Service center appointment availability
+    CENTER_AVAILABILITY_TTL_SECONDS: int = 30
+
+    # Appointment scheduler; a day's slots must fit a 63-bit mask (>= 23 min)
+    SERVICE_SLOT_MINUTES: int = 30
+    SERVICE_CENTER_DEFAULT_BAYS: int = 4
+    SERVICE_CENTER_DEFAULT_HOURS: str = "09:00-18:00"
+    SERVICE_BOOKING_HORIZON_DAYS: int = 30
+    SERVICE_SCHEDULE_RETENTION_DAYS: int = 30
+
+    # Parking occupancy counters (one document per lot per time slot)
+    PARKING_SLOT_MINUTES: int = 15
+    PARKING_OCCUPANCY_RETENTION_DAYS: int = 7
+    # A booking claims one counter per slot, so its length is capped
+    PARKING_MAX_BOOKING_HOURS: int = 72
+    # Longest window POST /parking/availability accepts
+    PARKING_MAX_WINDOW_HOURS: int = 168
+
+    # Live occupancy push (WebSocket)
+    PARKING_FEED_FLUSH_MS: int = 250
+    PARKING_FEED_TILE_DEG: float = 0.05
+    PARKING_FEED_MAX_TOPICS: int = 200
+    # "memory" pushes only this worker's changes; "redis" fans every
+    # worker's changes out over REDIS_URL pub/sub (needed with >1 worker)
+    PARKING_FEED_BACKEND: str = "memory"
+
+    # Unpaid pending bookings are expired after the hold window; enable
+    # with a payment flow that moves paid bookings out of pending
+    BOOKING_SWEEP_ENABLED: bool = False
+    PENDING_BOOKING_HOLD_MINUTES: int = 15
+    BOOKING_SWEEP_INTERVAL_SECONDS: int = 60
+    BOOKING_SWEEP_BATCH_SIZE: int = 500
 
     # JWT settings
     JWT_SECRET_KEY: str = "your-super-secret-jwt-key-change-in-production"
@@ -40,6 +91,11 @@ class Settings(BaseSettings):
     REDIS_URL: str = "redis://localhost:6379"
     REDIS_PASSWORD: str = ""
 
+    # Authenticated user cache ("memory" or "redis")
+    USER_CACHE_BACKEND: str = "memory"
+    USER_CACHE_TTL_SECONDS: int = 60
+    USER_CACHE_MAX_ENTRIES: int = 10000
+
     # Email settings
     SMTP_HOST: str = "smtp.gmail.com"
     SMTP_PORT: int = 587
@@ -64,6 +120,10 @@ class Settings(BaseSettings):
         "jpg", "jpeg", "png", "pdf", "doc", "docx"]
 
     # Security settings
+    # Changing BCRYPT_ROUNDS rehashes passwords transparently on next login
+    BCRYPT_ROUNDS: int = 12
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_MAX_QUEUE: int = 200
     SECRET_KEY: str = "your-super-secret-key-change-in-production"
     SECURITY_PASSWORD_SALT: str = "your-password-salt"
 
@@ -0,0 +1,153 @@
+"""
+Geographic distance utilities shared by proximity search and ranking
+"""
+
+import math
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+
+# Mean radius of earth in kilometers
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEGREE_LAT = 111.32
+
+
+def calculate_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """
+    Calculate the great circle distance between two points on earth (specified in decimal degrees)
+    Returns distance in kilometers
+    """
+    # Convert decimal degrees to radians
+    lat1, lon1, lat2, lon2 = map(math.radians, [lat1, lon1, lat2, lon2])
+
+    # Haversine formula
+    dlat = lat2 - lat1
+    dlon = lon2 - lon1
+    a = math.sin(dlat/2)**2 + math.cos(lat1) * \
+        math.cos(lat2) * math.sin(dlon/2)**2
+    c = 2 * math.asin(math.sqrt(a))
+
+    return c * EARTH_RADIUS_KM
+
+
+def bounding_box(latitude: float, longitude: float, radius_km: float) -> Tuple[float, float, float, float]:
+    """
+    Degree box (min_lat, max_lat, min_lon, max_lon) enclosing a search circle.
+    Longitude bounds may fall outside [-180, 180] near the antimeridian.
+    """
+    lat_delta = radius_km / KM_PER_DEGREE_LAT
+    min_lat = max(-90.0, latitude - lat_delta)
+    max_lat = min(90.0, latitude + lat_delta)
+
+    # Longitude degrees shrink towards the poles; size the box for the
+    # widest latitude it touches.
+    widest_cos = math.cos(math.radians(max(abs(min_lat), abs(max_lat))))
+    if widest_cos < 1e-6:
+        lon_delta = 180.0
+    else:
+        lon_delta = min(180.0, radius_km / (KM_PER_DEGREE_LAT * widest_cos))
+
+    return min_lat, max_lat, longitude - lon_delta, longitude + lon_delta
+
+
+def haversine_many(
+    latitude: float,
+    longitude: float,
+    lat_rad: np.ndarray,
+    lon_rad: np.ndarray,
+    cos_lat: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """
+    Distances in kilometers from one origin (decimal degrees) to N points
+    given as contiguous radian arrays, in a single vectorized pass.
+    """
+    origin_lat = math.radians(latitude)
+    origin_lon = math.radians(longitude)
+
+    if cos_lat is None:
+        cos_lat = np.cos(lat_rad)
+
+    a = np.sin((lat_rad - origin_lat) * 0.5) ** 2 + \
+        math.cos(origin_lat) * cos_lat * \
+        np.sin((lon_rad - origin_lon) * 0.5) ** 2
+    # Guard against rounding pushing a fractionally above 1
+    np.clip(a, 0.0, 1.0, out=a)
+
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+
+class GeoPoints:
+    """Contiguous coordinate arrays for batch distance queries"""
+
+    def __init__(self, latitudes: Sequence[float], longitudes: Sequence[float]):
+        self.lat_deg = np.ascontiguousarray(latitudes, dtype=np.float64)
+        self.lon_deg = np.ascontiguousarray(longitudes, dtype=np.float64)
+        self.lat_rad = np.radians(self.lat_deg)
+        self.lon_rad = np.radians(self.lon_deg)
+        self.cos_lat = np.cos(self.lat_rad)
+
+    def __len__(self) -> int:
+        return len(self.lat_deg)
+
+    def bbox_mask(self, latitude: float, longitude: float, radius_km: float) -> np.ndarray:
+        """Boolean mask of points inside the search circle's bounding box"""
+        min_lat, max_lat, min_lon, max_lon = bounding_box(
+            latitude, longitude, radius_km)
+
+        mask = (self.lat_deg >= min_lat) & (self.lat_deg <= max_lat)
+        if max_lon - min_lon >= 360:
+            return mask
+
+        # Compare longitudes relative to the box start so boxes that cross
+        # the antimeridian stay a single interval.
+        relative_lon = np.mod(self.lon_deg - min_lon, 360.0)
+        return mask & (relative_lon <= max_lon - min_lon)
+
+    def within(
+        self,
+        latitude: float,
+        longitude: float,
+        radius_km: float,
+        candidates: Optional[np.ndarray] = None,
+        prefilter: bool = True
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Indices and distances of points within radius_km of the origin.
+        `candidates` restricts the search to a subset of point indices; the
+        bounding-box prefilter skips trig work for points clearly outside.
+        """
+        if candidates is None:
+            candidates = np.arange(len(self))
+
+        if prefilter and len(candidates):
+            in_box = self.bbox_mask(latitude, longitude, radius_km)
+            candidates = candidates[in_box[candidates]]
+
+        distances = haversine_many(
+            latitude, longitude,
+            self.lat_rad[candidates],
+            self.lon_rad[candidates],
+            self.cos_lat[candidates]
+        )
+        keep = distances <= radius_km
+        return candidates[keep], distances[keep]
+
+    def nearest(
+        self,
+        latitude: float,
+        longitude: float,
+        radius_km: float,
+        limit: int,
+        candidates: Optional[np.ndarray] = None,
+        prefilter: bool = True
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Up to `limit` closest points within radius_km, nearest first"""
+        indices, distances = self.within(
+            latitude, longitude, radius_km, candidates, prefilter)
+
+        if len(distances) > limit:
+            top = np.argpartition(distances, limit - 1)[:limit]
+            indices, distances = indices[top], distances[top]
+
+        order = np.argsort(distances, kind="stable")
+        return indices[order], distances[order]
@@ -0,0 +1,153 @@
+"""
+Keyset (cursor) pagination shared by list endpoints
+"""
+
+import base64
+import math
+from typing import Any, List, Optional, Tuple
+
+from bson import json_util
+from fastapi import HTTPException, Response, status
+
+from app.core.cache import TTLCache
+from app.core.config import get_settings
+
+settings = get_settings()
+
+ASCENDING = 1
+DESCENDING = -1
+
+# Totals are expensive on large collections; share them briefly
+count_cache = TTLCache(ttl_seconds=settings.PAGINATION_COUNT_CACHE_SECONDS)
+
+
+def sort_spec(field: str, direction: int) -> List[Tuple[str, int]]:
+    """Sort on a field with _id as the tiebreaker, as keysets require"""
+    if field == "_id":
+        return [("_id", direction)]
+    return [(field, direction), ("_id", direction)]
+
+
+def encode_cursor(doc: dict, sort: List[Tuple[str, int]]) -> str:
+    """Opaque cursor holding the sort key values of the last document"""
+    values = [doc.get(field) for field, _ in sort]
+    payload = json_util.dumps(values).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: List[Tuple[str, int]]) -> List[Any]:
+    """Sort key values from a cursor issued by encode_cursor"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json_util.loads(base64.urlsafe_b64decode(padded.encode()))
+    except Exception:
+        values = None
+
+    if not isinstance(values, list) or len(values) != len(sort):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid pagination cursor"
+        )
+    return values
+
+
+def _after(field: str, direction: int, value: Any) -> List[dict]:
+    """Conditions for documents strictly after value in sort order"""
+    # Missing and null values sort lowest, and $gt/$lt never match them
+    if value is None:
+        return [{field: {"$ne": None}}] if direction == ASCENDING else []
+
+    operator = "$gt" if direction == ASCENDING else "$lt"
+    conditions = [{field: {operator: value}}]
+    if direction == DESCENDING:
+        conditions.append({field: None})
+    return conditions
+
+
+def keyset_filter(sort: List[Tuple[str, int]], values: List[Any]) -> dict:
+    """Filter selecting documents that come after the cursor position"""
+    branches = []
+    for position, (field, direction) in enumerate(sort):
+        equal_prefix = {
+            prior_field: values[index]
+            for index, (prior_field, _) in enumerate(sort[:position])
+        }
+        for condition in _after(field, direction, values[position]):
+            branches.append({**equal_prefix, **condition})
+
+    return {"$or": branches} if branches else {"_id": {"$exists": False}}
+
+
+async def count_items(collection, query: dict, collation: Optional[dict] = None) -> int:
+    """Total matching documents, from an estimate or a short-lived cache"""
+    if not query:
+        return await collection.estimated_document_count()
+
+    key = (collection.name, json_util.dumps([query, collation], sort_keys=True))
+    total = count_cache.get(key)
+    if total is None:
+        options = {"collation": collation} if collation else {}
+        total = await collection.count_documents(query, **options)
+        count_cache.set(key, total)
+    return total
+
+
+async def paginate(
+    collection,
+    query: dict,
+    sort: List[Tuple[str, int]],
+    limit: int,
+    page: int = 1,
+    cursor: Optional[str] = None,
+    include_total: Optional[bool] = None,
+    projection: Optional[dict] = None,
+    collation: Optional[dict] = None
+) -> Tuple[List[dict], dict]:
+    """
+    Fetch one page in either mode and describe it.
+    With a cursor the page starts right after it (no skip); otherwise
+    page/limit offsets are used for backward compatibility. A next_cursor
+    is returned whenever more results follow, so clients can switch modes.
+    Totals default on for page mode and off for cursor mode.
+    """
+    if include_total is None:
+        include_total = cursor is None
+
+    find_query = query
+    if cursor:
+        values = decode_cursor(cursor, sort)
+        find_query = {"$and": [query, keyset_filter(sort, values)]}
+
+    find_cursor = collection.find(find_query, projection).sort(sort)
+    if collation:
+        find_cursor = find_cursor.collation(collation)
+    if not cursor:
+        find_cursor = find_cursor.skip((page - 1) * limit)
+
+    # One extra document tells whether another page exists
+    docs = await find_cursor.limit(limit + 1).to_list(length=limit + 1)
+    has_more = len(docs) > limit
+    docs = docs[:limit]
+
+    pagination = {
+        "current_page": None if cursor else page,
+        "items_per_page": limit,
+        "next_cursor": encode_cursor(docs[-1], sort) if has_more else None,
+        "has_more": has_more
+    }
+
+    if include_total:
+        total = await count_items(collection, query, collation)
+        pagination["total_items"] = total
+        pagination["total_pages"] = math.ceil(total / limit)
+
+    return docs, pagination
+
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def set_next_cursor(response: Response, pagination: dict):
+    """For endpoints whose body is a bare list: the next cursor goes in a header"""
+    if pagination["next_cursor"]:
+        response.headers[NEXT_CURSOR_HEADER] = pagination["next_cursor"]
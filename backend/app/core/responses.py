@@ -0,0 +1,87 @@
+"""
+Fast JSON responses rendered with orjson
+
+FastJSONResponse is the app's default response class: orjson writes
+datetimes natively and `encode_default` covers the BSON and pydantic
+types Mongo documents carry. EnvelopeRoute lets handlers that return an
+APIResponse skip FastAPI's dump/validate/serialize pass over `data` and
+go straight to orjson; the response_model still documents the route.
+"""
+
+import asyncio
+import functools
+from decimal import Decimal
+from typing import Any, Callable, Optional
+
+import orjson
+from bson import ObjectId
+from bson.decimal128 import Decimal128
+from fastapi.responses import JSONResponse, Response
+from fastapi.routing import APIRoute
+from pydantic import BaseModel
+
+from app.models.schemas import APIResponse
+
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+
+def encode_default(obj: Any) -> Any:
+    """Types orjson does not handle natively"""
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    if isinstance(obj, Decimal128):
+        obj = obj.to_decimal()
+    if isinstance(obj, Decimal):
+        # Strings keep the precision, as pydantic renders them
+        return str(obj)
+    if isinstance(obj, BaseModel):
+        return obj.model_dump(by_alias=True)
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+def dumps(content: Any) -> bytes:
+    return orjson.dumps(content, default=encode_default, option=ORJSON_OPTIONS)
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def envelope_content(envelope: APIResponse) -> dict:
+    """Envelope fields as a dict, leaving `data` as the handler built it"""
+    return {name: getattr(envelope, name) for name in envelope.model_fields}
+
+
+def _render_envelopes(endpoint: Callable, status_code: Optional[int]) -> Callable:
+    @functools.wraps(endpoint)
+    async def wrapper(*args, **kwargs):
+        result = await endpoint(*args, **kwargs)
+        if not isinstance(result, APIResponse):
+            return result
+
+        response = FastJSONResponse(envelope_content(result),
+                                    status_code=status_code or 200)
+        # Carry over headers and status set on an injected Response
+        for value in kwargs.values():
+            if isinstance(value, Response):
+                response.raw_headers.extend(
+                    (key, item) for key, item in value.raw_headers
+                    if key != b"content-length")
+                if value.status_code:
+                    response.status_code = value.status_code
+        return response
+
+    return wrapper
+
+
+class EnvelopeRoute(APIRoute):
+    """APIRoute that renders returned APIResponse envelopes with orjson directly"""
+
+    def __init__(self, path: str, endpoint: Callable, **kwargs):
+        # functools.wraps keeps the signature FastAPI reads dependencies from
+        if asyncio.iscoroutinefunction(endpoint):
+            endpoint = _render_envelopes(endpoint, kwargs.get("status_code"))
+        super().__init__(path, endpoint, **kwargs)
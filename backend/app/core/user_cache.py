@@ -0,0 +1,130 @@
+"""
+Authenticated user (principal) cache used by get_current_user
+"""
+
+import json
+import logging
+from typing import Optional
+
+from app.core.cache import TTLCache
+from app.core.config import get_settings
+from app.models.schemas import User
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+class MemoryUserCache:
+    """Per-process LRU cache with a TTL, holding validated User models"""
+
+    backend = "memory"
+
+    def __init__(self, ttl_seconds: int, max_entries: int):
+        self._cache = TTLCache(ttl_seconds=ttl_seconds, max_entries=max_entries)
+
+    async def get(self, user_id: str) -> Optional[User]:
+        return self._cache.get(user_id)
+
+    async def set(self, user_id: str, user_doc: dict) -> User:
+        user = User(**user_doc)
+        self._cache.set(user_id, user)
+        return user
+
+    async def delete(self, user_id: str):
+        self._cache.delete(user_id)
+
+    def stats(self) -> dict:
+        return {"backend": self.backend, **self._cache.stats()}
+
+
+class RedisUserCache:
+    """Cache shared by every worker, so invalidations apply everywhere"""
+
+    backend = "redis"
+
+    def __init__(self, url: str, password: str, ttl_seconds: int):
+        import redis.asyncio as redis
+
+        self._client = redis.from_url(
+            url, password=password or None, decode_responses=True)
+        self._ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    @staticmethod
+    def _key(user_id: str) -> str:
+        return f"user:principal:{user_id}"
+
+    async def get(self, user_id: str) -> Optional[User]:
+        try:
+            payload = await self._client.get(self._key(user_id))
+        except Exception as e:
+            # Fall back to the database rather than failing the request
+            self.errors += 1
+            logger.warning(f"User cache read failed: {e}")
+            payload = None
+
+        if payload is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return User(**json.loads(payload))
+
+    async def set(self, user_id: str, user_doc: dict) -> User:
+        try:
+            await self._client.set(
+                self._key(user_id),
+                json.dumps(user_doc, default=str),
+                ex=self._ttl_seconds
+            )
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"User cache write failed: {e}")
+
+        return User(**user_doc)
+
+    async def delete(self, user_id: str):
+        try:
+            await self._client.delete(self._key(user_id))
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"User cache invalidation failed: {e}")
+
+    def stats(self) -> dict:
+        return {
+            "backend": self.backend,
+            "hits": self.hits,
+            "misses": self.misses,
+            "errors": self.errors
+        }
+
+
+def _build_user_cache():
+    if settings.USER_CACHE_BACKEND == "redis":
+        return RedisUserCache(
+            settings.REDIS_URL,
+            settings.REDIS_PASSWORD,
+            settings.USER_CACHE_TTL_SECONDS
+        )
+    return MemoryUserCache(
+        settings.USER_CACHE_TTL_SECONDS,
+        settings.USER_CACHE_MAX_ENTRIES
+    )
+
+
+user_cache = _build_user_cache()
+
+
+async def invalidate_user(user_id: str):
+    """
+    Drop a cached principal. Call after any change to the user document
+    that affects authorization or the profile (updates, deactivation, roles).
+    """
+    await user_cache.delete(str(user_id))
+
+
+def user_cache_stats() -> dict:
+    """Hit/miss counters for monitoring"""
+    return user_cache.stats()
@@ -4,6 +4,14 @@ Database connection and initialization
 
 from motor.motor_asyncio import AsyncIOMotorClient
 from app.core.config import get_settings
+from app.database.indexes import (
+    CONFLICTING_INDEXES,
+    build_indexes_in_background,
+    drop_indexes,
+    ensure_indexes
+)
+from contextlib import asynccontextmanager
+import asyncio
 import logging
 
 settings = get_settings()
@@ -12,11 +20,12 @@ logger = logging.getLogger(__name__)
 # Global database client
 client: AsyncIOMotorClient = None
 database = None
+index_build_task: asyncio.Task = None
 
 
 async def init_db():
     """Initialize database connection"""
-    global client, database
+    global client, database, index_build_task
     try:
         client = AsyncIOMotorClient(settings.MONGODB_URL)
         database = client[settings.DATABASE_NAME]
@@ -25,8 +34,15 @@ async def init_db():
         await client.admin.command('ping')
         logger.info("Successfully connected to MongoDB")
 
-        # Create indexes
-        await create_indexes()
+        # Backfill GeoJSON locations before building geo indexes
+        await backfill_parking_lot_locations()
+
+        # Constraint, geo and text indexes must exist before serving;
+        # the rest are built in the background
+        await drop_indexes(database, CONFLICTING_INDEXES)
+        await ensure_indexes(database, required=True)
+        index_build_task = asyncio.create_task(
+            build_indexes_in_background(database))
 
     except Exception as e:
         logger.error(f"Failed to connect to MongoDB: {e}")
@@ -36,6 +52,8 @@ async def init_db():
 async def close_db():
     """Close database connection"""
     global client
+    if index_build_task and not index_build_task.done():
+        index_build_task.cancel()
     if client:
         client.close()
         logger.info("Database connection closed")
@@ -46,57 +64,73 @@ async def get_database():
     return database
 
 
-async def create_indexes():
-    """Create database indexes for optimal performance"""
-    try:
-        # User collection indexes
-        await database.users.create_index("email", unique=True)
-        await database.users.create_index("phone")
-
-        # Vehicle collection indexes
-        await database.vehicles.create_index("user_id")
-        await database.vehicles.create_index("registration_number", unique=True)
-
-        # Parking collection indexes
-        await database.parking_lots.create_index([("latitude", "2dsphere"), ("longitude", "2dsphere")])
-        await database.parking_bookings.create_index("user_id")
-        await database.parking_bookings.create_index("parking_lot_id")
-        await database.parking_bookings.create_index("start_time")
-
-        # Service collection indexes
-        await database.service_centers.create_index([("latitude", "2dsphere"), ("longitude", "2dsphere")])
-        await database.service_appointments.create_index("user_id")
-        await database.service_appointments.create_index("appointment_date")
-
-        # E-commerce collection indexes
-        await database.products.create_index("category")
-        await database.products.create_index("brand")
-        await database.orders.create_index("user_id")
-        await database.orders.create_index("order_number", unique=True)
-
-        # Challan collection indexes
-        await database.challans.create_index("user_id")
-        await database.challans.create_index("vehicle_id")
-        await database.challans.create_index("challan_number", unique=True)
-
-        # FASTag collection indexes
-        await database.fastags.create_index("user_id")
-        await database.fastags.create_index("tag_id", unique=True)
-        await database.fastag_transactions.create_index("fastag_id")
-
-        # Notification collection indexes
-        await database.notifications.create_index("user_id")
-        await database.notifications.create_index("created_at")
-
-        # Chat collection indexes
-        await database.chat_messages.create_index("user_id")
-        await database.chat_messages.create_index("created_at")
-
-        logger.info("Database indexes created successfully")
-
-    except Exception as e:
-        logger.error(f"Failed to create indexes: {e}")
-        raise e
+async def collection_fingerprint(collection):
+    """
+    Cheap fingerprint that changes whenever documents are added, removed or
+    touched (relies on an updated_at index)
+    """
+    count = await collection.estimated_document_count()
+    latest = await collection.find_one(
+        {}, {"updated_at": 1}, sort=[("updated_at", -1)]
+    )
+    return count, latest.get("updated_at") if latest else None
+
+
+@asynccontextmanager
+async def mongo_transaction():
+    """
+    Yield a session inside a multi-document transaction, or None when
+    transactions are disabled (they require a replica set).
+    """
+    if not settings.MONGODB_USE_TRANSACTIONS:
+        yield None
+        return
+
+    async with await client.start_session() as session:
+        async with session.start_transaction():
+            yield session
+
+
+async def backfill_parking_lot_locations():
+    """Populate the GeoJSON location_coordinates field on parking lots"""
+    lots = database.parking_lots
+
+    # Lots stored with scalar latitude/longitude fields
+    result = await lots.update_many(
+        {
+            "location_coordinates": {"$exists": False},
+            "latitude": {"$type": "number"},
+            "longitude": {"$type": "number"}
+        },
+        [{
+            "$set": {
+                "location_coordinates": {
+                    "type": "Point",
+                    "coordinates": ["$longitude", "$latitude"]
+                }
+            }
+        }]
+    )
+    backfilled = result.modified_count
+
+    # Lots seeded with a GeoJSON "coordinates" point (see add_test_data.py)
+    result = await lots.update_many(
+        {
+            "location_coordinates": {"$exists": False},
+            "coordinates.type": "Point"
+        },
+        [{
+            "$set": {
+                "location_coordinates": "$coordinates",
+                "longitude": {"$arrayElemAt": ["$coordinates.coordinates", 0]},
+                "latitude": {"$arrayElemAt": ["$coordinates.coordinates", 1]}
+            }
+        }]
+    )
+    backfilled += result.modified_count
+
+    if backfilled:
+        logger.info(f"Backfilled location_coordinates on {backfilled} parking lots")
 
 
 # Collection accessors
@@ -120,6 +154,21 @@ def get_parking_bookings_collection():
     return database.parking_bookings
 
 
+def get_parking_occupancy_collection():
+    """Get parking occupancy (slot counter) collection"""
+    return database.parking_occupancy
+
+
+def get_job_leases_collection():
+    """Get background job lease collection"""
+    return database.job_leases
+
+
+def get_job_markers_collection():
+    """Get one-time job marker collection"""
+    return database.job_markers
+
+
 def get_service_centers_collection():
     """Get service centers collection"""
     return database.service_centers
@@ -130,6 +179,11 @@ def get_service_appointments_collection():
     return database.service_appointments
 
 
+def get_service_schedule_collection():
+    """Get service bay schedule (slot bitmap) collection"""
+    return database.service_bay_schedule
+
+
 def get_products_collection():
     """Get products collection"""
     return database.products
@@ -0,0 +1,307 @@
+"""
+Index advisor - explain() each route's canonical queries and aggregations
+against a mongod and report collection scans and in-memory sorts.
+
+Run from the backend directory:
+    python -m app.database.index_advisor [--url mongodb://localhost:27017]
+                                         [--db gaadisetgo] [--ensure-indexes]
+
+Exits with status 1 when any query needs a COLLSCAN or a blocking SORT.
+"""
+
+import argparse
+import asyncio
+import sys
+from datetime import datetime, timedelta
+from typing import Iterator, List, Optional
+
+from bson import ObjectId
+from bson.int64 import Int64
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from app.core.config import get_settings
+from app.database.indexes import ensure_indexes
+from app.models.schemas import BookingStatus, PaymentStatus, ServiceStatus
+from app.routes.parking_routes import nearby_lots_pipeline
+
+settings = get_settings()
+
+# Placeholder values; the planner only cares about the query shape
+_ID = ObjectId()
+_USER = "advisor-user"
+_NOW = datetime.now()
+_SLOT = datetime.combine(_NOW.date(), datetime.min.time())
+_HOLDING = [BookingStatus.PENDING.value, BookingStatus.CONFIRMED.value,
+            BookingStatus.ACTIVE.value]
+
+# (route, collection, filter, sort) in the shape each route sends; lookups
+# by _id alone are left out
+CANONICAL_QUERIES = [
+    (
+        "GET /parking/lots",
+        "parking_lots", {}, [("_id", 1)]
+    ),
+    (
+        "GET /parking/lots/{lot_id} (occupancy now)",
+        "parking_occupancy", {"lot_id": _ID, "slot_start": _SLOT}, None
+    ),
+    (
+        "POST /parking/bookings (slot claim)",
+        "parking_occupancy",
+        {"lot_id": _ID, "slot_start": _SLOT, "count": {"$lt": 100}},
+        None
+    ),
+    (
+        "GET /parking/bookings",
+        "parking_bookings", {"user_id": _ID},
+        [("created_at", -1), ("_id", -1)]
+    ),
+    (
+        "booking sweeper",
+        "parking_bookings",
+        {
+            "status": BookingStatus.PENDING.value,
+            "payment_status": PaymentStatus.PENDING.value,
+            "created_at": {"$lt": _NOW}
+        },
+        [("created_at", 1)]
+    ),
+    (
+        "occupancy rebuild --lot",
+        "parking_bookings",
+        {
+            "parking_lot_id": {"$in": [_ID]},
+            "status": {"$in": _HOLDING + [BookingStatus.COMPLETED.value]},
+            "end_time": {"$gt": _SLOT}
+        },
+        None
+    ),
+    (
+        "GET /vehicles",
+        "vehicles", {"user_id": _ID},
+        [("created_at", -1), ("_id", -1)]
+    ),
+    (
+        "GET /vehicles/{vehicle_id}/history (bookings)",
+        "parking_bookings", {"vehicle_id": _ID}, [("created_at", -1)]
+    ),
+    (
+        "GET /vehicles/{vehicle_id}/history (appointments)",
+        "service_appointments", {"vehicle_id": _ID}, [("created_at", -1)]
+    ),
+    (
+        "GET /services/centers",
+        "service_centers", {},
+        [("rating", -1), ("_id", -1)]
+    ),
+    (
+        "GET /services/centers/{center_id} (availability)",
+        "service_bay_schedule",
+        {"center_id": _ID, "day": {"$gte": _SLOT, "$lt": _SLOT + timedelta(days=7)}},
+        None
+    ),
+    (
+        "POST /services/appointments (bay claim)",
+        "service_bay_schedule",
+        {"center_id": _ID, "day": _SLOT, "bay": 1,
+         "mask": {"$bitsAllClear": Int64(0b1111)}},
+        None
+    ),
+    (
+        "POST /services/appointments (clash check)",
+        "service_appointments",
+        {
+            "user_id": _ID,
+            "appointment_date": {"$gte": _NOW - timedelta(hours=1),
+                                 "$lte": _NOW + timedelta(hours=1)},
+            "status": {"$in": [ServiceStatus.CONFIRMED.value,
+                               ServiceStatus.IN_PROGRESS.value]}
+        },
+        None
+    ),
+    (
+        "GET /services/appointments",
+        "service_appointments", {"user_id": _ID},
+        [("appointment_date", -1), ("_id", -1)]
+    ),
+    (
+        "GET /dashboard (upcoming appointments)",
+        "service_appointments",
+        {"user_id": _ID, "appointment_date": {"$gte": _NOW}},
+        [("appointment_date", 1)]
+    ),
+    (
+        "GET /ecommerce/products",
+        "products",
+        {"is_active": True, "category": "Accessories",
+         "stock_quantity": {"$gt": 0}},
+        # Sort is user selected (name, price, rating); check the filter only
+        None
+    ),
+    (
+        "GET /ecommerce/products?search=",
+        "products",
+        {"is_active": True, "stock_quantity": {"$gt": 0},
+         "$text": {"$search": "brake pad"}},
+        # Relevance ordering is always computed in memory
+        None
+    ),
+    (
+        "GET /ecommerce/orders",
+        "orders", {"user_id": _ID}, [("created_at", -1), ("_id", -1)]
+    ),
+    (
+        "GET /challans",
+        "challans", {"user_id": _USER, "is_paid": False},
+        [("violation_date", -1), ("_id", -1)]
+    ),
+    (
+        "GET /fastag/{fastag_id}/transactions",
+        "fastag_transactions", {"fastag_id": "advisor-tag"},
+        [("created_at", -1), ("_id", -1)]
+    ),
+    (
+        "GET /notifications",
+        "notifications", {"user_id": _USER, "is_read": False},
+        [("created_at", -1), ("_id", -1)]
+    ),
+    (
+        "GET /notifications (unfiltered)",
+        "notifications", {"user_id": _USER},
+        [("created_at", -1), ("_id", -1)]
+    ),
+    (
+        "GET /notifications/unread-count",
+        "notifications", {"user_id": _USER, "is_read": False}, None
+    ),
+]
+
+# (route, collection, pipeline) for the aggregations routes run
+CANONICAL_PIPELINES = [
+    (
+        "GET /parking/lots/nearby",
+        "parking_lots", nearby_lots_pipeline(28.61, 77.21, 5.0, 20)
+    ),
+    (
+        "POST /parking/availability (peak occupancy)",
+        "parking_occupancy",
+        [
+            {"$match": {"lot_id": {"$in": [_ID]},
+                        "slot_start": {"$gte": _SLOT, "$lte": _SLOT + timedelta(hours=2)}}},
+            {"$group": {"_id": "$lot_id", "w0": {"$max": "$count"}}}
+        ]
+    ),
+    (
+        "GET /ecommerce/products/categories",
+        "products",
+        [
+            {"$match": {"is_active": True, "category": {"$ne": None}}},
+            {"$group": {"_id": "$category", "count": {"$sum": 1}}}
+        ]
+    ),
+]
+
+
+def _stages(plan: dict) -> Iterator[dict]:
+    """Every stage of an explain plan tree"""
+    # Slot based execution (MongoDB 7+) nests the classic plan in queryPlan
+    plan = plan.get("queryPlan", plan)
+    yield plan
+    children = list(plan.get("inputStages", []))
+    if "inputStage" in plan:
+        children.append(plan["inputStage"])
+    for child in children:
+        yield from _stages(child)
+
+
+def diagnose(winning_plan: dict) -> List[str]:
+    """Collection scans and blocking sorts in a winning plan"""
+    problems = []
+    for stage in _stages(winning_plan):
+        if stage.get("stage") == "COLLSCAN":
+            problems.append("COLLSCAN")
+        elif stage.get("stage") == "SORT":
+            problems.append("in-memory SORT")
+    return problems
+
+
+def indexes_used(winning_plan: dict) -> List[str]:
+    """Names of the indexes a winning plan scans"""
+    return [
+        stage["indexName"] for stage in _stages(winning_plan)
+        if "indexName" in stage
+    ]
+
+
+async def explain(database, collection: str, query: dict,
+                  sort: Optional[list]) -> dict:
+    """queryPlanner output for a find command"""
+    command = {"find": collection, "filter": query, "limit": 20}
+    if sort:
+        command["sort"] = dict(sort)
+    result = await database.command(
+        {"explain": command, "verbosity": "queryPlanner"})
+    return result["queryPlanner"]["winningPlan"]
+
+
+async def explain_pipeline(database, collection: str, pipeline: list) -> dict:
+    """Winning plan of an aggregation's initial query"""
+    command = {"aggregate": collection, "pipeline": pipeline, "cursor": {}}
+    result = await database.command(
+        {"explain": command, "verbosity": "queryPlanner"})
+    if "queryPlanner" in result:
+        # The whole pipeline was pushed down into the query layer
+        return result["queryPlanner"]["winningPlan"]
+    return result["stages"][0]["$cursor"]["queryPlanner"]["winningPlan"]
+
+
+def report(route: str, collection: str, plan: dict) -> bool:
+    """Print one line for a plan; True when it is flagged"""
+    problems = diagnose(plan)
+    used = ", ".join(indexes_used(plan)) or "-"
+    if problems:
+        print(f"WARN  {route:<48} {collection}: {', '.join(problems)} (indexes: {used})")
+    else:
+        print(f"OK    {route:<48} {collection}: {used}")
+    return bool(problems)
+
+
+async def run(url: str, db_name: str, build: bool) -> int:
+    """Explain every canonical query and print a report"""
+    client = AsyncIOMotorClient(url)
+    database = client[db_name]
+    try:
+        if build:
+            created = await ensure_indexes(database)
+            print(f"Built {len(created)} missing index(es)")
+
+        flagged = 0
+        for route, collection, query, sort in CANONICAL_QUERIES:
+            plan = await explain(database, collection, query, sort)
+            flagged += report(route, collection, plan)
+        for route, collection, pipeline in CANONICAL_PIPELINES:
+            plan = await explain_pipeline(database, collection, pipeline)
+            flagged += report(route, collection, plan)
+
+        checked = len(CANONICAL_QUERIES) + len(CANONICAL_PIPELINES)
+        print(f"\n{checked} queries checked, {flagged} flagged")
+        return 1 if flagged else 0
+    finally:
+        client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Report COLLSCANs and in-memory sorts for canonical route queries")
+    parser.add_argument("--url", default=settings.MONGODB_URL,
+                        help="MongoDB connection string")
+    parser.add_argument("--db", default=settings.DATABASE_NAME,
+                        help="Database name")
+    parser.add_argument("--ensure-indexes", action="store_true",
+                        help="Build missing registry indexes before explaining")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(run(args.url, args.db, args.ensure_indexes)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+"""
+Declarative index registry - the indexes every collection should have
+"""
+
+import logging
+from typing import Dict, List, Optional
+
+from pymongo import ASCENDING, DESCENDING, GEOSPHERE, TEXT, IndexModel
+
+from app.core.config import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+# Compound indexes follow the equality, sort, range order of the queries
+# they serve. List endpoints sort with an _id tiebreaker (see
+# app.core.pagination), so those indexes end with _id to avoid in-memory sorts.
+# Indexes are matched by name: change a definition by giving it a new name.
+INDEXES: Dict[str, List[IndexModel]] = {
+    "users": [
+        IndexModel([("email", ASCENDING)], unique=True),
+        IndexModel([("phone", ASCENDING)]),
+    ],
+    "vehicles": [
+        IndexModel([("registration_number", ASCENDING)], unique=True),
+        # User vehicle list, newest first
+        IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING),
+                    ("_id", DESCENDING)]),
+    ],
+    "parking_lots": [
+        IndexModel([("location_coordinates", GEOSPHERE)]),
+        IndexModel([("updated_at", ASCENDING)]),
+    ],
+    "parking_bookings": [
+        # Occupancy counter rebuilds for a lot
+        IndexModel([("parking_lot_id", ASCENDING), ("status", ASCENDING),
+                    ("start_time", ASCENDING), ("end_time", ASCENDING)]),
+        # User booking list, newest first
+        IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING),
+                    ("_id", DESCENDING)]),
+        # Vehicle history
+        IndexModel([("vehicle_id", ASCENDING), ("created_at", DESCENDING)]),
+        IndexModel([("start_time", ASCENDING)]),
+        # Expiry sweep over stale pending bookings
+        IndexModel([("status", ASCENDING), ("payment_status", ASCENDING),
+                    ("created_at", ASCENDING)]),
+    ],
+    "parking_occupancy": [
+        # One counter per lot and slot; availability reads a slot range
+        IndexModel([("lot_id", ASCENDING), ("slot_start", ASCENDING)],
+                   unique=True),
+        # Past slots are only kept for a while
+        IndexModel([("slot_start", ASCENDING)],
+                   expireAfterSeconds=settings.PARKING_OCCUPANCY_RETENTION_DAYS * 86400),
+    ],
+    "service_centers": [
+        IndexModel([("updated_at", ASCENDING)]),
+        # Case-insensitive exact brand filter (queries pass BRAND_COLLATION)
+        IndexModel([("brand", ASCENDING)], name="brand_ci",
+                   collation={"locale": "en", "strength": 2}),
+        # Service center list, highest rating first
+        IndexModel([("rating", DESCENDING), ("_id", DESCENDING)]),
+    ],
+    "service_appointments": [
+        # User appointment list and clash checks
+        IndexModel([("user_id", ASCENDING), ("appointment_date", DESCENDING),
+                    ("_id", DESCENDING)]),
+        # Vehicle history
+        IndexModel([("vehicle_id", ASCENDING), ("created_at", DESCENDING)]),
+    ],
+    "service_bay_schedule": [
+        # One slot bitmap per center, day and bay
+        IndexModel([("center_id", ASCENDING), ("day", ASCENDING),
+                    ("bay", ASCENDING)], unique=True),
+        # Past days are only kept for a while
+        IndexModel([("day", ASCENDING)],
+                   expireAfterSeconds=settings.SERVICE_SCHEDULE_RETENTION_DAYS * 86400),
+    ],
+    "products": [
+        # Storefront listing and facets: active, optional category, in stock
+        IndexModel([("is_active", ASCENDING), ("category", ASCENDING),
+                    ("stock_quantity", ASCENDING)]),
+        IndexModel([("category", ASCENDING)]),
+        IndexModel([("brand", ASCENDING)]),
+        IndexModel([("name", ASCENDING)]),
+        IndexModel([("updated_at", ASCENDING)]),
+        IndexModel(
+            [
+                ("name", TEXT),
+                ("brand", TEXT),
+                ("category", TEXT),
+                ("description", TEXT)
+            ],
+            weights={"name": 10, "brand": 5, "category": 5, "description": 1},
+            name="product_text_search"
+        ),
+    ],
+    "orders": [
+        IndexModel([("order_number", ASCENDING)], unique=True),
+        # User order list, newest first
+        IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING),
+                    ("_id", DESCENDING)]),
+    ],
+    "challans": [
+        IndexModel([("challan_number", ASCENDING)], unique=True),
+        IndexModel([("vehicle_id", ASCENDING)]),
+        # User challan list, latest violation first
+        IndexModel([("user_id", ASCENDING), ("violation_date", DESCENDING),
+                    ("_id", DESCENDING)]),
+    ],
+    "fastags": [
+        IndexModel([("user_id", ASCENDING)]),
+        IndexModel([("tag_id", ASCENDING)], unique=True),
+    ],
+    "fastag_transactions": [
+        # Transaction history for a tag, newest first
+        IndexModel([("fastag_id", ASCENDING), ("created_at", DESCENDING),
+                    ("_id", DESCENDING)]),
+    ],
+    "notifications": [
+        # Filtered by read state, and the unread count
+        IndexModel([("user_id", ASCENDING), ("is_read", ASCENDING),
+                    ("created_at", DESCENDING), ("_id", DESCENDING)]),
+        # Unfiltered notification list
+        IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING),
+                    ("_id", DESCENDING)]),
+    ],
+    "chat_messages": [
+        IndexModel([("user_id", ASCENDING)]),
+        IndexModel([("created_at", ASCENDING)]),
+    ],
+}
+
+# Legacy indexes that clash with registry indexes and must go before the
+# required ones are built ($geoNear needs a single 2dsphere index)
+CONFLICTING_INDEXES: Dict[str, List[str]] = {
+    "parking_lots": ["latitude_2dsphere_longitude_2dsphere"],
+    "service_centers": ["latitude_2dsphere_longitude_2dsphere"],
+}
+
+# Indexes that earlier releases built and that are now covered by a compound
+# index prefix; dropped only once the replacements exist
+RETIRED_INDEXES: Dict[str, List[str]] = {
+    "vehicles": ["user_id_1"],
+    "parking_bookings": ["user_id_1", "parking_lot_id_1"],
+    "service_appointments": ["user_id_1", "appointment_date_1"],
+    "orders": ["user_id_1"],
+    "challans": ["user_id_1"],
+    "fastag_transactions": ["fastag_id_1"],
+    "notifications": ["user_id_1", "created_at_1"],
+}
+
+
+def index_name(model: IndexModel) -> str:
+    """Name the server will give (or has given) an index"""
+    return model.document["name"]
+
+
+def is_required(model: IndexModel) -> bool:
+    """
+    Indexes that queries or constraints depend on, not just speed:
+    unique keys, geo queries ($geoNear) and $text search fail without them
+    """
+    document = model.document
+    if document.get("unique"):
+        return True
+    return any(kind in (GEOSPHERE, TEXT) for kind in document["key"].values())
+
+
+async def drop_index_if_exists(collection, index_name: str):
+    """Drop a legacy index, ignoring it if it was never built"""
+    indexes = await collection.index_information()
+    if index_name in indexes:
+        await collection.drop_index(index_name)
+        logger.info(f"Dropped legacy index {index_name} on {collection.name}")
+
+
+async def drop_indexes(database, indexes: Dict[str, List[str]]):
+    """Drop the named indexes per collection that still exist"""
+    for collection_name, names in indexes.items():
+        for name in names:
+            await drop_index_if_exists(database[collection_name], name)
+
+
+async def ensure_collection_indexes(collection, models: List[IndexModel]) -> List[str]:
+    """Build the indexes a collection is missing; returns their names"""
+    existing = await collection.index_information()
+    missing = [model for model in models if index_name(model) not in existing]
+    if missing:
+        await collection.create_indexes(missing)
+    return [index_name(model) for model in missing]
+
+
+async def ensure_indexes(database, required: Optional[bool] = None) -> List[str]:
+    """
+    Idempotently build registry indexes: all of them, or only the required
+    (or only the optional) ones. Returns "collection.index" for each new one.
+    """
+    created = []
+    for collection_name, models in INDEXES.items():
+        selected = [
+            model for model in models
+            if required is None or is_required(model) == required
+        ]
+        if not selected:
+            continue
+        names = await ensure_collection_indexes(database[collection_name], selected)
+        created.extend(f"{collection_name}.{name}" for name in names)
+    return created
+
+
+async def build_indexes_in_background(database):
+    """Build the remaining (performance only) indexes without blocking startup"""
+    try:
+        created = await ensure_indexes(database, required=False)
+        if created:
+            logger.info(f"Built indexes: {', '.join(created)}")
+        await drop_indexes(database, RETIRED_INDEXES)
+        logger.info("Database indexes are up to date")
+    except Exception as e:
+        logger.error(f"Failed to build indexes: {e}")
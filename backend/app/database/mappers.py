@@ -0,0 +1,94 @@
+"""
+Document mappers - BSON documents to API dicts, one plan per collection
+
+Each mapper is built once at import time from a plan: the ObjectId fields
+to render as strings, fields to rename (always _id -> id), embedded lists
+mapped with another plan, and internal fields left out of responses. The
+hidden fields double as an exclusion projection so they are never read.
+Mapping touches only the planned fields and reshapes the document in
+place, so list pages are not copied.
+"""
+
+from typing import Dict, Iterable, List, Optional
+
+
+class DocumentMapper:
+    def __init__(
+        self,
+        object_ids: Iterable[str] = (),
+        renames: Optional[Dict[str, str]] = None,
+        nested: Optional[Dict[str, "DocumentMapper"]] = None,
+        hidden: Iterable[str] = ()
+    ):
+        renames = {"_id": "id", **(renames or {})}
+        nested = nested or {}
+        object_ids = ["_id", *object_ids]
+
+        # The plan, split by kind so each step is a tight loop:
+        # ObjectIds stringified in place, then renames, then dropped fields
+        self._object_ids = tuple(field for field in object_ids if field not in renames)
+        self._nested = tuple((field, mapper._map_list) for field, mapper in nested.items())
+        self._renames = tuple(
+            (field, name, str if field in object_ids else None)
+            for field, name in renames.items()
+        )
+        self.hidden = frozenset(hidden)
+
+    @property
+    def projection(self) -> Optional[dict]:
+        """Exclusion projection for the hidden fields, for find() and $project"""
+        return {field: 0 for field in self.hidden} or None
+
+    def map(self, doc: dict) -> dict:
+        """Turn a document into its response shape, in place"""
+        for field in self._object_ids:
+            value = doc.get(field)
+            if value is not None:
+                doc[field] = str(value)
+        for field, map_list in self._nested:
+            items = doc.get(field)
+            if items:
+                doc[field] = map_list(items)
+        for field, name, convert in self._renames:
+            if field in doc:
+                value = doc.pop(field)
+                doc[name] = convert(value) if convert and value is not None else value
+        for field in self.hidden:
+            doc.pop(field, None)
+        return doc
+
+    def map_many(self, docs: List[dict]) -> List[dict]:
+        for doc in docs:
+            self.map(doc)
+        return docs
+
+    def _map_list(self, items):
+        return [self.map(item) if isinstance(item, dict) else item for item in items]
+
+
+parking_lot_mapper = DocumentMapper(hidden=["location_coordinates"])
+parking_booking_mapper = DocumentMapper(
+    object_ids=["user_id", "parking_lot_id", "vehicle_id"],
+    hidden=["sweep_id"]
+)
+vehicle_mapper = DocumentMapper(object_ids=["user_id"])
+service_center_mapper = DocumentMapper()
+service_appointment_mapper = DocumentMapper(
+    object_ids=["user_id", "service_center_id", "vehicle_id"]
+)
+product_mapper = DocumentMapper()
+order_mapper = DocumentMapper(
+    object_ids=["user_id"],
+    nested={"items": DocumentMapper(object_ids=["product_id"])}
+)
+
+# Mappers by collection name, as in the index registry
+MAPPERS: Dict[str, DocumentMapper] = {
+    "parking_lots": parking_lot_mapper,
+    "parking_bookings": parking_booking_mapper,
+    "vehicles": vehicle_mapper,
+    "service_centers": service_center_mapper,
+    "service_appointments": service_appointment_mapper,
+    "products": product_mapper,
+    "orders": order_mapper,
+}
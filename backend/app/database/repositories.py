@@ -0,0 +1,250 @@
+"""
+Repositories - collection access with named projections per view
+
+Each repository pairs a collection with its document mapper and the
+projections of the views that render it:
+    card    list and search results
+    marker  map pins
+    detail  a single record page (everything the mapper does not hide)
+plus narrow views for internal reads such as a center's schedule. Reads
+name a view, so list pages fetch and decode only the fields they show.
+Writes go through `collection` as before.
+"""
+
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from fastapi import HTTPException, status
+
+from app.core.pagination import paginate
+from app.database.connection import (
+    get_orders_collection,
+    get_parking_bookings_collection,
+    get_parking_lots_collection,
+    get_products_collection,
+    get_service_appointments_collection,
+    get_service_centers_collection,
+    get_vehicles_collection
+)
+from app.database.mappers import (
+    DocumentMapper,
+    order_mapper,
+    parking_booking_mapper,
+    parking_lot_mapper,
+    product_mapper,
+    service_appointment_mapper,
+    service_center_mapper,
+    vehicle_mapper
+)
+
+# First image only, for thumbnails
+FIRST_IMAGE = {"$slice": 1}
+
+
+class FieldSelection:
+    """
+    The fields a client asked for with ?fields=, checked against a
+    repository's allow-list. The default selection keeps every field.
+    """
+
+    def __init__(self, names: Optional[Iterable[str]] = None,
+                 projection: Optional[dict] = None):
+        self.names = frozenset(names) if names else None
+        self.projection = projection
+
+    def __contains__(self, name: str) -> bool:
+        return self.names is None or name in self.names
+
+    def trim(self, doc: dict) -> dict:
+        """Drop everything not asked for (the id always stays)"""
+        if self.names is None:
+            return doc
+        return {key: value for key, value in doc.items()
+                if key in self.names or key == "id"}
+
+    def trim_many(self, docs: List[dict]) -> List[dict]:
+        if self.names is None:
+            return docs
+        return [self.trim(doc) for doc in docs]
+
+
+ALL_FIELDS = FieldSelection()
+
+
+class Repository:
+    def __init__(self, accessor: Callable, mapper: DocumentMapper,
+                 views: Optional[Dict[str, dict]] = None,
+                 fields: Optional[Dict[str, Iterable[str]]] = None):
+        self._accessor = accessor
+        self.mapper = mapper
+        self.views: Dict[str, Optional[dict]] = {"detail": mapper.projection, **(views or {})}
+        # ?fields= allow-list: response field -> stored fields it is built from
+        self.fields: Dict[str, Tuple[str, ...]] = {
+            name: tuple(sources) for name, sources in (fields or {}).items()
+        }
+
+    @property
+    def collection(self):
+        return self._accessor()
+
+    def select(self, fields: Optional[str], required: Iterable[str] = ()) -> FieldSelection:
+        """
+        Parse a comma-separated ?fields= value. `required` lists stored
+        fields the route reads itself; they are fetched but not returned.
+        """
+        if not fields:
+            return ALL_FIELDS
+
+        names = [name.strip() for name in fields.split(",") if name.strip()]
+        unknown = sorted(set(names) - set(self.fields))
+        if not names or unknown:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Unknown fields: {', '.join(unknown) or 'none given'}. "
+                       f"Allowed: {', '.join(sorted(self.fields))}"
+            )
+
+        projection = {source: 1 for name in names for source in self.fields[name]}
+        projection.update({field: 1 for field in required})
+        return FieldSelection(names, projection or {"_id": 1})
+
+    def projection(self, view: str, fields: FieldSelection = ALL_FIELDS,
+                   **extra) -> Optional[dict]:
+        """
+        A view's projection, or the client's field selection, optionally
+        with extra fields (e.g. a text score)
+        """
+        if view not in self.views:
+            raise ValueError(f"Unknown view '{view}'")
+        projection = fields.projection if fields.projection is not None else self.views[view]
+        if extra:
+            projection = {**(projection or {}), **extra}
+        return projection
+
+    def stage_projection(self, view: str, fields: FieldSelection = ALL_FIELDS,
+                         **extra) -> Optional[dict]:
+        """The same projection for a $project stage, which takes $slice as [array, n]"""
+        projection = self.projection(view, fields, **extra)
+        if not projection:
+            return projection
+        return {
+            field: {"$slice": [f"${field}", spec["$slice"]]}
+            if isinstance(spec, dict) and "$slice" in spec else spec
+            for field, spec in projection.items()
+        }
+
+    async def find_one(self, query: dict, view: str = "detail",
+                       fields: FieldSelection = ALL_FIELDS) -> Optional[dict]:
+        return await self.collection.find_one(query, self.projection(view, fields))
+
+    async def find_many(self, query: dict, view: str = "card", sort=None,
+                        limit: int = 0, fields: FieldSelection = ALL_FIELDS) -> List[dict]:
+        cursor = self.collection.find(query, self.projection(view, fields))
+        if sort:
+            cursor = cursor.sort(sort)
+        if limit:
+            cursor = cursor.limit(limit)
+        return await cursor.to_list(length=limit or None)
+
+    async def page(self, query: dict, sort, limit: int, view: str = "card",
+                   fields: FieldSelection = ALL_FIELDS,
+                   **options) -> Tuple[List[dict], dict]:
+        """One page of a view; options are passed on to paginate()"""
+        projection = self.projection(view, fields)
+        if fields.projection is not None:
+            # Cursors are built from the sort keys
+            projection = {**projection, **{field: 1 for field, _ in sort}}
+        return await paginate(self.collection, query, sort, limit,
+                              projection=projection, **options)
+
+
+def _stored(*names: str) -> Dict[str, Tuple[str]]:
+    """Allow-list entries for fields returned as stored"""
+    return {name: (name,) for name in names}
+
+
+TIMESTAMPS = ("created_at", "updated_at")
+
+
+parking_lots_repo = Repository(get_parking_lots_collection, parking_lot_mapper, {
+    "card": {
+        "name": 1, "location": 1, "address": 1, "latitude": 1, "longitude": 1,
+        "price_per_hour": 1, "total_capacity": 1, "available_spots": 1,
+        "rating": 1, "features": 1, "images": FIRST_IMAGE
+    },
+    "marker": {
+        "name": 1, "latitude": 1, "longitude": 1, "price_per_hour": 1,
+        "total_capacity": 1
+    },
+    "suggest": {"name": 1, "rating": 1}
+}, fields={
+    **_stored("name", "location", "address", "latitude", "longitude",
+              "price_per_hour", "total_capacity", "available_spots", "rating",
+              "features", "images", "contact_info", *TIMESTAMPS),
+    "current_available_spots": ("total_capacity",),
+    "distance": ()
+})
+
+parking_bookings_repo = Repository(get_parking_bookings_collection, parking_booking_mapper, {
+    "card": {
+        "user_id": 1, "parking_lot_id": 1, "vehicle_id": 1, "spot_number": 1,
+        "start_time": 1, "end_time": 1, "status": 1, "total_amount": 1,
+        "payment_status": 1, "created_at": 1
+    },
+    # What the occupancy counter rebuild reads
+    "occupancy": {
+        "parking_lot_id": 1, "start_time": 1, "end_time": 1, "status": 1,
+        "actual_end_time": 1
+    }
+}, fields={
+    **_stored("user_id", "parking_lot_id", "vehicle_id", "spot_number",
+              "start_time", "end_time", "actual_start_time", "actual_end_time",
+              "status", "total_amount", "final_amount", "payment_status",
+              "payment_id", "expired_at", *TIMESTAMPS),
+    "parking_lot": ("parking_lot_id",),
+    "vehicle": ("vehicle_id",)
+})
+
+service_centers_repo = Repository(get_service_centers_collection, service_center_mapper, {
+    "card": {
+        "name": 1, "brand": 1, "location": 1, "address": 1, "latitude": 1,
+        "longitude": 1, "contact_phone": 1, "services": 1, "rating": 1,
+        "price_range": 1, "images": FIRST_IMAGE
+    },
+    "marker": {"name": 1, "brand": 1, "latitude": 1, "longitude": 1, "rating": 1},
+    # What the bay scheduler reads
+    "schedule": {"opening_hours": 1, "bays": 1},
+    "suggest": {"name": 1, "rating": 1}
+}, fields={
+    **_stored("name", "brand", "location", "address", "latitude", "longitude",
+              "contact_phone", "contact_email", "services", "rating",
+              "price_range", "opening_hours", "bays", "images", *TIMESTAMPS),
+    "availability": ("opening_hours", "bays")
+})
+
+products_repo = Repository(get_products_collection, product_mapper, {
+    "card": {
+        "name": 1, "brand": 1, "category": 1, "price": 1, "original_price": 1,
+        "stock_quantity": 1, "rating": 1, "review_count": 1, "images": FIRST_IMAGE
+    },
+    # What the cart and checkout read
+    "cart": {
+        "name": 1, "price": 1, "stock_quantity": 1, "is_active": 1,
+        "images": FIRST_IMAGE
+    },
+    "suggest": {"name": 1, "brand": 1, "category": 1, "rating": 1, "review_count": 1}
+}, fields={
+    **_stored("name", "description", "brand", "category", "price",
+              "original_price", "stock_quantity", "images", "specifications",
+              "rating", "review_count", *TIMESTAMPS),
+    "discount_percentage": ("price", "original_price"),
+    "stock_status": ("stock_quantity",)
+})
+
+vehicles_repo = Repository(get_vehicles_collection, vehicle_mapper, fields={
+    **_stored("user_id", "brand", "model", "year", "vehicle_type",
+              "registration_number", "color", "fuel_type", *TIMESTAMPS),
+    "age": ("year",)
+})
+service_appointments_repo = Repository(get_service_appointments_collection,
+                                       service_appointment_mapper)
+orders_repo = Repository(get_orders_collection, order_mapper)
@@ -2,15 +2,17 @@
 Database models and schemas using Pydantic
 """
 
-from pydantic import BaseModel, Field, EmailStr
+from pydantic import BaseModel, Field, EmailStr, model_validator
 from typing import Optional, List, Dict, Any
-from datetime import datetime
+from datetime import datetime, timedelta
 from enum import Enum
 from bson import ObjectId
 from pydantic import GetCoreSchemaHandler
 from pydantic_core import core_schema
 from typing import Any
 
+from app.core.config import get_settings
+
 
 class PyObjectId(ObjectId):
 
@@ -61,6 +63,7 @@ class BookingStatus(str, Enum):
     ACTIVE = "active"
     COMPLETED = "completed"
     CANCELLED = "cancelled"
+    EXPIRED = "expired"
 
 
 class PaymentStatus(str, Enum):
@@ -184,6 +187,32 @@ class ParkingBookingCreate(CustomBaseModel):
     end_time: datetime
 
 
+class TimeWindow(CustomBaseModel):
+    start_time: datetime
+    end_time: datetime
+
+    @model_validator(mode="after")
+    def check_length(self):
+        # Availability reads one counter per slot; keep the range bounded
+        max_hours = get_settings().PARKING_MAX_WINDOW_HOURS
+        if self.end_time <= self.start_time:
+            raise ValueError("end_time must be after start_time")
+        if self.end_time - self.start_time > timedelta(hours=max_hours):
+            raise ValueError(f"A window may span at most {max_hours} hours")
+        return self
+
+
+class ParkingAvailabilityQuery(CustomBaseModel):
+    # Either explicit lots or a nearby search
+    lot_ids: Optional[List[str]] = Field(None, max_length=200)
+    latitude: Optional[float] = Field(None, ge=-90, le=90)
+    longitude: Optional[float] = Field(None, ge=-180, le=180)
+    radius: float = Field(5.0, ge=0.1, le=50)
+    limit: int = Field(50, ge=1, le=200)
+    # Defaults to the current moment
+    windows: List[TimeWindow] = Field(default_factory=list, max_length=24)
+
+
 # ----- Service Models -----
 class ServiceCenter(TimestampMixin):
     id: Optional[PyObjectId] = Field(alias="_id")
@@ -199,6 +228,7 @@ class ServiceCenter(TimestampMixin):
     rating: float = 0.0
     price_range: str = "₹₹"
     opening_hours: Dict[str, str] = {}
+    bays: Optional[int] = None
     images: List[str] = []
 
 
@@ -209,6 +239,8 @@ class ServiceAppointment(TimestampMixin):
     vehicle_id: PyObjectId
     service_type: str
     appointment_date: datetime
+    end_time: Optional[datetime] = None
+    bay: Optional[int] = None
     status: ServiceStatus = ServiceStatus.PENDING
     estimated_cost: Optional[float] = None
     actual_cost: Optional[float] = None
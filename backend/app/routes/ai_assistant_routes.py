@@ -5,8 +5,9 @@ AI Assistant routes - Chat, suggestions, and AI-powered features
 from fastapi import APIRouter, HTTPException, status, Depends
 from app.models.schemas import APIResponse, User
 from app.core.auth import get_current_user
+from app.core.responses import EnvelopeRoute
 
-router = APIRouter()
+router = APIRouter(route_class=EnvelopeRoute)
 
 
 @router.get("/health", response_model=APIResponse)
@@ -9,15 +9,16 @@ from app.models.schemas import (
     User, UserCreate, UserLogin, UserInDB, Token, APIResponse
 )
 from app.core.auth import (
-    verify_password, get_password_hash, create_access_token,
+    hash_password_async, verify_and_update_password, create_access_token,
     create_refresh_token, verify_token, security, get_current_user
 )
+from app.core.responses import EnvelopeRoute
 from app.database.connection import get_users_collection
 from app.core.config import get_settings
 import uuid
 from datetime import datetime
 
-router = APIRouter()
+router = APIRouter(route_class=EnvelopeRoute)
 settings = get_settings()
 
 
@@ -39,7 +40,7 @@ async def register_user(user_data: UserCreate):
         )
 
     # Create new user
-    hashed_password = get_password_hash(user_data.password)
+    hashed_password = await hash_password_async(user_data.password)
     user_dict = user_data.dict()
     user_dict.pop("password")
 
@@ -103,7 +104,9 @@ async def login_user(login_data: UserLogin):
         )
 
     # Verify password
-    if not verify_password(login_data.password, user["hashed_password"]):
+    password_valid, new_password_hash = await verify_and_update_password(
+        login_data.password, user["hashed_password"])
+    if not password_valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid credentials"
@@ -127,10 +130,14 @@ async def login_user(login_data: UserLogin):
         data={"sub": str(user["_id"]), "email": user["email"]}
     )
 
-    # Update last login
+    # Update last login, upgrading the hash if the bcrypt cost changed
+    login_update = {"updated_at": datetime.now()}
+    if new_password_hash:
+        login_update["hashed_password"] = new_password_hash
+
     await users_collection.update_one(
         {"_id": user["_id"]},
-        {"$set": {"updated_at": datetime.now()}}
+        {"$set": login_update}
     )
 
     return APIResponse(
@@ -2,26 +2,30 @@
 Challan management routes - Check, Pay, Track challans
 """
 
-from fastapi import APIRouter, HTTPException, status, Depends, Query
+from fastapi import APIRouter, HTTPException, status, Depends, Query, Response
 from typing import List, Optional
 from datetime import datetime
 from app.models.schemas import (
     Challan, User, APIResponse
 )
 from app.core.auth import get_current_active_user
+from app.core.responses import EnvelopeRoute
+from app.core.pagination import paginate, set_next_cursor, sort_spec, DESCENDING
 from app.database.connection import get_challans_collection, get_vehicles_collection
 import uuid
 
-router = APIRouter()
+router = APIRouter(route_class=EnvelopeRoute)
 
 
 @router.get("/", response_model=List[Challan])
 async def get_user_challans(
+    response: Response,
     current_user: User = Depends(get_current_active_user),
     vehicle_id: Optional[str] = Query(None),
     is_paid: Optional[bool] = Query(None),
     page: int = Query(1, ge=1),
-    size: int = Query(20, ge=1, le=100)
+    size: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None
 ):
     """
     ## 📋 Get User Challans
@@ -37,13 +41,13 @@ async def get_user_challans(
     if is_paid is not None:
         query["is_paid"] = is_paid
 
-    # Calculate pagination
-    skip = (page - 1) * size
-
     # Get challans sorted by violation date (newest first)
-    cursor = challans_collection.find(query).sort(
-        "violation_date", -1).skip(skip).limit(size)
-    challans = await cursor.to_list(length=size)
+    challans, pagination = await paginate(
+        challans_collection, query, sort_spec("violation_date", DESCENDING), size,
+        page=page, cursor=cursor, include_total=False
+    )
+
+    set_next_cursor(response, pagination)
 
     return [Challan(**challan) for challan in challans]
 
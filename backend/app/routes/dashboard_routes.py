@@ -0,0 +1,144 @@
+"""
+Dashboard routes - One call for the home and parking dashboards
+
+The sections the dashboards used to fetch one request at a time (lots,
+bookings, vehicles, appointments, unread notifications) are loaded
+concurrently for the one authenticated user. A section that fails or
+runs past its timeout is reported in `errors` and the rest still render;
+`timings_ms` carries how long each section took.
+"""
+
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, Optional
+
+from bson import ObjectId
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+
+from app.core.auth import get_current_user
+from app.core.config import get_settings
+from app.core.pagination import sort_spec, ASCENDING, DESCENDING
+from app.core.responses import EnvelopeRoute
+from app.database.connection import get_notifications_collection
+from app.database.repositories import (
+    parking_bookings_repo,
+    parking_lots_repo,
+    service_appointments_repo,
+    vehicles_repo
+)
+from app.models.schemas import APIResponse, User
+from app.services.loaders import enrich_appointments, enrich_bookings
+
+router = APIRouter(route_class=EnvelopeRoute)
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+async def _parking_lots(user: User, limit: int):
+    lots = await parking_lots_repo.find_many(
+        {}, "card", sort=sort_spec("_id", ASCENDING), limit=limit)
+    return parking_lots_repo.mapper.map_many(lots)
+
+
+async def _bookings(user: User, limit: int):
+    bookings = await parking_bookings_repo.find_many(
+        {"user_id": ObjectId(user.id)}, "card",
+        sort=sort_spec("created_at", DESCENDING), limit=limit)
+    await enrich_bookings(bookings)
+    return parking_bookings_repo.mapper.map_many(bookings)
+
+
+async def _vehicles(user: User, limit: int):
+    vehicles = await vehicles_repo.find_many(
+        {"user_id": ObjectId(user.id)}, "detail",
+        sort=sort_spec("created_at", DESCENDING), limit=limit)
+    return vehicles_repo.mapper.map_many(vehicles)
+
+
+async def _appointments(user: User, limit: int):
+    # Upcoming only, soonest first
+    appointments = await service_appointments_repo.find_many(
+        {"user_id": ObjectId(user.id), "appointment_date": {"$gte": datetime.now()}},
+        "detail", sort=sort_spec("appointment_date", ASCENDING), limit=limit)
+    await enrich_appointments(appointments)
+    return service_appointments_repo.mapper.map_many(appointments)
+
+
+async def _unread_notifications(user: User, limit: int):
+    return await get_notifications_collection().count_documents({
+        "user_id": user.id,
+        "is_read": False
+    })
+
+
+SECTIONS: Dict[str, Callable[[User, int], Awaitable]] = {
+    "parking_lots": _parking_lots,
+    "bookings": _bookings,
+    "vehicles": _vehicles,
+    "appointments": _appointments,
+    "unread_notifications": _unread_notifications,
+}
+
+
+async def _run_section(name: str, load: Awaitable, timeout: float):
+    """Await one section; returns (result, error, elapsed ms) and never raises"""
+    started = time.perf_counter()
+    result, error = None, None
+    try:
+        result = await asyncio.wait_for(load, timeout)
+    except asyncio.TimeoutError:
+        error = f"Timed out after {timeout:g}s"
+    except Exception as e:
+        logger.error(f"Dashboard section {name} failed: {e}")
+        error = "Section unavailable"
+    elapsed_ms = round((time.perf_counter() - started) * 1000, 2)
+    return result, error, elapsed_ms
+
+
+@router.get("", response_model=APIResponse)
+async def get_dashboard(
+    current_user: User = Depends(get_current_user),
+    sections: Optional[str] = Query(
+        None, description="Comma-separated sections; all when omitted"),
+    limit: int = Query(5, ge=1, le=20, description="Items per list section")
+):
+    """
+    ## 📊 Get Dashboard
+
+    Lots, bookings, vehicles, upcoming appointments and the unread
+    notification count in one request, loaded concurrently.
+    """
+    if sections:
+        names = list(dict.fromkeys(
+            name.strip() for name in sections.split(",") if name.strip()))
+        unknown = sorted(set(names) - set(SECTIONS))
+        if not names or unknown:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Unknown sections: {', '.join(unknown) or 'none given'}. "
+                       f"Allowed: {', '.join(SECTIONS)}"
+            )
+    else:
+        names = list(SECTIONS)
+
+    timeout = settings.DASHBOARD_SECTION_TIMEOUT_SECONDS
+    outcomes = await asyncio.gather(*(
+        _run_section(name, SECTIONS[name](current_user, limit), timeout)
+        for name in names
+    ))
+
+    data, errors, timings = {}, {}, {}
+    for name, (result, error, elapsed_ms) in zip(names, outcomes):
+        data[name] = result
+        timings[name] = elapsed_ms
+        if error:
+            errors[name] = error
+
+    return APIResponse(
+        success=True,
+        message="Dashboard retrieved successfully"
+        if not errors else "Dashboard retrieved with some sections unavailable",
+        data={**data, "errors": errors, "timings_ms": timings}
+    )
@@ -12,14 +12,23 @@ import uuid
 from app.models.schemas import (
     Product, CartItem, Order, PaymentStatus, APIResponse, User
 )
+from app.core.pagination import sort_spec, DESCENDING
+from app.core.responses import EnvelopeRoute
 from app.core.auth import get_current_user
-from app.database.connection import (
-    get_products_collection,
-    get_orders_collection,
-    get_users_collection
+from app.services.cart import (
+    load_cart_products, price_cart, prune_cart, first_image
 )
+from app.services.facets import product_category_counts, product_brand_counts
+from app.services.product_search import (
+    search_catalog, text_search_filter, TEXT_SCORE, RELEVANCE_SORT
+)
+from app.services.inventory import (
+    reserve_stock, release_stock, InsufficientStockError
+)
+from app.database.connection import get_users_collection, mongo_transaction
+from app.database.repositories import orders_repo, products_repo
 
-router = APIRouter()
+router = APIRouter(route_class=EnvelopeRoute)
 
 
 # ===== PRODUCT ROUTES =====
@@ -28,21 +37,24 @@ router = APIRouter()
 async def get_products(
     page: int = Query(1, ge=1),
     limit: int = Query(12, ge=1, le=50),
-    search: Optional[str] = None,
+    search: Optional[str] = Query(None, max_length=100),
     category: Optional[str] = None,
     brand: Optional[str] = None,
     min_price: Optional[float] = None,
     max_price: Optional[float] = None,
-    sort_by: str = Query("name", regex="^(name|price|rating|created_at)$"),
+    sort_by: Optional[str] = Query(
+        None, regex="^(relevance|name|price|rating|created_at)$"),
     sort_order: str = Query("asc", regex="^(asc|desc)$"),
-    in_stock_only: bool = True
+    in_stock_only: bool = True,
+    fields: Optional[str] = None
 ):
     """
     ## 🛍️ Get Products
 
     Retrieve a paginated list of products with filtering and sorting options.
     """
-    products_collection = get_products_collection()
+    products_collection = products_repo.collection
+    selection = products_repo.select(fields)
 
     # Build query filter
     query = {"is_active": True}
@@ -51,12 +63,8 @@ async def get_products(
         query["stock_quantity"] = {"$gt": 0}
 
     if search:
-        query["$or"] = [
-            {"name": {"$regex": search, "$options": "i"}},
-            {"description": {"$regex": search, "$options": "i"}},
-            {"brand": {"$regex": search, "$options": "i"}},
-            {"category": {"$regex": search, "$options": "i"}}
-        ]
+        # Served by the products text index
+        query.update(text_search_filter(search))
 
     if category:
         query["category"] = category
@@ -79,19 +87,32 @@ async def get_products(
     # Get total count
     total = await products_collection.count_documents(query)
 
-    # Prepare sort
-    sort_direction = 1 if sort_order == "asc" else -1
-    sort_criteria = [(sort_by, sort_direction)]
+    # Prepare sort (searches rank by relevance unless asked otherwise)
+    if sort_by is None:
+        sort_by = "relevance" if search else "name"
+
+    projection = products_repo.projection("card", selection)
+    if sort_by == "relevance" and search:
+        projection = products_repo.projection("card", selection, score=TEXT_SCORE)
+        sort_criteria = RELEVANCE_SORT
+    else:
+        if sort_by == "relevance":
+            sort_by = "name"
+        sort_direction = 1 if sort_order == "asc" else -1
+        # _id tiebreaker keeps pagination stable across equal sort keys
+        sort_criteria = [(sort_by, sort_direction), ("_id", sort_direction)]
 
     # Get products
-    cursor = products_collection.find(query).sort(
+    cursor = products_collection.find(query, projection).sort(
         sort_criteria).skip(skip).limit(limit)
-    products = await cursor.to_list(length=limit)
+    products = products_repo.mapper.map_many(await cursor.to_list(length=limit))
 
-    # Convert ObjectId to string and add discount info
+    # Add discount info
     for product in products:
-        product["id"] = str(product["_id"])
-        product.pop("_id", None)
+        product.pop("score", None)
+
+        if "discount_percentage" not in selection:
+            continue
 
         # Calculate discount percentage if original price exists
         if product.get("original_price") and product["original_price"] > product["price"]:
@@ -105,7 +126,7 @@ async def get_products(
         success=True,
         message="Products retrieved successfully",
         data={
-            "products": products,
+            "products": selection.trim_many(products),
             "pagination": {
                 "current_page": page,
                 "total_pages": math.ceil(total / limit),
@@ -131,26 +152,8 @@ async def get_product_categories():
 
     Retrieve all available product categories.
     """
-    products_collection = get_products_collection()
-
-    # Get distinct categories for active products
-    categories = await products_collection.distinct("category", {"is_active": True})
-
-    # Get category counts
-    category_counts = []
-    for category in categories:
-        count = await products_collection.count_documents({
-            "category": category,
-            "is_active": True,
-            "stock_quantity": {"$gt": 0}
-        })
-        category_counts.append({
-            "name": category,
-            "count": count
-        })
-
-    # Sort by count (most products first)
-    category_counts.sort(key=lambda x: x["count"], reverse=True)
+    # Category counts from a single cached aggregation
+    category_counts = await product_category_counts()
 
     return APIResponse(
         success=True,
@@ -166,31 +169,8 @@ async def get_product_brands(category: Optional[str] = None):
 
     Retrieve all available product brands, optionally filtered by category.
     """
-    products_collection = get_products_collection()
-
-    # Build query
-    query = {"is_active": True}
-    if category:
-        query["category"] = category
-
-    # Get distinct brands
-    brands = await products_collection.distinct("brand", query)
-
-    # Get brand counts
-    brand_counts = []
-    for brand in brands:
-        brand_query = query.copy()
-        brand_query["brand"] = brand
-        brand_query["stock_quantity"] = {"$gt": 0}
-
-        count = await products_collection.count_documents(brand_query)
-        brand_counts.append({
-            "name": brand,
-            "count": count
-        })
-
-    # Sort alphabetically
-    brand_counts.sort(key=lambda x: x["name"])
+    # Brand counts from a single cached aggregation
+    brand_counts = await product_brand_counts(category)
 
     return APIResponse(
         success=True,
@@ -203,7 +183,7 @@ async def get_product_brands(category: Optional[str] = None):
 
 
 @router.get("/products/{product_id}", response_model=APIResponse)
-async def get_product_details(product_id: str):
+async def get_product_details(product_id: str, fields: Optional[str] = None):
     """
     ## 🔍 Get Product Details
 
@@ -215,12 +195,12 @@ async def get_product_details(product_id: str):
             detail="Invalid product ID"
         )
 
-    products_collection = get_products_collection()
-
-    product = await products_collection.find_one({
+    # The category is always read for the related products
+    selection = products_repo.select(fields, required=["category"])
+    product = await products_repo.find_one({
         "_id": ObjectId(product_id),
         "is_active": True
-    })
+    }, fields=selection)
 
     if not product:
         raise HTTPException(
@@ -228,45 +208,41 @@ async def get_product_details(product_id: str):
             detail="Product not found"
         )
 
-    # Convert ObjectId to string and add computed fields
-    product["id"] = str(product["_id"])
-    product.pop("_id", None)
+    # Add computed fields
+    product = products_repo.mapper.map(product)
 
     # Calculate discount percentage
-    if product.get("original_price") and product["original_price"] > product["price"]:
-        discount = ((product["original_price"] -
-                    product["price"]) / product["original_price"]) * 100
-        product["discount_percentage"] = round(discount, 2)
-    else:
-        product["discount_percentage"] = 0
+    if "discount_percentage" in selection:
+        if product.get("original_price") and product["original_price"] > product["price"]:
+            discount = ((product["original_price"] -
+                        product["price"]) / product["original_price"]) * 100
+            product["discount_percentage"] = round(discount, 2)
+        else:
+            product["discount_percentage"] = 0
 
     # Add stock status
-    if product["stock_quantity"] == 0:
-        product["stock_status"] = "out_of_stock"
-    elif product["stock_quantity"] <= 5:
-        product["stock_status"] = "low_stock"
-    else:
-        product["stock_status"] = "in_stock"
+    if "stock_status" in selection:
+        if product["stock_quantity"] == 0:
+            product["stock_status"] = "out_of_stock"
+        elif product["stock_quantity"] <= 5:
+            product["stock_status"] = "low_stock"
+        else:
+            product["stock_status"] = "in_stock"
 
     # Get related products (same category, different product)
-    related_products = await products_collection.find({
+    related_products = await products_repo.find_many({
         "category": product["category"],
         "_id": {"$ne": ObjectId(product_id)},
         "is_active": True,
         "stock_quantity": {"$gt": 0}
-    }).limit(4).to_list(length=4)
-
-    # Convert related products ObjectIds
-    for related in related_products:
-        related["id"] = str(related["_id"])
-        related.pop("_id", None)
+    }, "card", limit=4)
 
     return APIResponse(
         success=True,
         message="Product details retrieved successfully",
         data={
-            "product": product,
-            "related_products": related_products
+            "product": selection.trim(product),
+            "related_products": products_repo.mapper.map_many(related_products)
         }
     )
 
@@ -290,7 +266,7 @@ async def add_to_cart(
             detail="Invalid product ID"
         )
 
-    products_collection = get_products_collection()
+    products_collection = products_repo.collection
     users_collection = get_users_collection()
 
     # Validate product exists and is available
@@ -366,10 +342,10 @@ async def get_cart(current_user: User = Depends(get_current_user)):
     Retrieve the user's current shopping cart with product details.
     """
     users_collection = get_users_collection()
-    products_collection = get_products_collection()
 
     # Get user's cart
-    user = await users_collection.find_one({"_id": ObjectId(current_user.id)})
+    user = await users_collection.find_one(
+        {"_id": ObjectId(current_user.id)}, {"cart": 1})
     cart = user.get("cart", [])
 
     if not cart:
@@ -383,56 +359,20 @@ async def get_cart(current_user: User = Depends(get_current_user)):
             }
         )
 
-    # Enrich cart items with product details
-    cart_items = []
-    total_amount = 0
-
-    for item in cart:
-        product = await products_collection.find_one({"_id": item["product_id"]})
-
-        if product and product.get("is_active", False):
-            # Check stock availability
-            is_available = product["stock_quantity"] >= item["quantity"]
-            item_total = item["quantity"] * item["price"]
-
-            cart_item = {
-                "product_id": str(item["product_id"]),
-                "product_name": product["name"],
-                "product_image": product["images"][0] if product["images"] else None,
-                "unit_price": item["price"],
-                # Current price might be different
-                "current_price": product["price"],
-                "quantity": item["quantity"],
-                "subtotal": item_total,
-                "is_available": is_available,
-                "stock_quantity": product["stock_quantity"],
-                "added_at": item.get("added_at")
-            }
-
-            cart_items.append(cart_item)
-            if is_available:
-                total_amount += item_total
+    # Enrich cart items with product details from a single query
+    products = await load_cart_products(cart)
+    summary = price_cart(cart, products)
 
     # Remove unavailable items from cart
-    available_cart = [item for item in cart if any(
-        str(item["product_id"]
-            ) == cart_item["product_id"] and cart_item["is_available"]
-        for cart_item in cart_items
-    )]
-
-    if len(available_cart) != len(cart):
-        await users_collection.update_one(
-            {"_id": ObjectId(current_user.id)},
-            {"$set": {"cart": available_cart, "updated_at": datetime.now()}}
-        )
+    await prune_cart(current_user.id, summary["unavailable_ids"])
 
     return APIResponse(
         success=True,
         message="Cart retrieved successfully",
         data={
-            "items": cart_items,
-            "total_amount": total_amount,
-            "total_items": sum(item["quantity"] for item in cart_items if item["is_available"])
+            "items": summary["items"],
+            "total_amount": summary["total_amount"],
+            "total_items": summary["total_items"]
         }
     )
 
@@ -455,7 +395,7 @@ async def update_cart_item(
         )
 
     users_collection = get_users_collection()
-    products_collection = get_products_collection()
+    products_collection = products_repo.collection
 
     # Get user's cart
     user = await users_collection.find_one({"_id": ObjectId(current_user.id)})
@@ -548,11 +488,11 @@ async def create_order(
     Create a new order from the user's cart.
     """
     users_collection = get_users_collection()
-    products_collection = get_products_collection()
-    orders_collection = get_orders_collection()
+    orders_collection = orders_repo.collection
 
     # Get user's cart
-    user = await users_collection.find_one({"_id": ObjectId(current_user.id)})
+    user = await users_collection.find_one(
+        {"_id": ObjectId(current_user.id)}, {"cart": 1})
     cart = user.get("cart", [])
 
     if not cart:
@@ -571,11 +511,12 @@ async def create_order(
             )
 
     # Validate cart items and calculate total
+    products = await load_cart_products(cart)
     order_items = []
     total_amount = 0
 
     for cart_item in cart:
-        product = await products_collection.find_one({"_id": cart_item["product_id"]})
+        product = products.get(cart_item["product_id"])
 
         if not product or not product.get("is_active", False):
             raise HTTPException(
@@ -598,7 +539,7 @@ async def create_order(
             "quantity": cart_item["quantity"],
             "price": product["price"],
             "product_name": product["name"],
-            "product_image": product["images"][0] if product["images"] else None
+            "product_image": first_image(product)
         })
 
     # Generate order number
@@ -617,16 +558,26 @@ async def create_order(
         "updated_at": datetime.now()
     }
 
-    # Insert order
-    result = await orders_collection.insert_one(order)
-    order["id"] = str(result.inserted_id)
-    order.pop("_id", None)
-
-    # Update product stock quantities
-    for cart_item in cart:
-        await products_collection.update_one(
-            {"_id": cart_item["product_id"]},
-            {"$inc": {"stock_quantity": -cart_item["quantity"]}}
+    # Reserve stock for every line in one bulk write, then insert the order
+    try:
+        async with mongo_transaction() as session:
+            await reserve_stock(order_items, order_number, session=session)
+            try:
+                await orders_collection.insert_one(order, session=session)
+            except Exception:
+                # Outside a transaction the reservation has to be undone by hand
+                if session is None:
+                    await release_stock(order_items)
+                raise
+    except InsufficientStockError as e:
+        short_items = [
+            item["product_name"] for item in order_items
+            if item["product_id"] in e.product_ids
+        ]
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Insufficient stock for {', '.join(short_items)}"
+            if short_items else "Insufficient stock for one or more items"
         )
 
     # Clear user's cart
@@ -635,15 +586,10 @@ async def create_order(
         {"$set": {"cart": [], "updated_at": datetime.now()}}
     )
 
-    # Convert ObjectIds to strings for response
-    order["user_id"] = str(order["user_id"])
-    for item in order["items"]:
-        item["product_id"] = str(item["product_id"])
-
     return APIResponse(
         success=True,
         message="Order created successfully",
-        data={"order": order}
+        data={"order": orders_repo.mapper.map(order)}
     )
 
 
@@ -652,6 +598,8 @@ async def get_user_orders(
     current_user: User = Depends(get_current_user),
     page: int = Query(1, ge=1),
     limit: int = Query(10, ge=1, le=50),
+    cursor: Optional[str] = None,
+    include_total: Optional[bool] = None,
     status: Optional[str] = None
 ):
     """
@@ -659,44 +607,23 @@ async def get_user_orders(
 
     Retrieve the user's orders with optional status filtering.
     """
-    orders_collection = get_orders_collection()
-
     # Build query
     query = {"user_id": ObjectId(current_user.id)}
     if status:
         query["order_status"] = status
 
-    # Calculate skip for pagination
-    skip = (page - 1) * limit
-
-    # Get total count
-    total = await orders_collection.count_documents(query)
-
     # Get orders (most recent first)
-    cursor = orders_collection.find(query).sort(
-        "created_at", -1).skip(skip).limit(limit)
-    orders = await cursor.to_list(length=limit)
-
-    # Convert ObjectIds to strings
-    for order in orders:
-        order["id"] = str(order["_id"])
-        order.pop("_id", None)
-        order["user_id"] = str(order["user_id"])
-
-        for item in order["items"]:
-            item["product_id"] = str(item["product_id"])
+    orders, pagination = await orders_repo.page(
+        query, sort_spec("created_at", DESCENDING), limit, view="detail",
+        page=page, cursor=cursor, include_total=include_total
+    )
 
     return APIResponse(
         success=True,
         message="Orders retrieved successfully",
         data={
-            "orders": orders,
-            "pagination": {
-                "current_page": page,
-                "total_pages": math.ceil(total / limit),
-                "total_items": total,
-                "items_per_page": limit
-            }
+            "orders": orders_repo.mapper.map_many(orders),
+            "pagination": pagination
         }
     )
 
@@ -717,9 +644,7 @@ async def get_order_details(
             detail="Invalid order ID"
         )
 
-    orders_collection = get_orders_collection()
-
-    order = await orders_collection.find_one({
+    order = await orders_repo.find_one({
         "_id": ObjectId(order_id),
         "user_id": ObjectId(current_user.id)
     })
@@ -730,18 +655,10 @@ async def get_order_details(
             detail="Order not found"
         )
 
-    # Convert ObjectIds to strings
-    order["id"] = str(order["_id"])
-    order.pop("_id", None)
-    order["user_id"] = str(order["user_id"])
-
-    for item in order["items"]:
-        item["product_id"] = str(item["product_id"])
-
     return APIResponse(
         success=True,
         message="Order details retrieved successfully",
-        data={"order": order}
+        data={"order": orders_repo.mapper.map(order)}
     )
 
 
@@ -761,8 +678,7 @@ async def cancel_order(
             detail="Invalid order ID"
         )
 
-    orders_collection = get_orders_collection()
-    products_collection = get_products_collection()
+    orders_collection = orders_repo.collection
 
     order = await orders_collection.find_one({
         "_id": ObjectId(order_id),
@@ -781,16 +697,10 @@ async def cancel_order(
             detail=f"Cannot cancel order with status: {order['order_status']}"
         )
 
-    # Restore product stock quantities
-    for item in order["items"]:
-        await products_collection.update_one(
-            {"_id": item["product_id"]},
-            {"$inc": {"stock_quantity": item["quantity"]}}
-        )
-
-    # Update order status
-    await orders_collection.update_one(
-        {"_id": ObjectId(order_id)},
+    # Update order status; the status guard keeps concurrent cancels
+    # from restocking twice
+    result = await orders_collection.update_one(
+        {"_id": ObjectId(order_id), "order_status": "pending"},
         {
             "$set": {
                 "order_status": "cancelled",
@@ -800,6 +710,15 @@ async def cancel_order(
         }
     )
 
+    if result.modified_count == 0:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Order is no longer pending"
+        )
+
+    # Restore product stock quantities in one bulk write
+    await release_stock(order["items"])
+
     return APIResponse(
         success=True,
         message="Order cancelled successfully",
@@ -811,7 +730,7 @@ async def cancel_order(
 
 @router.get("/search", response_model=APIResponse)
 async def search_products(
-    q: str = Query(..., min_length=2),
+    q: str = Query(..., min_length=2, max_length=100),
     limit: int = Query(10, ge=1, le=20)
 ):
     """
@@ -819,23 +738,16 @@ async def search_products(
 
     Fast product search with suggestions.
     """
-    products_collection = get_products_collection()
-
-    # Build search query
-    search_query = {
-        "$or": [
-            {"name": {"$regex": q, "$options": "i"}},
-            {"description": {"$regex": q, "$options": "i"}},
-            {"brand": {"$regex": q, "$options": "i"}},
-            {"category": {"$regex": q, "$options": "i"}}
-        ],
-        "is_active": True,
-        "stock_quantity": {"$gt": 0}
-    }
-
-    # Get products
-    cursor = products_collection.find(search_query).limit(limit)
-    products = await cursor.to_list(length=limit)
+    # Ranked text index search, topped up with escaped name-prefix matches
+    products = await search_catalog(
+        q,
+        {"is_active": True, "stock_quantity": {"$gt": 0}},
+        limit,
+        projection={
+            "name": 1, "brand": 1, "category": 1, "price": 1, "rating": 1,
+            "images": {"$slice": 1}
+        }
+    )
 
     # Convert ObjectIds and add basic info
     results = []
@@ -846,7 +758,7 @@ async def search_products(
             "brand": product["brand"],
             "category": product["category"],
             "price": product["price"],
-            "image": product["images"][0] if product["images"] else None,
+            "image": first_image(product),
             "rating": product.get("rating", 0)
         })
 
@@ -2,17 +2,19 @@
 FASTag management routes - Balance, Transactions, Recharge
 """
 
-from fastapi import APIRouter, HTTPException, status, Depends, Query
+from fastapi import APIRouter, HTTPException, status, Depends, Query, Response
 from typing import List, Optional
 from datetime import datetime
 from app.models.schemas import (
     FASTag, FASTagTransaction, User, APIResponse
 )
 from app.core.auth import get_current_active_user
+from app.core.responses import EnvelopeRoute
+from app.core.pagination import paginate, set_next_cursor, sort_spec, DESCENDING
 from app.database.connection import get_fastags_collection, get_fastag_transactions_collection
 import uuid
 
-router = APIRouter()
+router = APIRouter(route_class=EnvelopeRoute)
 
 
 @router.get("/", response_model=List[FASTag])
@@ -134,9 +136,11 @@ async def recharge_fastag(
 @router.get("/{fastag_id}/transactions", response_model=List[FASTagTransaction])
 async def get_fastag_transactions(
     fastag_id: str,
+    response: Response,
     current_user: User = Depends(get_current_active_user),
     page: int = Query(1, ge=1),
-    size: int = Query(50, ge=1, le=100)
+    size: int = Query(50, ge=1, le=100),
+    cursor: Optional[str] = None
 ):
     """
     ## 📊 Get FASTag Transactions
@@ -158,15 +162,14 @@ async def get_fastag_transactions(
             detail="FASTag not found"
         )
 
-    # Calculate pagination
-    skip = (page - 1) * size
-
     # Get transactions sorted by date (newest first)
-    cursor = fastag_transactions_collection.find({
-        "fastag_id": fastag_id
-    }).sort("created_at", -1).skip(skip).limit(size)
+    transactions, pagination = await paginate(
+        fastag_transactions_collection, {"fastag_id": fastag_id},
+        sort_spec("created_at", DESCENDING), size,
+        page=page, cursor=cursor, include_total=False
+    )
 
-    transactions = await cursor.to_list(length=size)
+    set_next_cursor(response, pagination)
 
     return [FASTagTransaction(**transaction) for transaction in transactions]
 
@@ -2,26 +2,30 @@
 Notification management routes - Send, Read, Manage notifications
 """
 
-from fastapi import APIRouter, HTTPException, status, Depends, Query
+from fastapi import APIRouter, HTTPException, status, Depends, Query, Response
 from typing import List, Optional
 from datetime import datetime
 from app.models.schemas import (
     Notification, User, APIResponse
 )
 from app.core.auth import get_current_active_user
+from app.core.responses import EnvelopeRoute
+from app.core.pagination import paginate, set_next_cursor, sort_spec, DESCENDING
 from app.database.connection import get_notifications_collection
 import uuid
 
-router = APIRouter()
+router = APIRouter(route_class=EnvelopeRoute)
 
 
 @router.get("/", response_model=List[Notification])
 async def get_user_notifications(
+    response: Response,
     current_user: User = Depends(get_current_active_user),
     is_read: Optional[bool] = Query(None),
     notification_type: Optional[str] = Query(None),
     page: int = Query(1, ge=1),
-    size: int = Query(20, ge=1, le=100)
+    size: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None
 ):
     """
     ## 🔔 Get User Notifications
@@ -37,13 +41,13 @@ async def get_user_notifications(
     if notification_type:
         query["type"] = notification_type
 
-    # Calculate pagination
-    skip = (page - 1) * size
-
     # Get notifications sorted by creation date (newest first)
-    cursor = notifications_collection.find(query).sort(
-        "created_at", -1).skip(skip).limit(size)
-    notifications = await cursor.to_list(length=size)
+    notifications, pagination = await paginate(
+        notifications_collection, query, sort_spec("created_at", DESCENDING), size,
+        page=page, cursor=cursor, include_total=False
+    )
+
+    set_next_cursor(response, pagination)
 
     return [Notification(**notification) for notification in notifications]
 
@@ -2,41 +2,64 @@
 Parking routes - Parking lots, booking management, search functionality
 """
 
-from fastapi import APIRouter, HTTPException, status, Depends, Query
+from fastapi import (
+    APIRouter, HTTPException, status, Depends, Query, WebSocket,
+    WebSocketDisconnect
+)
 from typing import List, Optional
 from datetime import datetime, timedelta
 from bson import ObjectId
-import math
+import asyncio
 
 from app.models.schemas import (
-    ParkingLot, ParkingBooking, ParkingBookingCreate,
+    ParkingLot, ParkingBooking, ParkingBookingCreate, ParkingAvailabilityQuery,
     BookingStatus, PaymentStatus, APIResponse, User
 )
+from app.core.config import get_settings
+from app.core.pagination import sort_spec, ASCENDING, DESCENDING
+from app.core.responses import EnvelopeRoute
 from app.core.auth import get_current_user
-from app.database.connection import (
-    get_parking_lots_collection,
-    get_parking_bookings_collection,
-    get_vehicles_collection
+from app.services.loaders import enrich_bookings
+from app.services.occupancy_feed import (
+    occupancy_feed, lot_topic, tile_of, tile_topic
+)
+from app.services.occupancy import (
+    LotFullError,
+    claim_slots,
+    occupancy_at,
+    peak_occupancy_many,
+    release,
+    release_after_checkout
+)
+from app.database.connection import mongo_transaction
+from app.database.repositories import (
+    parking_bookings_repo,
+    parking_lots_repo,
+    vehicles_repo
 )
 
-router = APIRouter()
+router = APIRouter(route_class=EnvelopeRoute)
+settings = get_settings()
 
 
 @router.get("/lots", response_model=APIResponse)
 async def get_parking_lots(
     page: int = Query(1, ge=1),
     limit: int = Query(10, ge=1, le=50),
+    cursor: Optional[str] = None,
+    include_total: Optional[bool] = None,
     search: Optional[str] = None,
     min_price: Optional[float] = None,
     max_price: Optional[float] = None,
-    features: Optional[List[str]] = Query(None)
+    features: Optional[List[str]] = Query(None),
+    fields: Optional[str] = None
 ):
     """
     ## 🅿️ Get Parking Lots
 
     Retrieve a paginated list of parking lots with optional filtering.
     """
-    lots_collection = get_parking_lots_collection()
+    selection = parking_lots_repo.select(fields)
 
     # Build query filter
     query = {}
@@ -60,102 +83,211 @@ async def get_parking_lots(
     if features:
         query["features"] = {"$in": features}
 
-    # Calculate skip for pagination
-    skip = (page - 1) * limit
-
-    # Get total count
-    total = await lots_collection.count_documents(query)
-
     # Get parking lots
-    cursor = lots_collection.find(query).skip(skip).limit(limit)
-    lots = await cursor.to_list(length=limit)
-
-    # Convert ObjectId to string
-    for lot in lots:
-        lot["id"] = str(lot["_id"])
-        lot.pop("_id", None)
+    lots, pagination = await parking_lots_repo.page(
+        query, sort_spec("_id", ASCENDING), limit, fields=selection,
+        page=page, cursor=cursor, include_total=include_total
+    )
 
     return APIResponse(
         status="success",
         message="Parking lots retrieved successfully",
         data={
-            "lots": lots,
-            "pagination": {
-                "current_page": page,
-                "total_pages": math.ceil(total / limit),
-                "total_items": total,
-                "items_per_page": limit
-            }
+            "lots": selection.trim_many(parking_lots_repo.mapper.map_many(lots)),
+            "pagination": pagination
         }
     )
 
 
+def nearby_lots_pipeline(latitude: float, longitude: float, radius: float,
+                         limit: int, projection: Optional[dict] = None) -> List[dict]:
+    """$geoNear pipeline for lots within radius km, nearest first"""
+    # Convert radius from kilometers to meters (MongoDB uses meters)
+    radius_meters = radius * 1000
+
+    # Geospatial query served by the location_coordinates 2dsphere index.
+    # $geoNear sorts by distance, so the limit is applied on the server.
+    pipeline = [
+        {
+            "$geoNear": {
+                "near": {
+                    "type": "Point",
+                    "coordinates": [longitude, latitude]
+                },
+                "key": "location_coordinates",
+                "distanceField": "distance",
+                # Report distances in kilometers
+                "distanceMultiplier": 0.001,
+                "maxDistance": radius_meters,
+                "spherical": True
+            }
+        },
+        {"$limit": limit}
+    ]
+    if projection:
+        pipeline.append({"$project": projection})
+    return pipeline
+
+
 @router.get("/lots/nearby", response_model=APIResponse)
 async def get_nearby_parking_lots(
     latitude: float = Query(..., ge=-90, le=90),
     longitude: float = Query(..., ge=-180, le=180),
     radius: float = Query(5.0, ge=0.1, le=50,
                           description="Radius in kilometers"),
-    limit: int = Query(10, ge=1, le=50)
+    limit: int = Query(10, ge=1, le=50),
+    fields: Optional[str] = None
 ):
     """
     ## 📍 Get Nearby Parking Lots
 
     Find parking lots near a specific location using geospatial search.
     """
-    lots_collection = get_parking_lots_collection()
+    selection = parking_lots_repo.select(fields)
+    pipeline = nearby_lots_pipeline(
+        latitude, longitude, radius, limit,
+        projection=parking_lots_repo.stage_projection("card", selection, distance=1)
+    )
+    nearby_lots = await parking_lots_repo.collection.aggregate(
+        pipeline).to_list(length=limit)
 
-    # Convert radius from kilometers to meters (MongoDB uses meters)
-    radius_meters = radius * 1000
+    nearby_lots = parking_lots_repo.mapper.map_many(nearby_lots)
+    for lot in nearby_lots:
+        lot["distance"] = round(lot["distance"], 2)
 
-    # Geospatial query
-    query = {
-        "location_coordinates": {
-            "$near": {
-                "$geometry": {
-                    "type": "Point",
-                    "coordinates": [longitude, latitude]
-                },
-                "$maxDistance": radius_meters
-            }
+    return APIResponse(
+        status="success",
+        message="Nearby parking lots retrieved successfully",
+        data={
+            "lots": selection.trim_many(nearby_lots),
+            "search_center": {"latitude": latitude, "longitude": longitude},
+            "radius_km": radius
         }
-    }
+    )
 
-    # Alternative query if location_coordinates doesn't exist
-    # Using approximate distance calculation
-    lots = await lots_collection.find({}).to_list(length=None)
 
-    nearby_lots = []
-    for lot in lots:
-        # Calculate approximate distance using Haversine formula
-        distance = calculate_distance(
-            latitude, longitude,
-            lot.get("latitude", 0), lot.get("longitude", 0)
+@router.post("/availability", response_model=APIResponse)
+async def get_bulk_availability(query: ParkingAvailabilityQuery):
+    """
+    ## 🗺️ Bulk Parking Availability
+
+    Available spots for many lots (by id or nearby search) across one or
+    more time windows, in a single round trip.
+    """
+    now = datetime.now()
+    windows = [(window.start_time, window.end_time) for window in query.windows]
+    if not windows:
+        # The slot containing the current moment
+        windows = [(now, now + timedelta(microseconds=1))]
+
+    if query.lot_ids:
+        if not all(ObjectId.is_valid(lot_id) for lot_id in query.lot_ids):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid parking lot ID"
+            )
+        lot_ids = [ObjectId(lot_id) for lot_id in query.lot_ids]
+        lots = await parking_lots_repo.find_many(
+            {"_id": {"$in": lot_ids}}, "marker", limit=len(lot_ids))
+    elif query.latitude is not None and query.longitude is not None:
+        pipeline = nearby_lots_pipeline(
+            query.latitude, query.longitude, query.radius, query.limit,
+            projection=parking_lots_repo.stage_projection("marker", distance=1)
+        )
+        lots = await parking_lots_repo.collection.aggregate(
+            pipeline).to_list(length=query.limit)
+    else:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Provide lot_ids or latitude and longitude"
         )
 
-        if distance <= radius:
-            lot["distance"] = round(distance, 2)
-            lot["id"] = str(lot["_id"])
-            lot.pop("_id", None)
-            nearby_lots.append(lot)
+    # One aggregation over the occupancy counters for every lot and window
+    peaks = await peak_occupancy_many([lot["_id"] for lot in lots], windows)
 
-    # Sort by distance and limit results
-    nearby_lots.sort(key=lambda x: x["distance"])
-    nearby_lots = nearby_lots[:limit]
+    for lot in lots:
+        capacity = lot.get("total_capacity", 0)
+        lot_peaks = peaks.get(lot["_id"], [0] * len(windows))
+        lot["availability"] = [
+            {
+                "start_time": start,
+                "end_time": end,
+                "peak_occupancy": peak,
+                "available_spots": max(0, capacity - peak)
+            }
+            for (start, end), peak in zip(windows, lot_peaks)
+        ]
+        if "distance" in lot:
+            lot["distance"] = round(lot["distance"], 2)
 
     return APIResponse(
         status="success",
-        message="Nearby parking lots retrieved successfully",
-        data={
-            "lots": nearby_lots,
-            "search_center": {"latitude": latitude, "longitude": longitude},
-            "radius_km": radius
-        }
+        message="Parking availability retrieved successfully",
+        data={"lots": parking_lots_repo.mapper.map_many(lots), "checked_at": now}
     )
 
 
+@router.websocket("/live")
+async def parking_live_feed(websocket: WebSocket):
+    """
+    ## 📡 Live Parking Occupancy
+
+    Push channel for occupancy changes. Send JSON messages such as
+    {"action": "subscribe", "lots": [lot_id, ...]} or
+    {"action": "subscribe", "near": {"latitude": 12.97, "longitude": 77.59}}
+    ("tiles": [...] and "unsubscribe" work the same way). Fetch the
+    starting state from POST /availability.
+
+    With more than one worker, set PARKING_FEED_BACKEND=redis so changes
+    made on any worker reach every socket; the default memory backend only
+    pushes bookings handled by the worker holding the connection.
+    """
+    await websocket.accept()
+    subscriber = occupancy_feed.connect()
+
+    async def push_updates():
+        while True:
+            for message in await subscriber.next_batch():
+                await websocket.send_text(message)
+
+    sender = asyncio.create_task(push_updates())
+    try:
+        while True:
+            try:
+                request = await websocket.receive_json()
+                action = request.get("action")
+                topics = [lot_topic(lot_id) for lot_id in request.get("lots", [])
+                          if ObjectId.is_valid(lot_id)]
+                tiles = list(request.get("tiles", []))
+                if request.get("near"):
+                    tiles.append(tile_of(float(request["near"]["latitude"]),
+                                         float(request["near"]["longitude"])))
+                topics += [tile_topic(tile) for tile in tiles]
+            except (ValueError, TypeError, KeyError, AttributeError):
+                await websocket.send_json(
+                    {"type": "error", "detail": "Invalid subscription message"})
+                continue
+
+            if action == "subscribe":
+                occupancy_feed.subscribe(subscriber, topics)
+            elif action == "unsubscribe":
+                occupancy_feed.unsubscribe(subscriber, topics)
+            else:
+                await websocket.send_json(
+                    {"type": "error", "detail": "Unknown action"})
+                continue
+
+            await websocket.send_json(
+                {"type": "subscribed", "topics": sorted(subscriber.topics)})
+    except WebSocketDisconnect:
+        pass
+    finally:
+        sender.cancel()
+        occupancy_feed.disconnect(subscriber)
+
+
 @router.get("/lots/{lot_id}", response_model=APIResponse)
-async def get_parking_lot_details(lot_id: str):
+async def get_parking_lot_details(lot_id: str, fields: Optional[str] = None):
     """
     ## 🅿️ Get Parking Lot Details
 
@@ -167,37 +299,26 @@ async def get_parking_lot_details(lot_id: str):
             detail="Invalid parking lot ID"
         )
 
-    lots_collection = get_parking_lots_collection()
-
-    lot = await lots_collection.find_one({"_id": ObjectId(lot_id)})
+    selection = parking_lots_repo.select(fields)
+    lot = await parking_lots_repo.find_one({"_id": ObjectId(lot_id)}, fields=selection)
     if not lot:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Parking lot not found"
         )
 
-    # Convert ObjectId to string
-    lot["id"] = str(lot["_id"])
-    lot.pop("_id", None)
-
-    # Get current availability (check active bookings)
-    bookings_collection = get_parking_bookings_collection()
-    now = datetime.now()
-
-    active_bookings = await bookings_collection.count_documents({
-        "parking_lot_id": ObjectId(lot_id),
-        "status": BookingStatus.ACTIVE,
-        "start_time": {"$lte": now},
-        "end_time": {"$gte": now}
-    })
+    lot = parking_lots_repo.mapper.map(lot)
 
-    lot["current_available_spots"] = max(
-        0, lot.get("total_capacity", 0) - active_bookings)
+    # Get current availability from the occupancy counters
+    if "current_available_spots" in selection:
+        occupied_spots = await occupancy_at(ObjectId(lot_id))
+        lot["current_available_spots"] = max(
+            0, lot.get("total_capacity", 0) - occupied_spots)
 
     return APIResponse(
         status="success",
         message="Parking lot details retrieved successfully",
-        data={"lot": lot}
+        data={"lot": selection.trim(lot)}
     )
 
 
@@ -211,10 +332,6 @@ async def create_parking_booking(
 
     Create a new parking booking for the current user.
     """
-    lots_collection = get_parking_lots_collection()
-    bookings_collection = get_parking_bookings_collection()
-    vehicles_collection = get_vehicles_collection()
-
     # Validate parking lot exists
     if not ObjectId.is_valid(booking_data.parking_lot_id):
         raise HTTPException(
@@ -222,7 +339,9 @@ async def create_parking_booking(
             detail="Invalid parking lot ID"
         )
 
-    lot = await lots_collection.find_one({"_id": ObjectId(booking_data.parking_lot_id)})
+    # Capacity and price are all the booking needs
+    lot = await parking_lots_repo.find_one(
+        {"_id": ObjectId(booking_data.parking_lot_id)}, "marker")
     if not lot:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -236,7 +355,7 @@ async def create_parking_booking(
             detail="Invalid vehicle ID"
         )
 
-    vehicle = await vehicles_collection.find_one({
+    vehicle = await vehicles_repo.collection.find_one({
         "_id": ObjectId(booking_data.vehicle_id),
         "user_id": ObjectId(current_user.id)
     })
@@ -259,30 +378,11 @@ async def create_parking_booking(
             detail="Cannot book for past time"
         )
 
-    # Check availability
-    active_bookings = await bookings_collection.count_documents({
-        "parking_lot_id": ObjectId(booking_data.parking_lot_id),
-        "status": {"$in": [BookingStatus.CONFIRMED, BookingStatus.ACTIVE]},
-        "$or": [
-            {
-                "start_time": {"$lte": booking_data.start_time},
-                "end_time": {"$gt": booking_data.start_time}
-            },
-            {
-                "start_time": {"$lt": booking_data.end_time},
-                "end_time": {"$gte": booking_data.end_time}
-            },
-            {
-                "start_time": {"$gte": booking_data.start_time},
-                "end_time": {"$lte": booking_data.end_time}
-            }
-        ]
-    })
-
-    if active_bookings >= lot.get("total_capacity", 0):
+    max_hours = settings.PARKING_MAX_BOOKING_HOURS
+    if booking_data.end_time - booking_data.start_time > timedelta(hours=max_hours):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="No available spots for the requested time"
+            detail=f"A booking may last at most {max_hours} hours"
         )
 
     # Calculate total amount
@@ -304,19 +404,28 @@ async def create_parking_booking(
         "updated_at": datetime.now()
     }
 
-    result = await bookings_collection.insert_one(booking)
-    booking["id"] = str(result.inserted_id)
-    booking.pop("_id", None)
+    # Claim a spot in every slot of the window, then insert the booking
+    try:
+        await claim_slots(lot["_id"], booking["start_time"], booking["end_time"],
+                          lot.get("total_capacity", 0))
+    except LotFullError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="No available spots for the requested time"
+        )
 
-    # Convert ObjectIds to strings for response
-    booking["user_id"] = str(booking["user_id"])
-    booking["parking_lot_id"] = str(booking["parking_lot_id"])
-    booking["vehicle_id"] = str(booking["vehicle_id"])
+    try:
+        await parking_bookings_repo.collection.insert_one(booking)
+    except Exception:
+        await release(lot["_id"], booking["start_time"], booking["end_time"])
+        raise
+
+    occupancy_feed.publish(lot["_id"], "booked")
 
     return APIResponse(
         status="success",
         message="Parking booking created successfully",
-        data={"booking": booking}
+        data={"booking": parking_bookings_repo.mapper.map(booking)}
     )
 
 
@@ -325,74 +434,40 @@ async def get_user_bookings(
     current_user: User = Depends(get_current_user),
     page: int = Query(1, ge=1),
     limit: int = Query(10, ge=1, le=50),
-    status: Optional[BookingStatus] = None
+    cursor: Optional[str] = None,
+    include_total: Optional[bool] = None,
+    status: Optional[BookingStatus] = None,
+    fields: Optional[str] = None
 ):
     """
     ## 📋 Get User Bookings
 
     Retrieve current user's parking bookings with optional status filtering.
     """
-    bookings_collection = get_parking_bookings_collection()
-    lots_collection = get_parking_lots_collection()
-    vehicles_collection = get_vehicles_collection()
+    selection = parking_bookings_repo.select(fields)
 
     # Build query
     query = {"user_id": ObjectId(current_user.id)}
     if status:
         query["status"] = status
 
-    # Calculate skip for pagination
-    skip = (page - 1) * limit
-
-    # Get total count
-    total = await bookings_collection.count_documents(query)
-
     # Get bookings with sorting (most recent first)
-    cursor = bookings_collection.find(query).sort(
-        "created_at", -1).skip(skip).limit(limit)
-    bookings = await cursor.to_list(length=limit)
-
-    # Enrich bookings with parking lot and vehicle details
-    for booking in bookings:
-        booking["id"] = str(booking["_id"])
-        booking.pop("_id", None)
-
-        # Get parking lot details
-        lot = await lots_collection.find_one({"_id": booking["parking_lot_id"]})
-        if lot:
-            booking["parking_lot"] = {
-                "id": str(lot["_id"]),
-                "name": lot.get("name"),
-                "location": lot.get("location"),
-                "address": lot.get("address")
-            }
-
-        # Get vehicle details
-        vehicle = await vehicles_collection.find_one({"_id": booking["vehicle_id"]})
-        if vehicle:
-            booking["vehicle"] = {
-                "id": str(vehicle["_id"]),
-                "make": vehicle.get("make"),
-                "model": vehicle.get("model"),
-                "license_plate": vehicle.get("license_plate")
-            }
+    bookings, pagination = await parking_bookings_repo.page(
+        query, sort_spec("created_at", DESCENDING), limit, fields=selection,
+        page=page, cursor=cursor, include_total=include_total
+    )
 
-        # Convert ObjectIds to strings
-        booking["user_id"] = str(booking["user_id"])
-        booking["parking_lot_id"] = str(booking["parking_lot_id"])
-        booking["vehicle_id"] = str(booking["vehicle_id"])
+    # Enrich bookings with parking lot and vehicle details in two queries
+    if "parking_lot" in selection or "vehicle" in selection:
+        await enrich_bookings(bookings, include_vehicle="vehicle" in selection)
 
     return APIResponse(
         status="success",
         message="User bookings retrieved successfully",
         data={
-            "bookings": bookings,
-            "pagination": {
-                "current_page": page,
-                "total_pages": math.ceil(total / limit),
-                "total_items": total,
-                "items_per_page": limit
-            }
+            "bookings": selection.trim_many(
+                parking_bookings_repo.mapper.map_many(bookings)),
+            "pagination": pagination
         }
     )
 
@@ -400,7 +475,8 @@ async def get_user_bookings(
 @router.get("/bookings/{booking_id}", response_model=APIResponse)
 async def get_booking_details(
     booking_id: str,
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    fields: Optional[str] = None
 ):
     """
     ## 📄 Get Booking Details
@@ -413,14 +489,11 @@ async def get_booking_details(
             detail="Invalid booking ID"
         )
 
-    bookings_collection = get_parking_bookings_collection()
-    lots_collection = get_parking_lots_collection()
-    vehicles_collection = get_vehicles_collection()
-
-    booking = await bookings_collection.find_one({
+    selection = parking_bookings_repo.select(fields)
+    booking = await parking_bookings_repo.find_one({
         "_id": ObjectId(booking_id),
         "user_id": ObjectId(current_user.id)
-    })
+    }, fields=selection)
 
     if not booking:
         raise HTTPException(
@@ -429,32 +502,14 @@ async def get_booking_details(
         )
 
     # Enrich with parking lot and vehicle details
-    booking["id"] = str(booking["_id"])
-    booking.pop("_id", None)
-
-    # Get parking lot details
-    lot = await lots_collection.find_one({"_id": booking["parking_lot_id"]})
-    if lot:
-        lot["id"] = str(lot["_id"])
-        lot.pop("_id", None)
-        booking["parking_lot"] = lot
-
-    # Get vehicle details
-    vehicle = await vehicles_collection.find_one({"_id": booking["vehicle_id"]})
-    if vehicle:
-        vehicle["id"] = str(vehicle["_id"])
-        vehicle.pop("_id", None)
-        booking["vehicle"] = vehicle
-
-    # Convert ObjectIds to strings
-    booking["user_id"] = str(booking["user_id"])
-    booking["parking_lot_id"] = str(booking["parking_lot_id"])
-    booking["vehicle_id"] = str(booking["vehicle_id"])
+    if "parking_lot" in selection or "vehicle" in selection:
+        await enrich_bookings([booking], detailed=True,
+                              include_vehicle="vehicle" in selection)
 
     return APIResponse(
         status="success",
         message="Booking details retrieved successfully",
-        data={"booking": booking}
+        data={"booking": selection.trim(parking_bookings_repo.mapper.map(booking))}
     )
 
 
@@ -474,7 +529,7 @@ async def cancel_booking(
             detail="Invalid booking ID"
         )
 
-    bookings_collection = get_parking_bookings_collection()
+    bookings_collection = parking_bookings_repo.collection
 
     booking = await bookings_collection.find_one({
         "_id": ObjectId(booking_id),
@@ -502,16 +557,27 @@ async def cancel_booking(
             detail="Cannot cancel booking less than 1 hour before start time"
         )
 
-    # Update booking status
-    await bookings_collection.update_one(
-        {"_id": ObjectId(booking_id)},
-        {
-            "$set": {
-                "status": BookingStatus.CANCELLED,
-                "updated_at": datetime.now()
-            }
-        }
-    )
+    # Update booking status (guarded, so a spot is only released once)
+    async with mongo_transaction() as session:
+        result = await bookings_collection.update_one(
+            {
+                "_id": ObjectId(booking_id),
+                "status": {"$in": [BookingStatus.PENDING, BookingStatus.CONFIRMED]}
+            },
+            {
+                "$set": {
+                    "status": BookingStatus.CANCELLED,
+                    "updated_at": datetime.now()
+                }
+            },
+            session=session
+        )
+        if result.modified_count:
+            await release(booking["parking_lot_id"], booking["start_time"],
+                          booking["end_time"], session=session)
+
+    if result.modified_count:
+        occupancy_feed.publish(booking["parking_lot_id"], "cancelled")
 
     return APIResponse(
         status="success",
@@ -536,7 +602,7 @@ async def checkin_parking(
             detail="Invalid booking ID"
         )
 
-    bookings_collection = get_parking_bookings_collection()
+    bookings_collection = parking_bookings_repo.collection
 
     booking = await bookings_collection.find_one({
         "_id": ObjectId(booking_id),
@@ -580,6 +646,7 @@ async def checkin_parking(
             }
         }
     )
+    occupancy_feed.publish(booking["parking_lot_id"], "checked_in")
 
     return APIResponse(
         status="success",
@@ -604,7 +671,7 @@ async def checkout_parking(
             detail="Invalid booking ID"
         )
 
-    bookings_collection = get_parking_bookings_collection()
+    bookings_collection = parking_bookings_repo.collection
 
     booking = await bookings_collection.find_one({
         "_id": ObjectId(booking_id),
@@ -630,8 +697,7 @@ async def checkout_parking(
     actual_duration_hours = (now - actual_start).total_seconds() / 3600
 
     # Get parking lot details for pricing
-    lots_collection = get_parking_lots_collection()
-    lot = await lots_collection.find_one({"_id": booking["parking_lot_id"]})
+    lot = await parking_lots_repo.find_one({"_id": booking["parking_lot_id"]}, "marker")
 
     if not lot:
         raise HTTPException(
@@ -652,18 +718,25 @@ async def checkout_parking(
     else:
         final_amount = booking["total_amount"]
 
-    # Update booking status to completed
-    await bookings_collection.update_one(
-        {"_id": ObjectId(booking_id)},
-        {
-            "$set": {
-                "status": BookingStatus.COMPLETED,
-                "actual_end_time": now,
-                "final_amount": round(final_amount, 2),
-                "updated_at": now
-            }
-        }
-    )
+    # Update booking status to completed and free the unused slots
+    async with mongo_transaction() as session:
+        result = await bookings_collection.update_one(
+            {"_id": ObjectId(booking_id), "status": BookingStatus.ACTIVE},
+            {
+                "$set": {
+                    "status": BookingStatus.COMPLETED,
+                    "actual_end_time": now,
+                    "final_amount": round(final_amount, 2),
+                    "updated_at": now
+                }
+            },
+            session=session
+        )
+        if result.modified_count:
+            await release_after_checkout(booking, now, session=session)
+
+    if result.modified_count:
+        occupancy_feed.publish(booking["parking_lot_id"], "checked_out")
 
     return APIResponse(
         status="success",
@@ -676,24 +749,3 @@ async def checkout_parking(
         }
     )
 
-
-# Helper function for distance calculation
-def calculate_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
-    """
-    Calculate the great circle distance between two points on earth (specified in decimal degrees)
-    Returns distance in kilometers
-    """
-    # Convert decimal degrees to radians
-    lat1, lon1, lat2, lon2 = map(math.radians, [lat1, lon1, lat2, lon2])
-
-    # Haversine formula
-    dlat = lat2 - lat1
-    dlon = lon2 - lon1
-    a = math.sin(dlat/2)**2 + math.cos(lat1) * \
-        math.cos(lat2) * math.sin(dlon/2)**2
-    c = 2 * math.asin(math.sqrt(a))
-
-    # Radius of earth in kilometers
-    r = 6371
-
-    return c * r
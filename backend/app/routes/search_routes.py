@@ -0,0 +1,45 @@
+"""
+Search routes - Type-ahead suggestions across the catalogue
+"""
+
+from fastapi import APIRouter, HTTPException, status, Query
+from typing import List, Optional
+
+from app.models.schemas import APIResponse
+from app.core.responses import EnvelopeRoute
+from app.services.suggest import suggestion_service, SUGGESTION_KINDS
+
+router = APIRouter(route_class=EnvelopeRoute)
+
+
+@router.get("/suggest", response_model=APIResponse)
+async def get_suggestions(
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(8, ge=1, le=20),
+    types: Optional[List[str]] = Query(None)
+):
+    """
+    ## ⚡ Type-ahead Suggestions
+
+    Top completions from product names, brands, categories, parking lots
+    and service centers, ranked by popularity. Served from memory.
+    """
+    if types:
+        unknown = [kind for kind in types if kind not in SUGGESTION_KINDS]
+        if unknown:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Unknown suggestion types: {', '.join(unknown)}"
+            )
+
+    suggestions = suggestion_service.suggest(q, limit, types)
+
+    return APIResponse(
+        success=True,
+        message="Suggestions retrieved successfully",
+        data={
+            "query": q,
+            "suggestions": suggestions,
+            "count": len(suggestions)
+        }
+    )
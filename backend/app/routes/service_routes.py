@@ -6,20 +6,38 @@ from fastapi import APIRouter, HTTPException, status, Depends, Query
 from typing import List, Optional
 from datetime import datetime, timedelta
 from bson import ObjectId
-import math
 
 from app.models.schemas import (
     ServiceCenter, ServiceAppointment, ServiceAppointmentCreate,
     ServiceStatus, APIResponse, User
 )
+from app.core.pagination import sort_spec, DESCENDING
+from app.core.responses import EnvelopeRoute
 from app.core.auth import get_current_user
-from app.database.connection import (
-    get_service_centers_collection,
-    get_service_appointments_collection,
-    get_vehicles_collection
+from app.services.facets import service_brand_counts
+from app.services.center_availability import (
+    invalidate_center_availability,
+    week_availability
+)
+from app.services.appointment_scheduler import (
+    SERVICE_TYPES,
+    SchedulingError,
+    book_slot,
+    next_free_slots,
+    release_slot,
+    service_duration
+)
+from app.services.service_center_index import service_center_index
+from app.services.loaders import enrich_appointments
+from app.database.repositories import (
+    service_appointments_repo,
+    service_centers_repo,
+    vehicles_repo
 )
 
-router = APIRouter()
+router = APIRouter(route_class=EnvelopeRoute)
+
+BRAND_COLLATION = {"locale": "en", "strength": 2}
 
 
 # ===== SERVICE CENTER ROUTES =====
@@ -28,17 +46,20 @@ router = APIRouter()
 async def get_service_centers(
     page: int = Query(1, ge=1),
     limit: int = Query(10, ge=1, le=50),
+    cursor: Optional[str] = None,
+    include_total: Optional[bool] = None,
     search: Optional[str] = None,
     brand: Optional[str] = None,
     service_type: Optional[str] = None,
-    min_rating: Optional[float] = None
+    min_rating: Optional[float] = None,
+    fields: Optional[str] = None
 ):
     """
     ## 🔧 Get Service Centers
 
     Retrieve a paginated list of service centers with filtering options.
     """
-    centers_collection = get_service_centers_collection()
+    selection = service_centers_repo.select(fields)
 
     # Build query filter
     query = {}
@@ -51,8 +72,11 @@ async def get_service_centers(
             {"address": {"$regex": search, "$options": "i"}}
         ]
 
+    # Exact, case-insensitive brand match on the brand_ci index
+    collation = None
     if brand:
-        query["brand"] = {"$regex": brand, "$options": "i"}
+        query["brand"] = brand
+        collation = BRAND_COLLATION
 
     if service_type:
         query["services"] = {"$in": [service_type]}
@@ -60,33 +84,19 @@ async def get_service_centers(
     if min_rating is not None:
         query["rating"] = {"$gte": min_rating}
 
-    # Calculate skip for pagination
-    skip = (page - 1) * limit
-
-    # Get total count
-    total = await centers_collection.count_documents(query)
-
     # Get service centers (highest rating first)
-    cursor = centers_collection.find(query).sort(
-        "rating", -1).skip(skip).limit(limit)
-    centers = await cursor.to_list(length=limit)
-
-    # Convert ObjectIds to strings
-    for center in centers:
-        center["id"] = str(center["_id"])
-        center.pop("_id", None)
+    centers, pagination = await service_centers_repo.page(
+        query, sort_spec("rating", DESCENDING), limit, fields=selection,
+        page=page, cursor=cursor, include_total=include_total,
+        collation=collation
+    )
 
     return APIResponse(
         success=True,
         message="Service centers retrieved successfully",
         data={
-            "centers": centers,
-            "pagination": {
-                "current_page": page,
-                "total_pages": math.ceil(total / limit),
-                "total_items": total,
-                "items_per_page": limit
-            },
+            "centers": selection.trim_many(service_centers_repo.mapper.map_many(centers)),
+            "pagination": pagination,
             "filters_applied": {
                 "search": search,
                 "brand": brand,
@@ -112,35 +122,14 @@ async def get_nearby_service_centers(
 
     Find service centers near a specific location.
     """
-    centers_collection = get_service_centers_collection()
-
-    # Build query
-    query = {}
-    if service_type:
-        query["services"] = {"$in": [service_type]}
-    if brand:
-        query["brand"] = {"$regex": brand, "$options": "i"}
-
-    # Get all centers and calculate distance
-    all_centers = await centers_collection.find(query).to_list(length=None)
-
-    nearby_centers = []
-    for center in all_centers:
-        # Calculate distance using the same function from parking routes
-        distance = calculate_distance(
-            latitude, longitude,
-            center.get("latitude", 0), center.get("longitude", 0)
-        )
-
-        if distance <= radius:
-            center["distance"] = round(distance, 2)
-            center["id"] = str(center["_id"])
-            center.pop("_id", None)
-            nearby_centers.append(center)
-
-    # Sort by distance and limit results
-    nearby_centers.sort(key=lambda x: x["distance"])
-    nearby_centers = nearby_centers[:limit]
+    # Served from the in-memory grid index, no database round trip
+    await service_center_index.ensure_loaded()
+    nearby_centers = service_center_index.nearby(
+        latitude, longitude, radius,
+        service_type=service_type,
+        brand=brand,
+        limit=limit
+    )
 
     return APIResponse(
         success=True,
@@ -154,8 +143,25 @@ async def get_nearby_service_centers(
     )
 
 
+@router.get("/centers/brands", response_model=APIResponse)
+async def get_service_brands():
+    """
+    ## 🏷️ Get Service Brands
+
+    Retrieve all available service center brands.
+    """
+    # Brand counts from a single cached aggregation
+    brand_counts = await service_brand_counts()
+
+    return APIResponse(
+        success=True,
+        message="Service brands retrieved successfully",
+        data={"brands": brand_counts}
+    )
+
+
 @router.get("/centers/{center_id}", response_model=APIResponse)
-async def get_service_center_details(center_id: str):
+async def get_service_center_details(center_id: str, fields: Optional[str] = None):
     """
     ## 🔍 Get Service Center Details
 
@@ -167,87 +173,62 @@ async def get_service_center_details(center_id: str):
             detail="Invalid service center ID"
         )
 
-    centers_collection = get_service_centers_collection()
-    appointments_collection = get_service_appointments_collection()
-
-    center = await centers_collection.find_one({"_id": ObjectId(center_id)})
+    selection = service_centers_repo.select(fields)
+    center = await service_centers_repo.find_one({"_id": ObjectId(center_id)},
+                                                 fields=selection)
     if not center:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Service center not found"
         )
 
-    # Convert ObjectId to string
-    center["id"] = str(center["_id"])
-    center.pop("_id", None)
-
-    # Get availability for next 7 days
-    today = datetime.now().date()
-    availability = []
-
-    for i in range(7):
-        check_date = today + timedelta(days=i)
-        start_of_day = datetime.combine(check_date, datetime.min.time())
-        end_of_day = datetime.combine(check_date, datetime.max.time())
-
-        # Count appointments for this day
-        appointments_count = await appointments_collection.count_documents({
-            "service_center_id": ObjectId(center_id),
-            "appointment_date": {
-                "$gte": start_of_day,
-                "$lte": end_of_day
-            },
-            "status": {"$in": [ServiceStatus.CONFIRMED, ServiceStatus.IN_PROGRESS]}
-        })
-
-        # Assume max 10 appointments per day
-        max_appointments = 10
-        available_slots = max(0, max_appointments - appointments_count)
-
-        availability.append({
-            "date": check_date.isoformat(),
-            "day_name": check_date.strftime("%A"),
-            "available_slots": available_slots,
-            "is_available": available_slots > 0
-        })
-
-    center["availability"] = availability
+    # Free bay time for the next 7 days (one schedule read, briefly cached)
+    if "availability" in selection:
+        center["availability"] = await week_availability(center)
 
     return APIResponse(
         success=True,
         message="Service center details retrieved successfully",
-        data={"center": center}
+        data={"center": selection.trim(service_centers_repo.mapper.map(center))}
     )
 
 
-@router.get("/centers/brands", response_model=APIResponse)
-async def get_service_brands():
+@router.get("/centers/{center_id}/slots", response_model=APIResponse)
+async def get_free_slots(
+    center_id: str,
+    service_type: str = Query(..., min_length=1),
+    count: int = Query(5, ge=1, le=50),
+    after: Optional[datetime] = None
+):
     """
-    ## 🏷️ Get Service Brands
+    ## 🗓️ Get Free Appointment Slots
 
-    Retrieve all available service center brands.
+    Next start times with a bay free for the whole service duration.
     """
-    centers_collection = get_service_centers_collection()
-
-    # Get distinct brands
-    brands = await centers_collection.distinct("brand")
+    if not ObjectId.is_valid(center_id):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid service center ID"
+        )
 
-    # Get brand counts
-    brand_counts = []
-    for brand in brands:
-        count = await centers_collection.count_documents({"brand": brand})
-        brand_counts.append({
-            "name": brand,
-            "count": count
-        })
+    center = await service_centers_repo.find_one({"_id": ObjectId(center_id)}, "schedule")
+    if not center:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Service center not found"
+        )
 
-    # Sort alphabetically
-    brand_counts.sort(key=lambda x: x["name"])
+    slots = await next_free_slots(center, service_type, count, after)
 
     return APIResponse(
         success=True,
-        message="Service brands retrieved successfully",
-        data={"brands": brand_counts}
+        message="Free slots retrieved successfully",
+        data={
+            "service_center_id": center_id,
+            "service_type": service_type,
+            "duration_minutes": service_duration(service_type),
+            "slots": slots
+        }
     )
 
 
@@ -258,55 +239,10 @@ async def get_service_types():
 
     Retrieve all available service types.
     """
+    # Durations are what the appointment scheduler blocks per service
     service_types = [
-        {
-            "name": "Oil Change",
-            "description": "Engine oil and filter replacement",
-            "estimated_duration": "30-45 minutes",
-            "typical_cost": "₹1,500 - ₹3,000"
-        },
-        {
-            "name": "General Service",
-            "description": "Comprehensive vehicle inspection and maintenance",
-            "estimated_duration": "2-3 hours",
-            "typical_cost": "₹3,000 - ₹8,000"
-        },
-        {
-            "name": "Brake Service",
-            "description": "Brake pad and disc inspection/replacement",
-            "estimated_duration": "1-2 hours",
-            "typical_cost": "₹2,000 - ₹10,000"
-        },
-        {
-            "name": "Tire Service",
-            "description": "Tire rotation, alignment, and replacement",
-            "estimated_duration": "1-2 hours",
-            "typical_cost": "₹2,000 - ₹20,000"
-        },
-        {
-            "name": "Battery Service",
-            "description": "Battery testing and replacement",
-            "estimated_duration": "30 minutes",
-            "typical_cost": "₹3,000 - ₹8,000"
-        },
-        {
-            "name": "AC Service",
-            "description": "Air conditioning system maintenance",
-            "estimated_duration": "1-2 hours",
-            "typical_cost": "₹2,000 - ₹6,000"
-        },
-        {
-            "name": "Engine Repair",
-            "description": "Engine diagnostics and repair",
-            "estimated_duration": "4-8 hours",
-            "typical_cost": "₹5,000 - ₹50,000"
-        },
-        {
-            "name": "Transmission Service",
-            "description": "Transmission fluid change and inspection",
-            "estimated_duration": "2-3 hours",
-            "typical_cost": "₹3,000 - ₹15,000"
-        }
+        {**service, "duration_minutes": service_duration(service["name"])}
+        for service in SERVICE_TYPES
     ]
 
     return APIResponse(
@@ -328,9 +264,9 @@ async def create_service_appointment(
 
     Book a service appointment at a service center.
     """
-    centers_collection = get_service_centers_collection()
-    appointments_collection = get_service_appointments_collection()
-    vehicles_collection = get_vehicles_collection()
+    centers_collection = service_centers_repo.collection
+    appointments_collection = service_appointments_repo.collection
+    vehicles_collection = vehicles_repo.collection
 
     # Validate service center exists
     if not ObjectId.is_valid(appointment_data.service_center_id):
@@ -386,21 +322,14 @@ async def create_service_appointment(
             detail="You already have an appointment around this time"
         )
 
-    # Check service center availability
-    same_day_appointments = await appointments_collection.count_documents({
-        "service_center_id": ObjectId(appointment_data.service_center_id),
-        "appointment_date": {
-            "$gte": datetime.combine(appointment_data.appointment_date.date(), datetime.min.time()),
-            "$lte": datetime.combine(appointment_data.appointment_date.date(), datetime.max.time())
-        },
-        "status": {"$in": [ServiceStatus.CONFIRMED, ServiceStatus.IN_PROGRESS]}
-    })
-
-    # Assume max 10 appointments per day
-    if same_day_appointments >= 10:
+    # Take a bay for the whole service duration
+    try:
+        slot = await book_slot(
+            center, appointment_data.appointment_date, appointment_data.service_type)
+    except SchedulingError as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Service center is fully booked for this day"
+            detail=str(e)
         )
 
     # Create appointment
@@ -410,25 +339,25 @@ async def create_service_appointment(
         "vehicle_id": ObjectId(appointment_data.vehicle_id),
         "service_type": appointment_data.service_type,
         "appointment_date": appointment_data.appointment_date,
+        "end_time": slot["end_time"],
+        "bay": slot["bay"],
         "status": ServiceStatus.PENDING,
         "notes": appointment_data.notes,
         "created_at": datetime.now(),
         "updated_at": datetime.now()
     }
 
-    result = await appointments_collection.insert_one(appointment)
-    appointment["id"] = str(result.inserted_id)
-    appointment.pop("_id", None)
-
-    # Convert ObjectIds to strings for response
-    appointment["user_id"] = str(appointment["user_id"])
-    appointment["service_center_id"] = str(appointment["service_center_id"])
-    appointment["vehicle_id"] = str(appointment["vehicle_id"])
+    try:
+        await appointments_collection.insert_one(appointment)
+    except Exception:
+        await release_slot(center["_id"], appointment)
+        raise
+    invalidate_center_availability(appointment["service_center_id"])
 
     return APIResponse(
         success=True,
         message="Service appointment created successfully",
-        data={"appointment": appointment}
+        data={"appointment": service_appointments_repo.mapper.map(appointment)}
     )
 
 
@@ -437,6 +366,8 @@ async def get_user_appointments(
     current_user: User = Depends(get_current_user),
     page: int = Query(1, ge=1),
     limit: int = Query(10, ge=1, le=50),
+    cursor: Optional[str] = None,
+    include_total: Optional[bool] = None,
     status: Optional[ServiceStatus] = None,
     upcoming_only: bool = False
 ):
@@ -445,10 +376,6 @@ async def get_user_appointments(
 
     Retrieve current user's service appointments.
     """
-    appointments_collection = get_service_appointments_collection()
-    centers_collection = get_service_centers_collection()
-    vehicles_collection = get_vehicles_collection()
-
     # Build query
     query = {"user_id": ObjectId(current_user.id)}
 
@@ -458,49 +385,16 @@ async def get_user_appointments(
     if upcoming_only:
         query["appointment_date"] = {"$gte": datetime.now()}
 
-    # Calculate skip for pagination
-    skip = (page - 1) * limit
-
-    # Get total count
-    total = await appointments_collection.count_documents(query)
-
     # Get appointments (most recent first)
-    cursor = appointments_collection.find(query).sort(
-        "appointment_date", -1).skip(skip).limit(limit)
-    appointments = await cursor.to_list(length=limit)
-
-    # Enrich appointments with service center and vehicle details
-    for appointment in appointments:
-        appointment["id"] = str(appointment["_id"])
-        appointment.pop("_id", None)
-
-        # Get service center details
-        center = await centers_collection.find_one({"_id": appointment["service_center_id"]})
-        if center:
-            appointment["service_center"] = {
-                "id": str(center["_id"]),
-                "name": center.get("name"),
-                "brand": center.get("brand"),
-                "location": center.get("location"),
-                "contact_phone": center.get("contact_phone")
-            }
-
-        # Get vehicle details
-        vehicle = await vehicles_collection.find_one({"_id": appointment["vehicle_id"]})
-        if vehicle:
-            appointment["vehicle"] = {
-                "id": str(vehicle["_id"]),
-                "brand": vehicle.get("brand"),
-                "model": vehicle.get("model"),
-                "registration_number": vehicle.get("registration_number")
-            }
+    appointments, pagination = await service_appointments_repo.page(
+        query, sort_spec("appointment_date", DESCENDING), limit, view="detail",
+        page=page, cursor=cursor, include_total=include_total
+    )
 
-        # Convert ObjectIds to strings
-        appointment["user_id"] = str(appointment["user_id"])
-        appointment["service_center_id"] = str(
-            appointment["service_center_id"])
-        appointment["vehicle_id"] = str(appointment["vehicle_id"])
+    # Attach service center and vehicle summaries, one query each
+    await enrich_appointments(appointments, include_vehicle=True)
 
+    for appointment in appointments:
         # Add time remaining for upcoming appointments
         if appointment["appointment_date"] > datetime.now():
             time_diff = appointment["appointment_date"] - datetime.now()
@@ -514,13 +408,8 @@ async def get_user_appointments(
         success=True,
         message="Appointments retrieved successfully",
         data={
-            "appointments": appointments,
-            "pagination": {
-                "current_page": page,
-                "total_pages": math.ceil(total / limit),
-                "total_items": total,
-                "items_per_page": limit
-            }
+            "appointments": service_appointments_repo.mapper.map_many(appointments),
+            "pagination": pagination
         }
     )
 
@@ -541,11 +430,7 @@ async def get_appointment_details(
             detail="Invalid appointment ID"
         )
 
-    appointments_collection = get_service_appointments_collection()
-    centers_collection = get_service_centers_collection()
-    vehicles_collection = get_vehicles_collection()
-
-    appointment = await appointments_collection.find_one({
+    appointment = await service_appointments_repo.find_one({
         "_id": ObjectId(appointment_id),
         "user_id": ObjectId(current_user.id)
     })
@@ -557,32 +442,18 @@ async def get_appointment_details(
         )
 
     # Enrich with service center and vehicle details
-    appointment["id"] = str(appointment["_id"])
-    appointment.pop("_id", None)
-
-    # Get service center details
-    center = await centers_collection.find_one({"_id": appointment["service_center_id"]})
+    center = await service_centers_repo.find_one({"_id": appointment["service_center_id"]})
     if center:
-        center["id"] = str(center["_id"])
-        center.pop("_id", None)
-        appointment["service_center"] = center
+        appointment["service_center"] = service_centers_repo.mapper.map(center)
 
-    # Get vehicle details
-    vehicle = await vehicles_collection.find_one({"_id": appointment["vehicle_id"]})
+    vehicle = await vehicles_repo.find_one({"_id": appointment["vehicle_id"]})
     if vehicle:
-        vehicle["id"] = str(vehicle["_id"])
-        vehicle.pop("_id", None)
-        appointment["vehicle"] = vehicle
-
-    # Convert ObjectIds to strings
-    appointment["user_id"] = str(appointment["user_id"])
-    appointment["service_center_id"] = str(appointment["service_center_id"])
-    appointment["vehicle_id"] = str(appointment["vehicle_id"])
+        appointment["vehicle"] = vehicles_repo.mapper.map(vehicle)
 
     return APIResponse(
         success=True,
         message="Appointment details retrieved successfully",
-        data={"appointment": appointment}
+        data={"appointment": service_appointments_repo.mapper.map(appointment)}
     )
 
 
@@ -602,7 +473,7 @@ async def cancel_appointment(
             detail="Invalid appointment ID"
         )
 
-    appointments_collection = get_service_appointments_collection()
+    appointments_collection = service_appointments_repo.collection
 
     appointment = await appointments_collection.find_one({
         "_id": ObjectId(appointment_id),
@@ -630,9 +501,12 @@ async def cancel_appointment(
             detail="Cannot cancel appointment less than 2 hours before scheduled time"
         )
 
-    # Update appointment status
-    await appointments_collection.update_one(
-        {"_id": ObjectId(appointment_id)},
+    # Update appointment status (guarded, so the bay is freed only once)
+    result = await appointments_collection.update_one(
+        {
+            "_id": ObjectId(appointment_id),
+            "status": {"$in": [ServiceStatus.PENDING, ServiceStatus.CONFIRMED]}
+        },
         {
             "$set": {
                 "status": ServiceStatus.CANCELLED,
@@ -641,6 +515,9 @@ async def cancel_appointment(
             }
         }
     )
+    if result.modified_count:
+        await release_slot(appointment["service_center_id"], appointment)
+    invalidate_center_availability(appointment["service_center_id"])
 
     return APIResponse(
         success=True,
@@ -666,7 +543,7 @@ async def reschedule_appointment(
             detail="Invalid appointment ID"
         )
 
-    appointments_collection = get_service_appointments_collection()
+    appointments_collection = service_appointments_repo.collection
 
     appointment = await appointments_collection.find_one({
         "_id": ObjectId(appointment_id),
@@ -693,34 +570,56 @@ async def reschedule_appointment(
             detail="Cannot reschedule to a past date"
         )
 
-    # Check availability at service center for new date
-    same_day_appointments = await appointments_collection.count_documents({
-        "service_center_id": appointment["service_center_id"],
-        # Exclude current appointment
-        "_id": {"$ne": ObjectId(appointment_id)},
-        "appointment_date": {
-            "$gte": datetime.combine(new_appointment_date.date(), datetime.min.time()),
-            "$lte": datetime.combine(new_appointment_date.date(), datetime.max.time())
-        },
-        "status": {"$in": [ServiceStatus.CONFIRMED, ServiceStatus.IN_PROGRESS]}
-    })
+    # Take a bay at the new time before giving up the old one
+    center = await service_centers_repo.find_one(
+        {"_id": appointment["service_center_id"]}, "schedule")
+    if not center:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Service center not found"
+        )
 
-    if same_day_appointments >= 10:
+    try:
+        slot = await book_slot(center, new_appointment_date, appointment["service_type"])
+    except SchedulingError as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Service center is fully booked for the requested date"
+            detail=str(e)
         )
-
-    # Update appointment
-    await appointments_collection.update_one(
-        {"_id": ObjectId(appointment_id)},
-        {
-            "$set": {
-                "appointment_date": new_appointment_date,
-                "updated_at": datetime.now()
+    new_slot = {"appointment_date": new_appointment_date, **slot}
+
+    # Move the appointment only if nobody cancelled or moved it meanwhile,
+    # so the old bay is freed exactly once
+    try:
+        result = await appointments_collection.update_one(
+            {
+                "_id": ObjectId(appointment_id),
+                "status": {"$in": [ServiceStatus.PENDING, ServiceStatus.CONFIRMED]},
+                "appointment_date": appointment["appointment_date"],
+                "bay": appointment.get("bay")
+            },
+            {
+                "$set": {
+                    "appointment_date": new_appointment_date,
+                    "end_time": slot["end_time"],
+                    "bay": slot["bay"],
+                    "updated_at": datetime.now()
+                }
             }
-        }
-    )
+        )
+    except Exception:
+        await release_slot(center["_id"], new_slot)
+        raise
+
+    if not result.modified_count:
+        await release_slot(center["_id"], new_slot)
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Appointment was changed by another request; please retry"
+        )
+
+    await release_slot(center["_id"], appointment)
+    invalidate_center_availability(appointment["service_center_id"])
 
     return APIResponse(
         success=True,
@@ -731,26 +630,3 @@ async def reschedule_appointment(
         }
     )
 
-
-# Helper function for distance calculation (same as in parking routes)
-def calculate_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
-    """
-    Calculate the great circle distance between two points on earth (specified in decimal degrees)
-    Returns distance in kilometers
-    """
-    import math
-
-    # Convert decimal degrees to radians
-    lat1, lon1, lat2, lon2 = map(math.radians, [lat1, lon1, lat2, lon2])
-
-    # Haversine formula
-    dlat = lat2 - lat1
-    dlon = lon2 - lon1
-    a = math.sin(dlat/2)**2 + math.cos(lat1) * \
-        math.cos(lat2) * math.sin(dlon/2)**2
-    c = 2 * math.asin(math.sqrt(a))
-
-    # Radius of earth in kilometers
-    r = 6371
-
-    return c * r
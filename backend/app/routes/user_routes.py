@@ -5,10 +5,12 @@ User management routes - Profile, Update profile, etc.
 from fastapi import APIRouter, HTTPException, status, Depends
 from app.models.schemas import User, UserUpdate, APIResponse
 from app.core.auth import get_current_user
+from app.core.responses import EnvelopeRoute
+from app.core.user_cache import invalidate_user
 from app.database.connection import get_users_collection
 from datetime import datetime
 
-router = APIRouter()
+router = APIRouter(route_class=EnvelopeRoute)
 
 
 @router.get("/profile", response_model=APIResponse)
@@ -63,6 +65,9 @@ async def update_user_profile(
             detail="No changes were made"
         )
 
+    # Cached principals must not serve the old profile
+    await invalidate_user(current_user.id)
+
     return APIResponse(
         success=True,
         message="Profile updated successfully"
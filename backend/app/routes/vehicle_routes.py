@@ -6,16 +6,23 @@ from fastapi import APIRouter, HTTPException, status, Depends, Query
 from typing import List, Optional
 from datetime import datetime
 from bson import ObjectId
-import math
+import asyncio
 import re
 
 from app.models.schemas import (
     Vehicle, VehicleCreate, VehicleType, APIResponse, User
 )
+from app.core.pagination import sort_spec, DESCENDING
+from app.core.responses import EnvelopeRoute
 from app.core.auth import get_current_user
-from app.database.connection import get_vehicles_collection
+from app.database.repositories import (
+    parking_bookings_repo,
+    service_appointments_repo,
+    vehicles_repo
+)
+from app.services.loaders import enrich_bookings, enrich_appointments
 
-router = APIRouter()
+router = APIRouter(route_class=EnvelopeRoute)
 
 
 @router.post("/", response_model=APIResponse)
@@ -28,7 +35,7 @@ async def register_vehicle(
 
     Register a new vehicle for the current user.
     """
-    vehicles_collection = get_vehicles_collection()
+    vehicles_collection = vehicles_repo.collection
 
     # Validate registration number format (basic Indian format)
     registration_pattern = r'^[A-Z]{2}[0-9]{1,2}[A-Z]{1,2}[0-9]{4}$'
@@ -67,17 +74,12 @@ async def register_vehicle(
     })
 
     # Insert vehicle
-    result = await vehicles_collection.insert_one(vehicle_dict)
-
-    # Prepare response
-    vehicle_dict["id"] = str(result.inserted_id)
-    vehicle_dict.pop("_id", None)
-    vehicle_dict["user_id"] = str(vehicle_dict["user_id"])
+    await vehicles_collection.insert_one(vehicle_dict)
 
     return APIResponse(
         success=True,
         message="Vehicle registered successfully",
-        data={"vehicle": vehicle_dict}
+        data={"vehicle": vehicles_repo.mapper.map(vehicle_dict)}
     )
 
 
@@ -86,48 +88,35 @@ async def get_user_vehicles(
     current_user: User = Depends(get_current_user),
     page: int = Query(1, ge=1),
     limit: int = Query(10, ge=1, le=50),
-    vehicle_type: Optional[VehicleType] = None
+    cursor: Optional[str] = None,
+    include_total: Optional[bool] = None,
+    vehicle_type: Optional[VehicleType] = None,
+    fields: Optional[str] = None
 ):
     """
     ## 🚗 Get User Vehicles
 
     Retrieve all vehicles registered by the current user.
     """
-    vehicles_collection = get_vehicles_collection()
+    selection = vehicles_repo.select(fields)
 
     # Build query
     query = {"user_id": ObjectId(current_user.id)}
     if vehicle_type:
         query["vehicle_type"] = vehicle_type
 
-    # Calculate skip for pagination
-    skip = (page - 1) * limit
-
-    # Get total count
-    total = await vehicles_collection.count_documents(query)
-
     # Get vehicles (most recent first)
-    cursor = vehicles_collection.find(query).sort(
-        "created_at", -1).skip(skip).limit(limit)
-    vehicles = await cursor.to_list(length=limit)
-
-    # Convert ObjectIds to strings
-    for vehicle in vehicles:
-        vehicle["id"] = str(vehicle["_id"])
-        vehicle.pop("_id", None)
-        vehicle["user_id"] = str(vehicle["user_id"])
+    vehicles, pagination = await vehicles_repo.page(
+        query, sort_spec("created_at", DESCENDING), limit, view="detail",
+        fields=selection, page=page, cursor=cursor, include_total=include_total
+    )
 
     return APIResponse(
         success=True,
         message="Vehicles retrieved successfully",
         data={
-            "vehicles": vehicles,
-            "pagination": {
-                "current_page": page,
-                "total_pages": math.ceil(total / limit),
-                "total_items": total,
-                "items_per_page": limit
-            }
+            "vehicles": selection.trim_many(vehicles_repo.mapper.map_many(vehicles)),
+            "pagination": pagination
         }
     )
 
@@ -135,7 +124,8 @@ async def get_user_vehicles(
 @router.get("/{vehicle_id}", response_model=APIResponse)
 async def get_vehicle_details(
     vehicle_id: str,
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    fields: Optional[str] = None
 ):
     """
     ## 🔍 Get Vehicle Details
@@ -148,12 +138,11 @@ async def get_vehicle_details(
             detail="Invalid vehicle ID"
         )
 
-    vehicles_collection = get_vehicles_collection()
-
-    vehicle = await vehicles_collection.find_one({
+    selection = vehicles_repo.select(fields)
+    vehicle = await vehicles_repo.find_one({
         "_id": ObjectId(vehicle_id),
         "user_id": ObjectId(current_user.id)
-    })
+    }, fields=selection)
 
     if not vehicle:
         raise HTTPException(
@@ -161,19 +150,17 @@ async def get_vehicle_details(
             detail="Vehicle not found"
         )
 
-    # Convert ObjectIds to strings
-    vehicle["id"] = str(vehicle["_id"])
-    vehicle.pop("_id", None)
-    vehicle["user_id"] = str(vehicle["user_id"])
+    vehicle = vehicles_repo.mapper.map(vehicle)
 
     # Add computed fields
-    current_year = datetime.now().year
-    vehicle["age"] = current_year - vehicle["year"]
+    if "age" in selection:
+        current_year = datetime.now().year
+        vehicle["age"] = current_year - vehicle["year"]
 
     return APIResponse(
         success=True,
         message="Vehicle details retrieved successfully",
-        data={"vehicle": vehicle}
+        data={"vehicle": selection.trim(vehicle)}
     )
 
 
@@ -194,7 +181,7 @@ async def update_vehicle(
             detail="Invalid vehicle ID"
         )
 
-    vehicles_collection = get_vehicles_collection()
+    vehicles_collection = vehicles_repo.collection
 
     # Check if vehicle exists and belongs to user
     existing_vehicle = await vehicles_collection.find_one({
@@ -234,14 +221,11 @@ async def update_vehicle(
 
     # Get updated vehicle
     updated_vehicle = await vehicles_collection.find_one({"_id": ObjectId(vehicle_id)})
-    updated_vehicle["id"] = str(updated_vehicle["_id"])
-    updated_vehicle.pop("_id", None)
-    updated_vehicle["user_id"] = str(updated_vehicle["user_id"])
 
     return APIResponse(
         success=True,
         message="Vehicle updated successfully",
-        data={"vehicle": updated_vehicle}
+        data={"vehicle": vehicles_repo.mapper.map(updated_vehicle)}
     )
 
 
@@ -261,7 +245,7 @@ async def delete_vehicle(
             detail="Invalid vehicle ID"
         )
 
-    vehicles_collection = get_vehicles_collection()
+    vehicles_collection = vehicles_repo.collection
 
     # Check if vehicle exists and belongs to user
     vehicle = await vehicles_collection.find_one({
@@ -340,19 +324,14 @@ async def search_by_registration(
 
     Search for a vehicle by registration number (user's vehicles only).
     """
-    vehicles_collection = get_vehicles_collection()
+    vehicles_collection = vehicles_repo.collection
 
     # Search in user's vehicles only
     vehicles = await vehicles_collection.find({
         "user_id": ObjectId(current_user.id),
         "registration_number": {"$regex": registration.upper(), "$options": "i"}
     }).to_list(length=10)
-
-    # Convert ObjectIds to strings
-    for vehicle in vehicles:
-        vehicle["id"] = str(vehicle["_id"])
-        vehicle.pop("_id", None)
-        vehicle["user_id"] = str(vehicle["user_id"])
+    vehicles = vehicles_repo.mapper.map_many(vehicles)
 
     return APIResponse(
         success=True,
@@ -383,7 +362,7 @@ async def get_vehicle_history(
             detail="Invalid vehicle ID"
         )
 
-    vehicles_collection = get_vehicles_collection()
+    vehicles_collection = vehicles_repo.collection
 
     # Verify vehicle belongs to user
     vehicle = await vehicles_collection.find_one({
@@ -397,41 +376,30 @@ async def get_vehicle_history(
             detail="Vehicle not found"
         )
 
-    # Import here to avoid circular imports
-    from app.database.connection import (
-        get_parking_bookings_collection,
-        get_service_appointments_collection
-    )
-
-    bookings_collection = get_parking_bookings_collection()
-    appointments_collection = get_service_appointments_collection()
-
     # Get parking bookings
-    bookings = await bookings_collection.find({
-        "vehicle_id": ObjectId(vehicle_id)
-    }).sort("created_at", -1).limit(5).to_list(length=5)
+    bookings = await parking_bookings_repo.find_many(
+        {"vehicle_id": ObjectId(vehicle_id)}, "card",
+        sort=[("created_at", -1)], limit=5
+    )
 
     # Get service appointments
-    appointments = await appointments_collection.find({
-        "vehicle_id": ObjectId(vehicle_id)
-    }).sort("created_at", -1).limit(5).to_list(length=5)
+    appointments = await service_appointments_repo.find_many(
+        {"vehicle_id": ObjectId(vehicle_id)}, "detail",
+        sort=[("created_at", -1)], limit=5
+    )
+
+    # Attach parking lot and service center summaries, one query each
+    await asyncio.gather(
+        enrich_bookings(bookings, include_vehicle=False),
+        enrich_appointments(appointments)
+    )
 
-    # Convert ObjectIds to strings
+    bookings = parking_bookings_repo.mapper.map_many(bookings)
     for booking in bookings:
-        booking["id"] = str(booking["_id"])
-        booking.pop("_id", None)
-        booking["user_id"] = str(booking["user_id"])
-        booking["parking_lot_id"] = str(booking["parking_lot_id"])
-        booking["vehicle_id"] = str(booking["vehicle_id"])
         booking["type"] = "parking"
 
+    appointments = service_appointments_repo.mapper.map_many(appointments)
     for appointment in appointments:
-        appointment["id"] = str(appointment["_id"])
-        appointment.pop("_id", None)
-        appointment["user_id"] = str(appointment["user_id"])
-        appointment["service_center_id"] = str(
-            appointment["service_center_id"])
-        appointment["vehicle_id"] = str(appointment["vehicle_id"])
         appointment["type"] = "service"
 
     # Combine and sort by date
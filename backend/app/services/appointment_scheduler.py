@@ -0,0 +1,427 @@
+"""
+Service appointment scheduler - bays, working hours and slot bitmaps
+
+A center's day is split into SERVICE_SLOT_MINUTES slots. Each bay of a
+center has one schedule document per day whose `mask` has a bit set for
+every taken slot:
+    {"center_id": ObjectId, "day": datetime, "bay": int, "mask": int}
+Booking a service sets the run of bits its duration needs with a single
+update guarded by $bitsAllClear, so two requests can never take the same
+bay time; free slots are found by scanning the bitmaps of a few days in
+memory with plain integer operations.
+
+The bitmaps are seeded from existing appointments once, at the first
+startup that finds no "service_schedule_seeded" job marker; appointments
+booked before bays existed are given the first bay free at their time.
+Rebuild them by hand (from backend/):
+    python -m app.services.appointment_scheduler [--center CENTER_ID] [--since YYYY-MM-DD]
+"""
+
+import argparse
+import asyncio
+import logging
+import math
+import re
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from bson import ObjectId
+from bson.int64 import Int64
+from pymongo import UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+from app.core.config import get_settings
+from app.database.connection import (
+    close_db,
+    get_service_schedule_collection,
+    init_db
+)
+from app.database.repositories import (
+    service_appointments_repo,
+    service_centers_repo
+)
+from app.models.schemas import ServiceStatus
+from app.services.leases import run_once
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+SLOT = timedelta(minutes=settings.SERVICE_SLOT_MINUTES)
+SLOTS_PER_DAY = (24 * 60) // settings.SERVICE_SLOT_MINUTES
+FULL_DAY = (1 << SLOTS_PER_DAY) - 1
+
+DEFAULT_DURATION_MINUTES = 60
+DAY_NAMES = ["monday", "tuesday", "wednesday", "thursday", "friday",
+             "saturday", "sunday"]
+TIME_FORMATS = ["%H:%M", "%H", "%I:%M %p", "%I %p", "%I:%M%p", "%I%p"]
+
+# Appointments in these states keep their bay time
+HOLDING_STATUSES = [ServiceStatus.PENDING, ServiceStatus.CONFIRMED,
+                    ServiceStatus.IN_PROGRESS]
+
+SERVICE_TYPES = [
+    {
+        "name": "Oil Change",
+        "description": "Engine oil and filter replacement",
+        "estimated_duration": "30-45 minutes",
+        "typical_cost": "₹1,500 - ₹3,000"
+    },
+    {
+        "name": "General Service",
+        "description": "Comprehensive vehicle inspection and maintenance",
+        "estimated_duration": "2-3 hours",
+        "typical_cost": "₹3,000 - ₹8,000"
+    },
+    {
+        "name": "Brake Service",
+        "description": "Brake pad and disc inspection/replacement",
+        "estimated_duration": "1-2 hours",
+        "typical_cost": "₹2,000 - ₹10,000"
+    },
+    {
+        "name": "Tire Service",
+        "description": "Tire rotation, alignment, and replacement",
+        "estimated_duration": "1-2 hours",
+        "typical_cost": "₹2,000 - ₹20,000"
+    },
+    {
+        "name": "Battery Service",
+        "description": "Battery testing and replacement",
+        "estimated_duration": "30 minutes",
+        "typical_cost": "₹3,000 - ₹8,000"
+    },
+    {
+        "name": "AC Service",
+        "description": "Air conditioning system maintenance",
+        "estimated_duration": "1-2 hours",
+        "typical_cost": "₹2,000 - ₹6,000"
+    },
+    {
+        "name": "Engine Repair",
+        "description": "Engine diagnostics and repair",
+        "estimated_duration": "4-8 hours",
+        "typical_cost": "₹5,000 - ₹50,000"
+    },
+    {
+        "name": "Transmission Service",
+        "description": "Transmission fluid change and inspection",
+        "estimated_duration": "2-3 hours",
+        "typical_cost": "₹3,000 - ₹15,000"
+    }
+]
+
+
+class SchedulingError(Exception):
+    """The requested appointment time cannot be booked"""
+
+
+class SlotUnavailableError(SchedulingError):
+    """Every bay is taken for part of the requested time"""
+
+
+def parse_duration(estimate: str) -> int:
+    """Upper bound of an estimate such as "30-45 minutes" or "2-3 hours", in minutes"""
+    match = re.match(r"\s*(\d+)(?:\s*-\s*(\d+))?\s*(minute|min|hour|hr)", estimate.lower())
+    if not match:
+        return DEFAULT_DURATION_MINUTES
+    amount = int(match.group(2) or match.group(1))
+    return amount * 60 if match.group(3) in ("hour", "hr") else amount
+
+
+SERVICE_DURATIONS: Dict[str, int] = {
+    service["name"].lower(): parse_duration(service["estimated_duration"])
+    for service in SERVICE_TYPES
+}
+
+
+def service_duration(service_type: str) -> int:
+    """Minutes to block for a service type"""
+    return SERVICE_DURATIONS.get((service_type or "").strip().lower(),
+                                 DEFAULT_DURATION_MINUTES)
+
+
+def slots_needed(service_type: str) -> int:
+    return math.ceil(service_duration(service_type) / settings.SERVICE_SLOT_MINUTES)
+
+
+def bay_count(center: dict) -> int:
+    return center.get("bays") or settings.SERVICE_CENTER_DEFAULT_BAYS
+
+
+def day_start(day: date) -> datetime:
+    return datetime.combine(day, datetime.min.time())
+
+
+def _minutes(text: str) -> int:
+    text = text.strip().upper()
+    for fmt in TIME_FORMATS:
+        try:
+            parsed = datetime.strptime(text, fmt)
+            return parsed.hour * 60 + parsed.minute
+        except ValueError:
+            continue
+    raise ValueError(f"Unrecognised time: {text}")
+
+
+def parse_hours(hours: str) -> int:
+    """Mask of slots fully inside hours like "09:00-18:00" or "9 AM - 1 PM, 2 PM - 6 PM" """
+    hours = hours.strip().lower()
+    if hours in ("", "closed"):
+        return 0
+    if hours in ("24 hours", "24/7", "open 24 hours"):
+        return FULL_DAY
+
+    mask = 0
+    for part in hours.split(","):
+        opens, closes = part.split("-")
+        first = math.ceil(_minutes(opens) / settings.SERVICE_SLOT_MINUTES)
+        closing = _minutes(closes)
+        last = (closing or 24 * 60) // settings.SERVICE_SLOT_MINUTES
+        if last > first:
+            mask |= ((1 << (last - first)) - 1) << first
+    return mask & FULL_DAY
+
+
+def open_mask(center: dict, day: date) -> int:
+    """Slots a center is open on a day, from opening_hours keyed by weekday"""
+    name = DAY_NAMES[day.weekday()]
+    hours = None
+    for key, value in (center.get("opening_hours") or {}).items():
+        key = key.strip().lower()
+        if key in (name, name[:3]):
+            hours = value
+            break
+    if hours is None:
+        hours = (center.get("opening_hours") or {}).get(
+            "default", settings.SERVICE_CENTER_DEFAULT_HOURS)
+
+    try:
+        return parse_hours(hours)
+    except ValueError:
+        return parse_hours(settings.SERVICE_CENTER_DEFAULT_HOURS)
+
+
+def slot_block(center: dict, start: datetime, service_type: str) -> Tuple[datetime, int]:
+    """The day and bit run a booking at `start` needs, or SchedulingError"""
+    offset = start - day_start(start.date())
+    if offset % SLOT:
+        raise SchedulingError(
+            f"Appointments start on {settings.SERVICE_SLOT_MINUTES}-minute boundaries")
+
+    first = offset // SLOT
+    need = slots_needed(service_type)
+    if first + need > SLOTS_PER_DAY:
+        raise SchedulingError("The service would run past the end of the day")
+
+    block = ((1 << need) - 1) << first
+    if open_mask(center, start.date()) & block != block:
+        raise SchedulingError("The service center is closed for part of that time")
+    return day_start(start.date()), block
+
+
+async def _claim(center_id: ObjectId, day: datetime, bay: int, block: int) -> bool:
+    """Set a run of bits in one bay's day mask if they are all still clear"""
+    schedule = get_service_schedule_collection()
+    query = {"center_id": center_id, "day": day, "bay": bay,
+             "mask": {"$bitsAllClear": Int64(block)}}
+    update = {"$bit": {"mask": {"or": Int64(block)}}}
+    try:
+        await schedule.update_one(query, update, upsert=True)
+        return True
+    except DuplicateKeyError:
+        # The bay-day exists and clashes, or another request just created it
+        result = await schedule.update_one(query, update)
+        return result.modified_count == 1
+
+
+async def book_slot(center: dict, start: datetime, service_type: str) -> dict:
+    """Atomically take the first bay free for the whole service"""
+    day, block = slot_block(center, start, service_type)
+    for bay in range(1, bay_count(center) + 1):
+        if await _claim(center["_id"], day, bay, block):
+            return {
+                "bay": bay,
+                "duration_minutes": service_duration(service_type),
+                "end_time": start + SLOT * slots_needed(service_type)
+            }
+    raise SlotUnavailableError("No bay is free for the requested time")
+
+
+async def release_slot(center_id: ObjectId, appointment: dict):
+    """Clear the bits an appointment holds (no-op for unscheduled ones)"""
+    if not appointment.get("bay") or not appointment.get("end_time"):
+        return
+    start = appointment["appointment_date"]
+    first = (start - day_start(start.date())) // SLOT
+    need = math.ceil((appointment["end_time"] - start) / SLOT)
+    block = ((1 << need) - 1) << first
+    await get_service_schedule_collection().update_one(
+        {"center_id": center_id, "day": day_start(start.date()),
+         "bay": appointment["bay"]},
+        {"$bit": {"mask": {"and": Int64(FULL_DAY ^ block)}}}
+    )
+
+
+async def next_free_slots(center: dict, service_type: str, count: int,
+                          after: Optional[datetime] = None) -> List[dict]:
+    """The next `count` start times with a bay free for the whole service"""
+    after = after or datetime.now()
+    need = slots_needed(service_type)
+    run = (1 << need) - 1
+    bays = bay_count(center)
+    horizon = settings.SERVICE_BOOKING_HORIZON_DAYS
+
+    first_day = after.date()
+    docs = await get_service_schedule_collection().find(
+        {
+            "center_id": center["_id"],
+            "day": {"$gte": day_start(first_day),
+                    "$lt": day_start(first_day + timedelta(days=horizon))}
+        },
+        {"day": 1, "bay": 1, "mask": 1}
+    ).to_list(length=None)
+    masks = {(doc["day"], doc["bay"]): doc["mask"] for doc in docs}
+
+    slots = []
+    for offset in range(horizon):
+        day = first_day + timedelta(days=offset)
+        midnight = day_start(day)
+        opened = open_mask(center, day)
+        if not opened:
+            continue
+
+        first_slot = 0
+        if offset == 0:
+            first_slot = math.ceil((after - midnight) / SLOT)
+
+        for index in range(first_slot, SLOTS_PER_DAY - need + 1):
+            block = run << index
+            if opened & block != block:
+                continue
+            for bay in range(1, bays + 1):
+                if masks.get((midnight, bay), 0) & block == 0:
+                    start = midnight + SLOT * index
+                    slots.append({
+                        "start_time": start,
+                        "end_time": start + SLOT * need,
+                        "bay": bay
+                    })
+                    break
+            if len(slots) >= count:
+                return slots
+    return slots
+
+
+def _holds_bay(appointment: dict) -> bool:
+    return bool(appointment.get("bay") and appointment.get("end_time"))
+
+
+def _held_block(appointment: dict) -> Tuple[datetime, int, datetime]:
+    """Day, bit run and slot-aligned end an existing appointment occupies"""
+    start = appointment["appointment_date"]
+    midnight = day_start(start.date())
+    first = (start - midnight) // SLOT
+    if _holds_bay(appointment):
+        need = math.ceil((appointment["end_time"] - start) / SLOT)
+    else:
+        need = slots_needed(appointment.get("service_type"))
+    need = max(min(need, SLOTS_PER_DAY - first), 1)
+    return midnight, ((1 << need) - 1) << first, midnight + SLOT * (first + need)
+
+
+async def rebuild(center_ids: Optional[Iterable[ObjectId]] = None,
+                  since: Optional[datetime] = None) -> int:
+    """
+    Recompute bay bitmaps from appointments on or after `since` (start of
+    today by default). Appointments without a bay get the first one clear
+    at their time (bay 1 if all clash) and have bay and end_time stored.
+    Bitmaps are replaced wholesale, so run it while bookings are quiet.
+    Returns the number of bay-day documents written.
+    """
+    since = day_start((since or datetime.now()).date())
+    schedule = get_service_schedule_collection()
+    appointments_collection = service_appointments_repo.collection
+
+    query = {
+        "status": {"$in": HOLDING_STATUSES},
+        "appointment_date": {"$gte": since}
+    }
+    scope = {"day": {"$gte": since}}
+    if center_ids is not None:
+        center_ids = list(center_ids)
+        query["service_center_id"] = {"$in": center_ids}
+        scope["center_id"] = {"$in": center_ids}
+
+    appointments = await appointments_collection.find(query, {
+        "service_center_id": 1, "appointment_date": 1, "end_time": 1,
+        "bay": 1, "service_type": 1
+    }).sort("appointment_date", 1).to_list(length=None)
+
+    centers = await service_centers_repo.collection.find(
+        {"_id": {"$in": list({a["service_center_id"] for a in appointments})}},
+        {"bays": 1}
+    ).to_list(length=None)
+    bays = {center["_id"]: bay_count(center) for center in centers}
+
+    masks: Dict[Tuple[ObjectId, datetime, int], int] = {}
+    assigned = []
+    # Appointments that already hold a bay keep it; the rest fill around them
+    for appointment in sorted(appointments, key=lambda a: not _holds_bay(a)):
+        center_id = appointment["service_center_id"]
+        day, block, end_time = _held_block(appointment)
+        bay = appointment["bay"] if _holds_bay(appointment) else None
+        if bay is None:
+            bay = next(
+                (b for b in range(1, bays.get(center_id, bay_count({})) + 1)
+                 if not masks.get((center_id, day, b), 0) & block),
+                None)
+            if bay is None:
+                logger.warning(
+                    f"Appointment {appointment['_id']} overlaps every bay; placed in bay 1")
+                bay = 1
+            assigned.append(UpdateOne(
+                {"_id": appointment["_id"], "bay": appointment.get("bay")},
+                {"$set": {"bay": bay, "end_time": end_time}}
+            ))
+        key = (center_id, day, bay)
+        masks[key] = masks.get(key, 0) | block
+
+    await schedule.delete_many(scope)
+    if masks:
+        await schedule.insert_many([
+            {"center_id": center_id, "day": day, "bay": bay, "mask": Int64(mask)}
+            for (center_id, day, bay), mask in masks.items()
+        ], ordered=False)
+    if assigned:
+        await appointments_collection.bulk_write(assigned, ordered=False)
+    return len(masks)
+
+
+async def ensure_schedule_built() -> bool:
+    """Seed the bay bitmaps from appointments unless a previous start already did"""
+    return await run_once("service_schedule_seeded", rebuild)
+
+
+async def _rebuild_command(center_id: Optional[str], since: Optional[str]):
+    await init_db()
+    try:
+        written = await rebuild(
+            [ObjectId(center_id)] if center_id else None,
+            datetime.fromisoformat(since) if since else None
+        )
+        print(f"Rebuilt {written} bay schedules")
+    finally:
+        await close_db()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Rebuild service bay bitmaps from appointments")
+    parser.add_argument("--center", help="Only rebuild this service center id")
+    parser.add_argument("--since", help="First day to rebuild (YYYY-MM-DD)")
+    args = parser.parse_args()
+    asyncio.run(_rebuild_command(args.center, args.since))
+
+
+if __name__ == "__main__":
+    main()
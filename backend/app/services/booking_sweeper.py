@@ -0,0 +1,149 @@
+"""
+Background sweeper that expires unpaid pending parking bookings
+
+Only bookings still awaiting payment are expired. The job is off until
+BOOKING_SWEEP_ENABLED is set, which belongs with a payment flow that
+confirms bookings; without one every booking would look abandoned.
+
+Runs on an APScheduler interval job. Each run takes a short lease in the
+job_leases collection so only one worker sweeps at a time, and claims
+bookings in batches with a status-guarded update_many that stamps a
+sweep id; only bookings carrying this run's stamp have their capacity
+released, so no booking is ever released twice.
+"""
+
+import logging
+import uuid
+from datetime import datetime, timedelta
+from typing import Optional
+
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+
+from app.core.config import get_settings
+from app.database.repositories import parking_bookings_repo
+from app.models.schemas import BookingStatus, PaymentStatus
+from app.services.leases import acquire_lease, release_lease
+from app.services.occupancy import release_many
+from app.services.occupancy_feed import occupancy_feed
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+LEASE_NAME = "parking_booking_sweeper"
+
+_sweeper_metrics = {
+    "last_run": None,
+    "last_swept": 0,
+    "total_swept": 0,
+    "skipped_runs": 0
+}
+
+
+async def expire_pending_bookings(now: Optional[datetime] = None) -> int:
+    """Expire pending bookings past the hold window; returns how many"""
+    now = now or datetime.now()
+    cutoff = now - timedelta(minutes=settings.PENDING_BOOKING_HOLD_MINUTES)
+    batch_size = settings.BOOKING_SWEEP_BATCH_SIZE
+    bookings_collection = parking_bookings_repo.collection
+
+    swept = 0
+    while True:
+        # Oldest first, on the (status, created_at) index
+        candidates = await bookings_collection.find(
+            {
+                "status": BookingStatus.PENDING,
+                "payment_status": PaymentStatus.PENDING,
+                "created_at": {"$lt": cutoff}
+            },
+            {"_id": 1}
+        ).sort("created_at", 1).limit(batch_size).to_list(length=batch_size)
+        if not candidates:
+            break
+
+        candidate_ids = [booking["_id"] for booking in candidates]
+        sweep_id = str(uuid.uuid4())
+
+        # The guards skip bookings paid, cancelled or swept meanwhile
+        await bookings_collection.update_many(
+            {
+                "_id": {"$in": candidate_ids},
+                "status": BookingStatus.PENDING,
+                "payment_status": PaymentStatus.PENDING,
+                "sweep_id": {"$exists": False}
+            },
+            {
+                "$set": {
+                    "status": BookingStatus.EXPIRED,
+                    "expired_at": now,
+                    "sweep_id": sweep_id,
+                    "updated_at": now
+                }
+            }
+        )
+
+        # Only this run's stamp is released, so a repeated run releases nothing
+        expired = await bookings_collection.find(
+            {
+                "_id": {"$in": candidate_ids},
+                "status": BookingStatus.EXPIRED,
+                "sweep_id": sweep_id
+            },
+            {"parking_lot_id": 1, "start_time": 1, "end_time": 1}
+        ).to_list(length=len(candidate_ids))
+
+        await release_many(expired)
+        for booking in expired:
+            occupancy_feed.publish(booking["parking_lot_id"], "expired")
+        swept += len(expired)
+
+        if len(candidates) < batch_size:
+            break
+
+    return swept
+
+
+async def sweep_expired_bookings():
+    """Scheduled job: one sweep, if this worker holds the lease"""
+    lease_seconds = max(settings.BOOKING_SWEEP_INTERVAL_SECONDS, 30)
+    if not await acquire_lease(LEASE_NAME, lease_seconds):
+        _sweeper_metrics["skipped_runs"] += 1
+        return
+
+    try:
+        swept = await expire_pending_bookings()
+    except Exception as e:
+        logger.error(f"Pending booking sweep failed: {e}")
+        return
+    finally:
+        await release_lease(LEASE_NAME)
+
+    _sweeper_metrics["last_run"] = datetime.now().isoformat()
+    _sweeper_metrics["last_swept"] = swept
+    _sweeper_metrics["total_swept"] += swept
+    if swept:
+        logger.info(f"Expired {swept} unpaid pending parking bookings")
+
+
+def sweeper_stats() -> dict:
+    """Sweep counts for monitoring"""
+    return {
+        "enabled": settings.BOOKING_SWEEP_ENABLED,
+        "hold_minutes": settings.PENDING_BOOKING_HOLD_MINUTES,
+        **_sweeper_metrics
+    }
+
+
+def create_scheduler() -> AsyncIOScheduler:
+    """Scheduler with the sweep job; start it inside the running event loop"""
+    scheduler = AsyncIOScheduler()
+    if not settings.BOOKING_SWEEP_ENABLED:
+        return scheduler
+    scheduler.add_job(
+        sweep_expired_bookings,
+        "interval",
+        seconds=settings.BOOKING_SWEEP_INTERVAL_SECONDS,
+        id="expire_pending_bookings",
+        max_instances=1,
+        coalesce=True
+    )
+    return scheduler
@@ -0,0 +1,89 @@
+"""
+Shopping cart service - batched product loading, pricing and pruning
+"""
+
+from datetime import datetime
+from typing import Dict, List
+
+from bson import ObjectId
+
+from app.database.connection import get_users_collection
+from app.database.repositories import products_repo
+from app.services.loaders import load_by_ids
+
+
+async def load_cart_products(cart: List[dict]) -> Dict[ObjectId, dict]:
+    """Fetch every product referenced by the cart with a single query"""
+    return await load_by_ids(
+        products_repo.collection,
+        (item["product_id"] for item in cart),
+        products_repo.projection("cart")
+    )
+
+
+def first_image(product: dict):
+    images = product.get("images")
+    return images[0] if images else None
+
+
+def price_cart(cart: List[dict], products: Dict[ObjectId, dict]) -> dict:
+    """
+    Build cart line items, totals and the ids of lines that can no longer
+    be fulfilled, in one pass over the cart.
+    """
+    items = []
+    total_amount = 0
+    total_items = 0
+    unavailable_ids = []
+
+    for item in cart:
+        product = products.get(item["product_id"])
+
+        if not product or not product.get("is_active", False):
+            unavailable_ids.append(item["product_id"])
+            continue
+
+        # Check stock availability
+        is_available = product["stock_quantity"] >= item["quantity"]
+        item_total = item["quantity"] * item["price"]
+
+        items.append({
+            "product_id": str(item["product_id"]),
+            "product_name": product["name"],
+            "product_image": first_image(product),
+            "unit_price": item["price"],
+            # Current price might be different
+            "current_price": product["price"],
+            "quantity": item["quantity"],
+            "subtotal": item_total,
+            "is_available": is_available,
+            "stock_quantity": product["stock_quantity"],
+            "added_at": item.get("added_at")
+        })
+
+        if is_available:
+            total_amount += item_total
+            total_items += item["quantity"]
+        else:
+            unavailable_ids.append(item["product_id"])
+
+    return {
+        "items": items,
+        "total_amount": total_amount,
+        "total_items": total_items,
+        "unavailable_ids": unavailable_ids
+    }
+
+
+async def prune_cart(user_id: str, product_ids: List[ObjectId]):
+    """Remove cart lines for the given products with one atomic $pull"""
+    if not product_ids:
+        return
+
+    await get_users_collection().update_one(
+        {"_id": ObjectId(user_id)},
+        {
+            "$pull": {"cart": {"product_id": {"$in": product_ids}}},
+            "$set": {"updated_at": datetime.now()}
+        }
+    )
@@ -0,0 +1,78 @@
+"""
+Service center appointment availability per day, from the bay bitmaps
+
+A day's availability is the number of open SERVICE_SLOT_MINUTES slots
+still clear across the center's bays, read from the same schedule
+documents the appointment scheduler books against, so the detail page
+never offers time the scheduler would refuse.
+"""
+
+import math
+from datetime import datetime, timedelta
+from typing import List
+
+from bson import ObjectId
+
+from app.core.cache import TTLCache
+from app.core.config import get_settings
+from app.database.connection import get_service_schedule_collection
+from app.services.appointment_scheduler import (
+    SLOT,
+    SLOTS_PER_DAY,
+    bay_count,
+    day_start,
+    open_mask
+)
+
+settings = get_settings()
+
+availability_cache = TTLCache(ttl_seconds=settings.CENTER_AVAILABILITY_TTL_SECONDS)
+
+
+async def week_availability(center: dict, days: int = 7) -> List[dict]:
+    """Free bay slots per day from now, cached briefly per center"""
+    now = datetime.now()
+    today = now.date()
+    key = (center["_id"], today, days)
+    cached = availability_cache.get(key)
+    if cached is not None:
+        return cached
+
+    docs = await get_service_schedule_collection().find(
+        {
+            "center_id": center["_id"],
+            "day": {"$gte": day_start(today),
+                    "$lt": day_start(today + timedelta(days=days))}
+        },
+        {"day": 1, "bay": 1, "mask": 1}
+    ).to_list(length=None)
+    masks = {(doc["day"], doc["bay"]): doc["mask"] for doc in docs}
+    bays = range(1, bay_count(center) + 1)
+
+    availability = []
+    for offset in range(days):
+        check_date = today + timedelta(days=offset)
+        midnight = day_start(check_date)
+        opened = open_mask(center, check_date)
+        if offset == 0:
+            # Slots that have already started cannot be booked
+            started = min(math.ceil((now - midnight) / SLOT), SLOTS_PER_DAY)
+            opened &= ~((1 << started) - 1)
+
+        available_slots = sum(
+            (opened & ~masks.get((midnight, bay), 0)).bit_count() for bay in bays)
+        availability.append({
+            "date": check_date.isoformat(),
+            "day_name": check_date.strftime("%A"),
+            "available_slots": available_slots,
+            "slot_minutes": settings.SERVICE_SLOT_MINUTES,
+            "is_available": available_slots > 0
+        })
+
+    availability_cache.set(key, availability)
+    return availability
+
+
+def invalidate_center_availability(center_id: ObjectId):
+    """Drop cached availability after an appointment is booked or moved"""
+    availability_cache.delete_where(lambda key: key[0] == center_id)
@@ -0,0 +1,90 @@
+"""
+Facet counts for storefront filters, computed in one aggregation and cached
+"""
+
+from typing import List, Optional
+
+from app.core.cache import TTLCache
+from app.core.config import get_settings
+from app.database.repositories import products_repo, service_centers_repo
+
+settings = get_settings()
+
+facet_cache = TTLCache(ttl_seconds=settings.FACET_CACHE_TTL_SECONDS)
+
+IN_STOCK = {"$cond": [{"$gt": ["$stock_quantity", 0]}, 1, 0]}
+
+
+def invalidate_product_facets():
+    """Drop cached product counts after stock or is_active changes"""
+    facet_cache.delete_where(lambda key: key[0] == "products")
+
+
+def invalidate_service_facets():
+    """Drop cached service center counts after centers change"""
+    facet_cache.delete_where(lambda key: key[0] == "services")
+
+
+async def _group_counts(collection, match: dict, field: str, count_expr) -> List[dict]:
+    """Count documents per value of `field` with a single $group"""
+    pipeline = [
+        {"$match": {**match, field: {"$ne": None}}},
+        {"$group": {"_id": f"${field}", "count": {"$sum": count_expr}}}
+    ]
+    groups = await collection.aggregate(pipeline).to_list(length=None)
+    return [{"name": group["_id"], "count": group["count"]} for group in groups]
+
+
+async def product_category_counts() -> List[dict]:
+    """In-stock product count for every category with active products"""
+    key = ("products", "categories")
+    cached = facet_cache.get(key)
+    if cached is not None:
+        return cached
+
+    counts = await _group_counts(
+        products_repo.collection, {"is_active": True}, "category", IN_STOCK)
+
+    # Sort by count (most products first)
+    counts.sort(key=lambda x: x["count"], reverse=True)
+
+    facet_cache.set(key, counts)
+    return counts
+
+
+async def product_brand_counts(category: Optional[str] = None) -> List[dict]:
+    """In-stock product count for every brand, optionally within a category"""
+    key = ("products", "brands", category)
+    cached = facet_cache.get(key)
+    if cached is not None:
+        return cached
+
+    match = {"is_active": True}
+    if category:
+        match["category"] = category
+
+    counts = await _group_counts(
+        products_repo.collection, match, "brand", IN_STOCK)
+
+    # Sort alphabetically
+    counts.sort(key=lambda x: x["name"])
+
+    facet_cache.set(key, counts)
+    return counts
+
+
+async def service_brand_counts() -> List[dict]:
+    """Number of service centers per brand"""
+    key = ("services", "brands")
+    cached = facet_cache.get(key)
+    if cached is not None:
+        return cached
+
+    counts = await _group_counts(
+        service_centers_repo.collection, {}, "brand", 1)
+
+    # Sort alphabetically
+    counts.sort(key=lambda x: x["name"])
+
+    facet_cache.set(key, counts)
+    return counts
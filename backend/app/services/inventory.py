@@ -0,0 +1,110 @@
+"""
+Inventory service - atomic, bulk stock reservation for orders
+"""
+
+from typing import Dict, List, Optional
+
+from bson import ObjectId
+from pymongo import UpdateOne
+
+from app.database.repositories import products_repo
+from app.services.facets import invalidate_product_facets
+
+
+class InsufficientStockError(Exception):
+    """Raised when at least one line of a reservation cannot be filled"""
+
+    def __init__(self, product_ids: Optional[List[ObjectId]] = None):
+        self.product_ids = product_ids or []
+        super().__init__("Insufficient stock")
+
+
+def _merge_quantities(items: List[dict]) -> Dict[ObjectId, int]:
+    """Total quantity per product, in case a product appears twice"""
+    quantities: Dict[ObjectId, int] = {}
+    for item in items:
+        quantities[item["product_id"]] = quantities.get(
+            item["product_id"], 0) + item["quantity"]
+    return quantities
+
+
+async def reserve_stock(items: List[dict], reservation_id: str, session=None):
+    """
+    Decrement stock for every line with one bulk_write of conditional $inc
+    operations, or for none of them.
+
+    Inside a transaction (`session`) a partial failure is undone by the
+    abort. Without one, each matched product is tagged with reservation_id
+    so exactly the lines that were taken can be put back; the tag lookups
+    are scoped to the order's product ids so they stay on the _id index.
+    """
+    products_collection = products_repo.collection
+    quantities = _merge_quantities(items)
+
+    operations = []
+    for product_id, quantity in quantities.items():
+        update = {"$inc": {"stock_quantity": -quantity}}
+        if session is None:
+            update["$addToSet"] = {"stock_reservations": reservation_id}
+
+        operations.append(UpdateOne(
+            {
+                "_id": product_id,
+                "is_active": True,
+                "stock_quantity": {"$gte": quantity}
+            },
+            update
+        ))
+
+    result = await products_collection.bulk_write(
+        operations, ordered=False, session=session)
+
+    if result.modified_count:
+        invalidate_product_facets()
+
+    if result.modified_count == len(operations):
+        if session is None:
+            await products_collection.update_many(
+                {"_id": {"$in": list(quantities)}, "stock_reservations": reservation_id},
+                {"$pull": {"stock_reservations": reservation_id}}
+            )
+        return
+
+    if session is not None:
+        raise InsufficientStockError()
+
+    # Put back only the lines this reservation actually took
+    reserved = await products_collection.find(
+        {"_id": {"$in": list(quantities)}, "stock_reservations": reservation_id},
+        {"_id": 1}
+    ).to_list(length=len(operations))
+    reserved_ids = {doc["_id"] for doc in reserved}
+
+    if reserved_ids:
+        await products_collection.bulk_write([
+            UpdateOne(
+                {"_id": product_id, "stock_reservations": reservation_id},
+                {
+                    "$inc": {"stock_quantity": quantity},
+                    "$pull": {"stock_reservations": reservation_id}
+                }
+            )
+            for product_id, quantity in quantities.items()
+            if product_id in reserved_ids
+        ], ordered=False)
+
+    raise InsufficientStockError(
+        [product_id for product_id in quantities if product_id not in reserved_ids])
+
+
+async def release_stock(items: List[dict], session=None):
+    """Return stock for every line with a single bulk_write"""
+    quantities = _merge_quantities(items)
+    if not quantities:
+        return
+
+    await products_repo.collection.bulk_write([
+        UpdateOne({"_id": product_id}, {"$inc": {"stock_quantity": quantity}})
+        for product_id, quantity in quantities.items()
+    ], ordered=False, session=session)
+    invalidate_product_facets()
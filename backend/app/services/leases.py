@@ -0,0 +1,82 @@
+"""
+Named leases and run-once markers for jobs shared by every worker
+
+A lease is a short-lived document in job_leases owned by one worker;
+a marker in job_markers records that a one-time job has finished, so
+later starts (and the other workers) skip it.
+"""
+
+import asyncio
+import logging
+import os
+import socket
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable
+
+from pymongo.errors import DuplicateKeyError
+
+from app.database.connection import (
+    get_job_leases_collection,
+    get_job_markers_collection
+)
+
+logger = logging.getLogger(__name__)
+
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+
+async def acquire_lease(name: str, seconds: int) -> bool:
+    """
+    Take or renew a named lease for this worker. Fails while another worker
+    holds an unexpired one: the filter misses and the upsert collides on _id.
+    """
+    now = datetime.now()
+    try:
+        await get_job_leases_collection().update_one(
+            {
+                "_id": name,
+                "$or": [{"expires_at": {"$lt": now}}, {"owner": WORKER_ID}]
+            },
+            {"$set": {"owner": WORKER_ID, "expires_at": now + timedelta(seconds=seconds)}},
+            upsert=True
+        )
+    except DuplicateKeyError:
+        return False
+    return True
+
+
+async def release_lease(name: str):
+    await get_job_leases_collection().delete_one({"_id": name, "owner": WORKER_ID})
+
+
+async def run_once(name: str, job: Callable[[], Awaitable], lease_seconds: int = 600,
+                   poll_seconds: float = 2.0) -> bool:
+    """
+    Run `job` once across all workers and restarts. The worker holding the
+    lease runs it and writes the marker; the others wait for the marker
+    (or take over if the lease expires first). Returns True if this call
+    ran the job.
+    """
+    markers = get_job_markers_collection()
+    while True:
+        if await markers.find_one({"_id": name}, {"_id": 1}):
+            return False
+        if await acquire_lease(name, lease_seconds):
+            break
+        await asyncio.sleep(poll_seconds)
+
+    try:
+        # The previous holder may have finished between our two reads
+        if await markers.find_one({"_id": name}, {"_id": 1}):
+            return False
+        result = await job()
+        await markers.update_one(
+            {"_id": name},
+            {"$set": {"completed_at": datetime.now(), "owner": WORKER_ID,
+                      "result": result}},
+            upsert=True
+        )
+        logger.info(f"One-time job {name} finished: {result}")
+        return True
+    finally:
+        await release_lease(name)
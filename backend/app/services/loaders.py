@@ -0,0 +1,129 @@
+"""
+Batched loaders for enriching documents with their related records
+"""
+
+import asyncio
+from typing import Any, Dict, Iterable, List, Optional, Union
+
+from bson import ObjectId
+
+from app.database.mappers import (
+    DocumentMapper,
+    parking_lot_mapper,
+    service_center_mapper,
+    vehicle_mapper
+)
+from app.database.repositories import (
+    parking_lots_repo,
+    service_centers_repo,
+    vehicles_repo
+)
+
+# Fields shown when a related record is embedded in a list item
+PARKING_LOT_SUMMARY_FIELDS = ["name", "location", "address"]
+VEHICLE_SUMMARY_FIELDS = ["brand", "model", "registration_number"]
+SERVICE_CENTER_SUMMARY_FIELDS = ["name", "brand", "location", "contact_phone"]
+
+
+async def load_by_ids(
+    collection,
+    ids: Iterable[ObjectId],
+    fields: Optional[Union[List[str], Dict[str, Any]]] = None
+) -> Dict[ObjectId, dict]:
+    """
+    Fetch documents for a set of ids with one $in query.
+    Returns a dict keyed by _id; `fields` is a field list or a projection.
+    """
+    unique_ids = list({_id for _id in ids if _id is not None})
+    if not unique_ids:
+        return {}
+
+    if isinstance(fields, dict):
+        projection = fields
+    else:
+        projection = {field: 1 for field in fields} if fields else None
+    cursor = collection.find({"_id": {"$in": unique_ids}}, projection)
+    docs = await cursor.to_list(length=len(unique_ids))
+
+    return {doc["_id"]: doc for doc in docs}
+
+
+def _embed(doc: dict, fields: Optional[List[str]], mapper: DocumentMapper) -> dict:
+    """Shape a related document for embedding in a response"""
+    if fields:
+        embedded = {"id": str(doc["_id"])}
+        embedded.update({field: doc.get(field) for field in fields})
+        return embedded
+    return mapper.map(doc)
+
+
+async def enrich_bookings(
+    bookings: List[dict],
+    detailed: bool = False,
+    include_vehicle: bool = True
+) -> List[dict]:
+    """
+    Attach parking_lot and vehicle records to raw booking documents.
+    Summaries carry only the displayed fields; `detailed` embeds full records.
+    """
+    lot_fields = None if detailed else PARKING_LOT_SUMMARY_FIELDS
+    vehicle_fields = None if detailed else VEHICLE_SUMMARY_FIELDS
+
+    lots_task = load_by_ids(
+        parking_lots_repo.collection,
+        (booking.get("parking_lot_id") for booking in bookings),
+        lot_fields or parking_lot_mapper.projection
+    )
+    if include_vehicle:
+        vehicles_task = load_by_ids(
+            vehicles_repo.collection,
+            (booking.get("vehicle_id") for booking in bookings),
+            vehicle_fields
+        )
+        lots, vehicles = await asyncio.gather(lots_task, vehicles_task)
+    else:
+        lots, vehicles = await lots_task, {}
+
+    for booking in bookings:
+        lot = lots.get(booking.get("parking_lot_id"))
+        if lot:
+            booking["parking_lot"] = _embed(lot, lot_fields, parking_lot_mapper)
+
+        vehicle = vehicles.get(booking.get("vehicle_id"))
+        if vehicle:
+            booking["vehicle"] = _embed(vehicle, vehicle_fields, vehicle_mapper)
+
+    return bookings
+
+
+async def enrich_appointments(
+    appointments: List[dict],
+    include_vehicle: bool = False
+) -> List[dict]:
+    """Attach service_center (and optionally vehicle) summaries to raw appointment documents"""
+    centers_task = load_by_ids(
+        service_centers_repo.collection,
+        (appointment.get("service_center_id") for appointment in appointments),
+        SERVICE_CENTER_SUMMARY_FIELDS
+    )
+    if include_vehicle:
+        vehicles_task = load_by_ids(
+            vehicles_repo.collection,
+            (appointment.get("vehicle_id") for appointment in appointments),
+            VEHICLE_SUMMARY_FIELDS
+        )
+        centers, vehicles = await asyncio.gather(centers_task, vehicles_task)
+    else:
+        centers, vehicles = await centers_task, {}
+
+    for appointment in appointments:
+        center = centers.get(appointment.get("service_center_id"))
+        if center:
+            appointment["service_center"] = _embed(
+                center, SERVICE_CENTER_SUMMARY_FIELDS, service_center_mapper)
+
+        vehicle = vehicles.get(appointment.get("vehicle_id"))
+        if vehicle:
+            appointment["vehicle"] = _embed(vehicle, VEHICLE_SUMMARY_FIELDS, vehicle_mapper)
+
+    return appointments
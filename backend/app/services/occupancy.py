@@ -0,0 +1,354 @@
+"""
+Parking availability engine - per-lot occupancy kept as time-slot counters
+
+Every lot has one counter document per slot (PARKING_SLOT_MINUTES long):
+    {"lot_id": ObjectId, "slot_start": datetime, "count": int}
+A booking adds one to every slot it touches, so the peak number of
+concurrent bookings in [start, end) is the largest counter in that range:
+an O(slots) read on the (lot_id, slot_start) index instead of an overlap
+count over the whole booking history.
+
+The counters are seeded from the bookings collection once, at the first
+startup that finds no "parking_occupancy_seeded" job marker; every worker
+waits for that rebuild before serving. Rebuild them by hand (from backend/):
+    python -m app.services.occupancy [--lot LOT_ID] [--since YYYY-MM-DD]
+"""
+
+import argparse
+import asyncio
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from bson import ObjectId
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from app.core.config import get_settings
+from app.database.connection import (
+    close_db,
+    get_parking_occupancy_collection,
+    init_db
+)
+from app.database.repositories import parking_bookings_repo
+from app.models.schemas import BookingStatus
+from app.services.leases import run_once
+
+settings = get_settings()
+
+SLOT = timedelta(minutes=settings.PARKING_SLOT_MINUTES)
+
+# Bookings in these states hold their spot for the whole booked window
+HOLDING_STATUSES = [
+    BookingStatus.PENDING,
+    BookingStatus.CONFIRMED,
+    BookingStatus.ACTIVE
+]
+
+DUPLICATE_KEY = 11000
+
+
+class LotFullError(Exception):
+    """Raised when at least one slot of a claim is already at capacity"""
+
+    def __init__(self, full_slots: Optional[List[datetime]] = None):
+        self.full_slots = full_slots or []
+        super().__init__("No capacity left for the requested slots")
+
+
+def slot_floor(moment: datetime) -> datetime:
+    """Start of the slot containing moment"""
+    day = datetime.combine(moment.date(), datetime.min.time())
+    return day + ((moment - day) // SLOT) * SLOT
+
+
+def slot_ceil(moment: datetime) -> datetime:
+    """Start of the first slot that begins at or after moment"""
+    floor = slot_floor(moment)
+    return floor if floor == moment else floor + SLOT
+
+
+def slot_starts(start: datetime, end: datetime) -> List[datetime]:
+    """Every slot overlapping [start, end)"""
+    slots = []
+    if start >= end:
+        return slots
+    current = slot_floor(start)
+    while current < end:
+        slots.append(current)
+        current += SLOT
+    return slots
+
+
+def slot_range(start: datetime, end: datetime) -> Optional[Tuple[datetime, datetime]]:
+    """First and last slot overlapping [start, end), without listing the slots between"""
+    if start >= end:
+        return None
+    return slot_floor(start), slot_floor(end - timedelta(microseconds=1))
+
+
+def held_interval(booking: dict) -> Tuple[datetime, datetime]:
+    """
+    The part of a booking's window that counts against capacity. A booking
+    checked out early stops holding its spot from the next slot onwards.
+    """
+    start, end = booking["start_time"], booking["end_time"]
+    if booking.get("status") == BookingStatus.COMPLETED and booking.get("actual_end_time"):
+        end = min(end, max(start, slot_ceil(booking["actual_end_time"])))
+    return start, end
+
+
+def _release_op(lot_id: ObjectId, slot: datetime, spots: int) -> UpdateOne:
+    """
+    Give back spots in one slot, never taking its counter below zero. A
+    slot without a counter (never claimed, e.g. booked before a backfill)
+    is left alone rather than created negative, which would let later
+    claims overbook it.
+    """
+    return UpdateOne(
+        {"lot_id": lot_id, "slot_start": slot, "count": {"$gt": 0}},
+        [{"$set": {"count": {"$max": [0, {"$subtract": ["$count", spots]}]}}}]
+    )
+
+
+async def _release_slots(lot_id: ObjectId, slots: List[datetime], session=None):
+    """Give back one spot in each of the given slots in one bulk write"""
+    operations = [_release_op(lot_id, slot, 1) for slot in slots]
+    if operations:
+        await get_parking_occupancy_collection().bulk_write(
+            operations, ordered=False, session=session)
+
+
+async def _claim_slot(lot_id: ObjectId, slot: datetime, capacity: int) -> bool:
+    """Take one spot in a slot that lost an upsert race or looks full"""
+    result = await get_parking_occupancy_collection().update_one(
+        {"lot_id": lot_id, "slot_start": slot, "count": {"$lt": capacity}},
+        {"$inc": {"count": 1}}
+    )
+    return result.modified_count == 1
+
+
+async def release_many(bookings: Iterable[dict]):
+    """Give back the full windows of many bookings in one bulk write"""
+    spots: Dict[Tuple[ObjectId, datetime], int] = {}
+    for booking in bookings:
+        for slot in slot_starts(booking["start_time"], booking["end_time"]):
+            key = (booking["parking_lot_id"], slot)
+            spots[key] = spots.get(key, 0) + 1
+
+    operations = [
+        _release_op(lot_id, slot, count)
+        for (lot_id, slot), count in spots.items()
+    ]
+    if operations:
+        await get_parking_occupancy_collection().bulk_write(
+            operations, ordered=False)
+
+
+async def claim_slots(lot_id: ObjectId, start: datetime, end: datetime,
+                      capacity: int) -> List[datetime]:
+    """
+    Atomically take one spot in every slot of [start, end), or in none.
+
+    Each slot is claimed with a conditional $inc guarded by
+    count < capacity, so no slot can pass capacity however many requests
+    race for it; there is no lock and no read-then-write window. A slot
+    without a counter yet is created by the upsert. When its guard fails on
+    an existing counter, the upsert collides with the unique
+    (lot_id, slot_start) index instead of creating a second counter. Those
+    slots are retried once without upsert (the collision may just be a
+    concurrent first claim). If any slot stays full, the slots already
+    taken are given back and LotFullError is raised.
+
+    Claims never run inside a transaction: a duplicate key error would
+    abort it, and the compensating release already makes them all-or-none.
+    """
+    slots = slot_starts(start, end)
+    if not slots:
+        return slots
+    if capacity < 1:
+        raise LotFullError(slots)
+
+    operations = [
+        UpdateOne(
+            {"lot_id": lot_id, "slot_start": slot, "count": {"$lt": capacity}},
+            {"$inc": {"count": 1}},
+            upsert=True
+        )
+        for slot in slots
+    ]
+
+    contested = []
+    try:
+        await get_parking_occupancy_collection().bulk_write(
+            operations, ordered=False)
+    except BulkWriteError as e:
+        errors = e.details.get("writeErrors", [])
+        unexpected = [error for error in errors if error.get("code") != DUPLICATE_KEY]
+        contested = [slots[error["index"]] for error in errors
+                     if error.get("code") == DUPLICATE_KEY]
+        if unexpected:
+            failed = {error["index"] for error in errors}
+            await _release_slots(lot_id, [slot for index, slot in enumerate(slots)
+                                          if index not in failed])
+            raise
+
+    full = []
+    for slot in contested:
+        if not await _claim_slot(lot_id, slot, capacity):
+            full.append(slot)
+
+    if full:
+        # Give back every slot this claim did take
+        taken = [slot for slot in slots if slot not in full]
+        await _release_slots(lot_id, taken)
+        raise LotFullError(full)
+
+    return slots
+
+
+async def release(lot_id: ObjectId, start: datetime, end: datetime, session=None):
+    """Give back [start, end) of a cancelled or finished booking"""
+    await _release_slots(lot_id, slot_starts(start, end), session=session)
+
+
+async def release_after_checkout(booking: dict, checkout_time: datetime, session=None):
+    """Give back the slots an early checkout no longer uses"""
+    kept_until = held_interval({
+        **booking,
+        "status": BookingStatus.COMPLETED,
+        "actual_end_time": checkout_time
+    })[1]
+    await release(booking["parking_lot_id"], kept_until, booking["end_time"],
+                  session=session)
+
+
+async def max_occupancy(lot_id: ObjectId, start: datetime, end: datetime) -> int:
+    """Peak number of concurrent bookings anywhere in [start, end)"""
+    bounds = slot_range(start, end)
+    if not bounds:
+        return 0
+
+    cursor = get_parking_occupancy_collection().find(
+        {"lot_id": lot_id, "slot_start": {"$gte": bounds[0], "$lte": bounds[1]}},
+        {"count": 1, "_id": 0}
+    )
+    counts = [doc["count"] async for doc in cursor]
+    return max(counts, default=0)
+
+
+async def peak_occupancy_many(lot_ids: List[ObjectId],
+                              windows: List[Tuple[datetime, datetime]]
+                              ) -> Dict[ObjectId, List[int]]:
+    """
+    Peak concurrent bookings per lot for each window, from one aggregation
+    over the slot counters. Lots without counters are simply absent.
+    """
+    slot_ranges = [slot_range(start, end) for start, end in windows]
+    non_empty = [bounds for bounds in slot_ranges if bounds]
+    if not lot_ids or not non_empty:
+        return {}
+
+    peaks = {}
+    for index, bounds in enumerate(slot_ranges):
+        in_window = {"$and": [
+            {"$gte": ["$slot_start", bounds[0]]},
+            {"$lte": ["$slot_start", bounds[1]]}
+        ]} if bounds else False
+        peaks[f"w{index}"] = {"$max": {"$cond": [in_window, "$count", 0]}}
+
+    pipeline = [
+        {
+            "$match": {
+                "lot_id": {"$in": lot_ids},
+                "slot_start": {
+                    "$gte": min(bounds[0] for bounds in non_empty),
+                    "$lte": max(bounds[1] for bounds in non_empty)
+                }
+            }
+        },
+        {"$group": {"_id": "$lot_id", **peaks}}
+    ]
+    results = await get_parking_occupancy_collection().aggregate(
+        pipeline).to_list(length=None)
+
+    return {
+        doc["_id"]: [doc[f"w{index}"] for index in range(len(windows))]
+        for doc in results
+    }
+
+
+async def occupancy_at(lot_id: ObjectId, moment: Optional[datetime] = None) -> int:
+    """Bookings holding a spot at one moment (now by default)"""
+    slot = slot_floor(moment or datetime.now())
+    doc = await get_parking_occupancy_collection().find_one(
+        {"lot_id": lot_id, "slot_start": slot}, {"count": 1})
+    return doc["count"] if doc else 0
+
+
+async def rebuild(lot_ids: Optional[Iterable[ObjectId]] = None,
+                  since: Optional[datetime] = None) -> int:
+    """
+    Recompute counters from the bookings collection for slots from `since`
+    (start of today by default). Returns the number of counters written.
+    Counters are replaced wholesale, so run it while bookings are quiet.
+    """
+    since = slot_floor(since or datetime.combine(datetime.now().date(),
+                                                 datetime.min.time()))
+    occupancy_collection = get_parking_occupancy_collection()
+
+    query = {
+        "status": {"$in": HOLDING_STATUSES + [BookingStatus.COMPLETED]},
+        "end_time": {"$gt": since}
+    }
+    scope = {"slot_start": {"$gte": since}}
+    if lot_ids is not None:
+        lot_ids = list(lot_ids)
+        query["parking_lot_id"] = {"$in": lot_ids}
+        scope["lot_id"] = {"$in": lot_ids}
+
+    counts = {}
+    cursor = parking_bookings_repo.collection.find(
+        query, parking_bookings_repo.projection("occupancy"))
+    async for booking in cursor:
+        start, end = held_interval(booking)
+        for slot in slot_starts(max(start, since), end):
+            key = (booking["parking_lot_id"], slot)
+            counts[key] = counts.get(key, 0) + 1
+
+    await occupancy_collection.delete_many(scope)
+    if counts:
+        await occupancy_collection.insert_many([
+            {"lot_id": lot_id, "slot_start": slot, "count": count}
+            for (lot_id, slot), count in counts.items()
+        ], ordered=False)
+    return len(counts)
+
+
+async def ensure_counters_built() -> bool:
+    """Seed the counters from bookings unless a previous start already did"""
+    return await run_once("parking_occupancy_seeded", rebuild)
+
+
+async def _rebuild_command(lot_id: Optional[str], since: Optional[str]):
+    await init_db()
+    try:
+        written = await rebuild(
+            [ObjectId(lot_id)] if lot_id else None,
+            datetime.fromisoformat(since) if since else None
+        )
+        print(f"Rebuilt {written} occupancy counters")
+    finally:
+        await close_db()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Rebuild parking occupancy counters from bookings")
+    parser.add_argument("--lot", help="Only rebuild this parking lot id")
+    parser.add_argument("--since", help="First day to rebuild (YYYY-MM-DD)")
+    args = parser.parse_args()
+    asyncio.run(_rebuild_command(args.lot, args.since))
+
+
+if __name__ == "__main__":
+    main()
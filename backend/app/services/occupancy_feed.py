@@ -0,0 +1,234 @@
+"""
+Live parking occupancy feed - pushes lot updates to WebSocket subscribers
+
+Routes call `publish(lot_id, event)` after a booking changes. Events are
+coalesced: once per flush interval every changed lot is read once (one
+lots query plus one occupancy aggregation for all of them), serialized
+once, and handed to the subscribers of its topics:
+    lot:<lot_id>       one parking lot
+    tile:<row>:<col>   every lot in a PARKING_FEED_TILE_DEG grid tile
+Each subscriber keeps only the latest message per lot, so a slow client
+gets fresh state instead of a growing backlog.
+
+Subscribers live in the worker that accepted their socket. With the
+default "memory" PARKING_FEED_BACKEND a worker only pushes the bookings it
+handled itself, so run several workers with PARKING_FEED_BACKEND=redis:
+each flush is then published on the REDIS_URL channel and every worker
+renders it for its own subscribers.
+"""
+
+import asyncio
+import json
+import logging
+import math
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Set
+
+from bson import ObjectId
+
+from app.core.config import get_settings
+from app.database.repositories import parking_lots_repo
+from app.services.occupancy import peak_occupancy_many
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+EVENTS = ("booked", "cancelled", "checked_in", "checked_out", "expired")
+CHANNEL = "parking:occupancy"
+
+
+def lot_topic(lot_id) -> str:
+    return f"lot:{lot_id}"
+
+
+def tile_of(latitude: float, longitude: float) -> str:
+    """Grid tile id for a coordinate"""
+    size = settings.PARKING_FEED_TILE_DEG
+    return f"{math.floor(latitude / size)}:{math.floor(longitude / size)}"
+
+
+def tile_topic(tile: str) -> str:
+    return f"tile:{tile}"
+
+
+class Subscriber:
+    """One connection: its topics and the latest undelivered message per lot"""
+
+    def __init__(self):
+        self.topics: Set[str] = set()
+        self._pending: Dict[str, str] = {}
+        self._ready = asyncio.Event()
+
+    def offer(self, lot_id: str, message: str):
+        self._pending[lot_id] = message
+        self._ready.set()
+
+    async def next_batch(self) -> List[str]:
+        """Wait for and take every pending message"""
+        await self._ready.wait()
+        self._ready.clear()
+        batch = list(self._pending.values())
+        self._pending.clear()
+        return batch
+
+
+class OccupancyFeed:
+    def __init__(self, flush_interval: float, redis_url: Optional[str] = None,
+                 redis_password: str = ""):
+        self.flush_interval = flush_interval
+        self._topics: Dict[str, Set[Subscriber]] = {}
+        self._changes: Dict[ObjectId, Dict[str, int]] = {}
+        self._dirty = asyncio.Event()
+        self._redis_url = redis_url
+        self._redis_password = redis_password
+        self._redis = None
+
+    @property
+    def backend(self) -> str:
+        return "redis" if self._redis_url else "memory"
+
+    @property
+    def subscriber_count(self) -> int:
+        return len({sub for subs in self._topics.values() for sub in subs})
+
+    def connect(self) -> Subscriber:
+        return Subscriber()
+
+    def subscribe(self, subscriber: Subscriber, topics: Iterable[str]):
+        for topic in topics:
+            if len(subscriber.topics) >= settings.PARKING_FEED_MAX_TOPICS:
+                break
+            self._topics.setdefault(topic, set()).add(subscriber)
+            subscriber.topics.add(topic)
+
+    def unsubscribe(self, subscriber: Subscriber, topics: Iterable[str]):
+        for topic in topics:
+            subscribers = self._topics.get(topic)
+            if subscribers is not None:
+                subscribers.discard(subscriber)
+                if not subscribers:
+                    del self._topics[topic]
+            subscriber.topics.discard(topic)
+
+    def disconnect(self, subscriber: Subscriber):
+        self.unsubscribe(subscriber, list(subscriber.topics))
+
+    def publish(self, lot_id: ObjectId, event: str):
+        """Record a booking change; it is pushed on the next flush"""
+        # Other workers may have subscribers when changes are fanned out
+        if not self._topics and not self._redis_url:
+            return
+        counts = self._changes.setdefault(lot_id, {})
+        counts[event] = counts.get(event, 0) + 1
+        self._dirty.set()
+
+    async def flush(self):
+        """Hand the collected changes to every worker (or just this one)"""
+        changes, self._changes = self._changes, {}
+        if not changes:
+            return
+
+        if self._redis is not None:
+            try:
+                await self._redis.publish(CHANNEL, json.dumps(
+                    {str(lot_id): counts for lot_id, counts in changes.items()}))
+                return
+            except Exception as e:
+                logger.warning(f"Occupancy fan-out failed, pushing locally: {e}")
+        await self._deliver(changes)
+
+    async def _deliver(self, changes: Dict[ObjectId, Dict[str, int]]):
+        """Push one message per changed lot to this worker's subscribers"""
+        if not self._topics:
+            return
+
+        lot_ids = list(changes)
+        lots = await parking_lots_repo.collection.find(
+            {"_id": {"$in": lot_ids}},
+            {"total_capacity": 1, "latitude": 1, "longitude": 1}
+        ).to_list(length=len(lot_ids))
+
+        now = datetime.now()
+        occupied = await peak_occupancy_many(
+            lot_ids, [(now, now + timedelta(microseconds=1))])
+
+        for lot in lots:
+            recipients = set(self._topics.get(lot_topic(lot["_id"]), ()))
+            tile = None
+            if lot.get("latitude") is not None and lot.get("longitude") is not None:
+                tile = tile_of(lot["latitude"], lot["longitude"])
+                recipients |= self._topics.get(tile_topic(tile), set())
+            if not recipients:
+                continue
+
+            capacity = lot.get("total_capacity", 0)
+            occupied_spots = occupied.get(lot["_id"], [0])[0]
+            message = json.dumps({
+                "type": "occupancy",
+                "lot_id": str(lot["_id"]),
+                "tile": tile,
+                "total_capacity": capacity,
+                "occupied_spots": occupied_spots,
+                "available_spots": max(0, capacity - occupied_spots),
+                "events": changes[lot["_id"]],
+                "at": now.isoformat()
+            })
+            for subscriber in recipients:
+                subscriber.offer(str(lot["_id"]), message)
+
+    async def _listen(self):
+        """Deliver the changes every worker publishes (redis backend)"""
+        while True:
+            try:
+                async with self._redis.pubsub() as pubsub:
+                    await pubsub.subscribe(CHANNEL)
+                    async for message in pubsub.listen():
+                        if message["type"] != "message":
+                            continue
+                        changes = {ObjectId(lot_id): counts for lot_id, counts
+                                   in json.loads(message["data"]).items()}
+                        try:
+                            await self._deliver(changes)
+                        except Exception as e:
+                            logger.error(f"Failed to push parking occupancy: {e}")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Occupancy feed subscription lost, retrying: {e}")
+                await asyncio.sleep(1)
+
+    async def run(self):
+        """Flush loop: waits for changes, then lets a burst collect first"""
+        listener = None
+        if self._redis_url:
+            import redis.asyncio as redis
+
+            self._redis = redis.from_url(
+                self._redis_url, password=self._redis_password or None,
+                decode_responses=True)
+            listener = asyncio.create_task(self._listen())
+
+        try:
+            while True:
+                await self._dirty.wait()
+                await asyncio.sleep(self.flush_interval)
+                self._dirty.clear()
+                try:
+                    await self.flush()
+                except Exception as e:
+                    logger.error(f"Failed to push parking occupancy: {e}")
+        finally:
+            if listener is not None:
+                listener.cancel()
+                await self._redis.aclose()
+
+
+def _build_occupancy_feed() -> OccupancyFeed:
+    flush_interval = settings.PARKING_FEED_FLUSH_MS / 1000
+    if settings.PARKING_FEED_BACKEND == "redis":
+        return OccupancyFeed(flush_interval, settings.REDIS_URL,
+                             settings.REDIS_PASSWORD)
+    return OccupancyFeed(flush_interval)
+
+
+occupancy_feed = _build_occupancy_feed()
@@ -0,0 +1,59 @@
+"""
+Product catalogue search backed by the products text index
+"""
+
+import re
+from typing import List, Optional
+
+from app.database.repositories import products_repo
+
+# Relevance score computed by the text index
+TEXT_SCORE = {"$meta": "textScore"}
+
+# Ranked by relevance, with _id as a tiebreaker so pages never shuffle
+RELEVANCE_SORT = [("score", TEXT_SCORE), ("_id", 1)]
+
+
+def text_search_filter(q: str) -> dict:
+    """Query fragment matching products through the text index"""
+    return {"$text": {"$search": q}}
+
+
+def name_prefix_filter(q: str) -> dict:
+    """Anchored, escaped name prefix match for partially typed words"""
+    return {"name": {"$regex": "^" + re.escape(q.strip()), "$options": "i"}}
+
+
+async def search_catalog(
+    q: str,
+    base_query: dict,
+    limit: int,
+    projection: Optional[dict] = None
+) -> List[dict]:
+    """
+    Rank text index matches by relevance, then top up with name-prefix
+    matches so a half-typed word still finds products.
+    """
+    products_collection = products_repo.collection
+
+    ranked_projection = dict(projection or {})
+    ranked_projection["score"] = TEXT_SCORE
+
+    cursor = products_collection.find(
+        {**base_query, **text_search_filter(q)}, ranked_projection
+    ).sort(RELEVANCE_SORT).limit(limit)
+    results = await cursor.to_list(length=limit)
+
+    if len(results) < limit:
+        seen_ids = [product["_id"] for product in results]
+        prefix_query = {
+            **base_query,
+            **name_prefix_filter(q),
+            "_id": {"$nin": seen_ids}
+        }
+        remaining = limit - len(results)
+        cursor = products_collection.find(prefix_query, projection).sort(
+            "name", 1).limit(remaining)
+        results.extend(await cursor.to_list(length=remaining))
+
+    return results
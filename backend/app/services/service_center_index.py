@@ -0,0 +1,211 @@
+"""
+In-memory spatial index for service center proximity queries
+
+The index is rebuilt when collection_fingerprint (document count plus the
+newest updated_at) changes, checked every SERVICE_CENTER_INDEX_REFRESH_SECONDS.
+The API has no service center write path. Any seed script, admin tool or
+migration that edits centers must set updated_at to the time of the write
+on every document it touches. Otherwise the edit is invisible until the
+next restart. A writer running in this process can call
+`service_center_index.refresh(force=True)` to pick its change up at once.
+"""
+
+import asyncio
+import logging
+import math
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.core.config import get_settings
+from app.core.geo import GeoPoints, bounding_box
+from app.database.connection import collection_fingerprint
+from app.database.repositories import service_centers_repo
+from app.services.facets import invalidate_service_facets
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+class _IndexSnapshot:
+    """Immutable view of the indexed service centers"""
+
+    def __init__(self, centers: List[dict], cell_size_deg: float):
+        self.cell_size_deg = cell_size_deg
+        self.centers = centers
+        self.points = GeoPoints(
+            [center["latitude"] for center in centers],
+            [center["longitude"] for center in centers]
+        )
+
+        cells: Dict[Tuple[int, int], List[int]] = {}
+        by_service: Dict[str, List[int]] = {}
+        by_brand: Dict[str, List[int]] = {}
+
+        for idx, center in enumerate(centers):
+            cell = self.cell_of(center["latitude"], center["longitude"])
+            cells.setdefault(cell, []).append(idx)
+
+            for service in center.get("services") or []:
+                by_service.setdefault(service, []).append(idx)
+
+            brand = (center.get("brand") or "").lower()
+            by_brand.setdefault(brand, []).append(idx)
+
+        self.cells = {
+            cell: np.array(ids, dtype=np.intp) for cell, ids in cells.items()
+        }
+        self.by_service = {
+            service: self._mask(ids) for service, ids in by_service.items()
+        }
+        self.by_brand = {
+            brand: self._mask(ids) for brand, ids in by_brand.items()
+        }
+
+    def _mask(self, ids: List[int]) -> np.ndarray:
+        mask = np.zeros(len(self.centers), dtype=bool)
+        mask[ids] = True
+        return mask
+
+    def cell_of(self, lat: float, lon: float) -> Tuple[int, int]:
+        """Grid cell containing a coordinate"""
+        return (
+            math.floor(lat / self.cell_size_deg),
+            math.floor(lon / self.cell_size_deg)
+        )
+
+    def candidate_cells(self, lat: float, lon: float, radius_km: float):
+        """Yield every grid cell that intersects the search radius"""
+        min_lat, max_lat, min_lon, max_lon = bounding_box(lat, lon, radius_km)
+        row_start, col_start = self.cell_of(min_lat, min_lon)
+        row_end, col_end = self.cell_of(max_lat, max_lon)
+
+        # Cells wrap around the antimeridian
+        cols_per_turn = math.ceil(360 / self.cell_size_deg)
+        min_col = math.floor(-180 / self.cell_size_deg)
+        col_span = min(col_end - col_start, cols_per_turn - 1)
+
+        for row in range(row_start, row_end + 1):
+            for offset in range(col_span + 1):
+                col = (col_start + offset - min_col) % cols_per_turn + min_col
+                yield row, col
+
+    def candidates(self, lat: float, lon: float, radius_km: float) -> np.ndarray:
+        """Indices of centers in the grid cells covering the search radius"""
+        blocks = [
+            self.cells[cell]
+            for cell in self.candidate_cells(lat, lon, radius_km)
+            if cell in self.cells
+        ]
+        if not blocks:
+            return np.empty(0, dtype=np.intp)
+        return np.concatenate(blocks)
+
+    def filter_mask(self, service_type: Optional[str], brand: Optional[str]) -> Optional[np.ndarray]:
+        """Posting mask of centers matching the service type and brand filters"""
+        mask = None
+
+        if service_type:
+            mask = self.by_service.get(service_type)
+            if mask is None:
+                return self._mask([])
+
+        if brand:
+            # Case-insensitive substring match, like the old $regex filter
+            term = brand.lower()
+            brand_mask = self._mask([])
+            for name, ids in self.by_brand.items():
+                if term in name:
+                    brand_mask |= ids
+            mask = brand_mask if mask is None else mask & brand_mask
+
+        return mask
+
+
+class ServiceCenterIndex:
+    """Read-mostly grid index over service center coordinates"""
+
+    def __init__(self, cell_size_deg: float):
+        self.cell_size_deg = cell_size_deg
+        self._snapshot = _IndexSnapshot([], cell_size_deg)
+        self._version = None
+        self._lock = asyncio.Lock()
+        self.built_at: Optional[datetime] = None
+
+    @property
+    def size(self) -> int:
+        return len(self._snapshot.centers)
+
+    async def refresh(self, force: bool = False):
+        """Rebuild the index if the service centers collection changed"""
+        async with self._lock:
+            version = await collection_fingerprint(
+                service_centers_repo.collection)
+            if not force and self.built_at and version == self._version:
+                return
+
+            # Card fields only: the index serves list results
+            docs = await service_centers_repo.find_many({
+                "latitude": {"$type": "number"},
+                "longitude": {"$type": "number"}
+            }, "card")
+            docs = service_centers_repo.mapper.map_many(docs)
+
+            # Swap in the new snapshot in one assignment so readers never
+            # observe a half-built index.
+            self._snapshot = _IndexSnapshot(docs, self.cell_size_deg)
+            self._version = version
+            self.built_at = datetime.now()
+            invalidate_service_facets()
+            logger.info(f"Service center index built with {len(docs)} centers")
+
+    async def run_refresh_loop(self, interval_seconds: int):
+        """Periodically pick up service center changes"""
+        while True:
+            await asyncio.sleep(interval_seconds)
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.error(f"Failed to refresh service center index: {e}")
+
+    async def ensure_loaded(self):
+        """Build the index on first use if startup did not"""
+        if self.built_at is None:
+            await self.refresh(force=True)
+
+    def nearby(
+        self,
+        latitude: float,
+        longitude: float,
+        radius_km: float,
+        service_type: Optional[str] = None,
+        brand: Optional[str] = None,
+        limit: int = 10
+    ) -> List[dict]:
+        """Closest centers within radius_km, nearest first"""
+        snapshot = self._snapshot
+        candidates = snapshot.candidates(latitude, longitude, radius_km)
+
+        allowed = snapshot.filter_mask(service_type, brand)
+        if allowed is not None:
+            candidates = candidates[allowed[candidates]]
+
+        # Grid cells already bound the search area, so skip the box check
+        indices, distances = snapshot.points.nearest(
+            latitude, longitude, radius_km, limit,
+            candidates=candidates,
+            prefilter=False
+        )
+
+        results = []
+        for idx, distance in zip(indices.tolist(), distances.tolist()):
+            center = dict(snapshot.centers[idx])
+            center["distance"] = round(distance, 2)
+            results.append(center)
+
+        return results
+
+
+service_center_index = ServiceCenterIndex(
+    cell_size_deg=settings.SERVICE_CENTER_GRID_CELL_DEG)
@@ -0,0 +1,402 @@
+"""
+Type-ahead suggestions served from an in-memory sorted-prefix index
+"""
+
+import asyncio
+import heapq
+import logging
+import math
+import re
+from bisect import bisect_left, insort
+from datetime import datetime
+from typing import Dict, Hashable, Iterable, List, Optional, Set, Tuple
+
+from app.database.connection import collection_fingerprint
+from app.database.repositories import (
+    parking_lots_repo,
+    products_repo,
+    service_centers_repo
+)
+
+logger = logging.getLogger(__name__)
+
+SUGGESTION_KINDS = ["product", "brand", "category", "parking_lot", "service_center"]
+
+_WHITESPACE = re.compile(r"\s+")
+
+# The most completions a lookup may ask for
+TOP_K = 20
+# Prefixes up to this length have their top completions precomputed
+PRECOMPUTED_PREFIX_LENGTH = 3
+
+
+def normalize(text: str) -> str:
+    """Lower-case and collapse whitespace so lookups ignore formatting"""
+    return _WHITESPACE.sub(" ", text).strip().lower()
+
+
+def popularity(doc: dict) -> float:
+    """Weight a catalogue entry by its rating and review volume"""
+    return 1.0 + float(doc.get("rating") or 0) + \
+        math.log1p(doc.get("review_count") or 0)
+
+
+class _Entry:
+    """One completion, with the weight each source document contributes"""
+
+    __slots__ = ("text", "normalized", "kind", "keys", "contributions", "weight")
+
+    def __init__(self, text: str, normalized: str, kind: str):
+        self.text = text
+        self.normalized = normalized
+        self.kind = kind
+        self.keys = SuggestionIndex._word_keys(normalized)
+        self.contributions: Dict[Hashable, float] = {}
+        self.weight = 0.0
+
+    def contribute(self, source: Hashable, weight: float):
+        self.weight += weight - self.contributions.get(source, 0.0)
+        self.contributions[source] = weight
+
+    def withdraw(self, source: Hashable):
+        self.weight -= self.contributions.pop(source, 0.0)
+
+    @property
+    def rank(self) -> tuple:
+        return (self.weight, self.text)
+
+    def as_dict(self) -> dict:
+        suggestion = {"text": self.text, "type": self.kind}
+        if self.kind in ("product", "parking_lot", "service_center"):
+            # Point straight at the record when the name is unique to one
+            suggestion["id"] = next(iter(self.contributions))
+        return suggestion
+
+
+def _rank(entry: _Entry) -> tuple:
+    return entry.rank
+
+
+class SuggestionIndex:
+    """
+    Weighted completions kept in a sorted array of (prefix key, entry) pairs.
+    Every word start in an entry gets a key, so "pad" completes
+    "Bosch Brake Pad". Short prefixes, which match most of the catalogue,
+    have their top completions per kind precomputed; longer ones bisect to
+    the prefix range and take the top-k. Updates only touch the prefixes of
+    the entry that changed.
+    """
+
+    def __init__(self, cache_size: int = 2048):
+        self._entries: Dict[Tuple[str, str], _Entry] = {}
+        self._keys: List[Tuple[str, str, str]] = []
+        # prefix -> kind -> best entries, best first
+        self._top: Dict[str, Dict[str, List[_Entry]]] = {}
+        # (prefix, kind) lists that lost a member and must be refilled
+        self._stale: Set[Tuple[str, str]] = set()
+        self._cache: Dict[tuple, List[dict]] = {}
+        self._cache_size = cache_size
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @classmethod
+    def build(cls, contributions: Iterable[Tuple[str, str, Hashable, float]]) -> "SuggestionIndex":
+        """Bulk-load (text, kind, source, weight) contributions: one sort, no per-key inserts"""
+        index = cls()
+        for text, kind, source, weight in contributions:
+            if text:
+                index._entry(text, kind).contribute(source, weight)
+
+        index._keys = sorted(
+            (key, entry.normalized, entry.kind)
+            for entry in index._entries.values()
+            for key in entry.keys
+        )
+
+        # Best entries first, so each prefix list fills up in rank order
+        top = index._top
+        for entry in sorted(index._entries.values(), key=_rank, reverse=True):
+            for prefix in index._short_prefixes(entry.keys):
+                kinds = top.get(prefix)
+                if kinds is None:
+                    kinds = top[prefix] = {}
+                bucket = kinds.get(entry.kind)
+                if bucket is None:
+                    kinds[entry.kind] = [entry]
+                elif len(bucket) < TOP_K:
+                    bucket.append(entry)
+        return index
+
+    @staticmethod
+    def _word_keys(normalized: str) -> List[str]:
+        """Suffixes of the text that start at a word boundary"""
+        keys = [normalized]
+        for match in re.finditer(r" (?=\S)", normalized):
+            keys.append(normalized[match.end():])
+        return keys
+
+    @staticmethod
+    def _short_prefixes(keys: List[str]) -> Set[str]:
+        """The precomputed prefixes an entry's word keys can be found under"""
+        return {
+            key[:length]
+            for key in keys
+            for length in range(1, min(len(key), PRECOMPUTED_PREFIX_LENGTH) + 1)
+        }
+
+    def _entry(self, text: str, kind: str) -> _Entry:
+        normalized = normalize(text)
+        entry = self._entries.get((normalized, kind))
+        if entry is None:
+            entry = _Entry(text.strip(), normalized, kind)
+            self._entries[(normalized, kind)] = entry
+        return entry
+
+    def add(self, text: Optional[str], kind: str, source: Hashable, weight: float):
+        """Record that `source` contributes `weight` to the completion text"""
+        if not text:
+            return
+
+        normalized = normalize(text)
+        is_new = (normalized, kind) not in self._entries
+        entry = self._entry(text, kind)
+        if is_new:
+            for key in entry.keys:
+                insort(self._keys, (key, normalized, kind))
+
+        previous = entry.weight
+        entry.contribute(source, weight)
+        self._changed(entry, dropped=entry.weight < previous)
+
+    def remove(self, text: Optional[str], kind: str, source: Hashable):
+        """Withdraw a source's contribution, dropping the entry when unused"""
+        if not text:
+            return
+
+        normalized = normalize(text)
+        entry = self._entries.get((normalized, kind))
+        if entry is None:
+            return
+
+        entry.withdraw(source)
+        if not entry.contributions:
+            del self._entries[(normalized, kind)]
+            for key in entry.keys:
+                position = bisect_left(self._keys, (key, normalized, kind))
+                if position < len(self._keys) and self._keys[position] == (key, normalized, kind):
+                    del self._keys[position]
+
+        self._changed(entry, dropped=True)
+
+    def _changed(self, entry: _Entry, dropped: bool):
+        """Update the prefix lists and cached lookups that can contain entry"""
+        removed = (entry.normalized, entry.kind) not in self._entries
+
+        for prefix in self._short_prefixes(entry.keys):
+            stale_key = (prefix, entry.kind)
+            if stale_key in self._stale:
+                continue
+            bucket = self._top.setdefault(prefix, {}).setdefault(entry.kind, [])
+            if entry in bucket:
+                if removed:
+                    bucket.remove(entry)
+                if dropped and len(bucket) >= TOP_K - removed:
+                    # Something outside the list may now outrank it
+                    self._stale.add(stale_key)
+                    continue
+            elif removed or (len(bucket) >= TOP_K and entry.rank <= bucket[-1].rank):
+                continue
+            else:
+                bucket.append(entry)
+            bucket.sort(key=_rank, reverse=True)
+            del bucket[TOP_K:]
+
+        for cache_key in [cache_key for cache_key in self._cache
+                          if any(key.startswith(cache_key[0]) for key in entry.keys)]:
+            del self._cache[cache_key]
+
+    def _matches(self, prefix: str, kinds: Optional[Iterable[str]] = None) -> Dict[tuple, _Entry]:
+        """Every entry with a word starting with prefix (a range scan)"""
+        matches = {}
+        position = bisect_left(self._keys, (prefix,))
+        while position < len(self._keys) and self._keys[position][0].startswith(prefix):
+            _, normalized, kind = self._keys[position]
+            if not kinds or kind in kinds:
+                matches[(normalized, kind)] = self._entries[(normalized, kind)]
+            position += 1
+        return matches
+
+    def _top_for(self, prefix: str, kind: str) -> List[_Entry]:
+        if (prefix, kind) in self._stale:
+            self._stale.discard((prefix, kind))
+            self._top.setdefault(prefix, {})[kind] = heapq.nlargest(
+                TOP_K, self._matches(prefix, (kind,)).values(), key=_rank)
+        return self._top.get(prefix, {}).get(kind, [])
+
+    def top_k(self, prefix: str, k: int = 8, kinds: Optional[List[str]] = None) -> List[dict]:
+        """Highest-weighted completions starting with prefix"""
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+
+        cache_key = (prefix, k, tuple(kinds) if kinds else None)
+        cached = self._cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        if len(prefix) <= PRECOMPUTED_PREFIX_LENGTH and k <= TOP_K:
+            candidates = [
+                entry
+                for kind in (kinds or self._top.get(prefix, {}))
+                for entry in self._top_for(prefix, kind)
+            ]
+        else:
+            candidates = self._matches(prefix, kinds).values()
+
+        best = heapq.nlargest(k, candidates, key=_rank)
+        results = [entry.as_dict() for entry in best]
+
+        if len(self._cache) >= self._cache_size:
+            self._cache.clear()
+        self._cache[cache_key] = results
+        return results
+
+
+class SuggestionService:
+    """Keeps the suggestion index in sync with the catalogue collections"""
+
+    def __init__(self):
+        self.index = SuggestionIndex()
+        self._fingerprints: Dict[str, tuple] = {}
+        self._indexed: Dict[str, Dict[str, dict]] = {}
+        self._lock = asyncio.Lock()
+        # Live updates made while a rebuild runs, replayed onto the new index
+        self._pending: Optional[List[tuple]] = None
+        self.built_at: Optional[datetime] = None
+
+    @staticmethod
+    def _sources():
+        return {
+            "products": (
+                products_repo.collection,
+                {"is_active": True},
+                products_repo.projection("suggest")
+            ),
+            "parking_lots": (
+                parking_lots_repo.collection,
+                {},
+                parking_lots_repo.projection("suggest")
+            ),
+            "service_centers": (
+                service_centers_repo.collection,
+                {},
+                service_centers_repo.projection("suggest")
+            )
+        }
+
+    @staticmethod
+    def _contributions(source: str, doc: dict):
+        """The (text, kind, weight) completions a document contributes"""
+        weight = popularity(doc)
+        if source == "products":
+            yield doc.get("name"), "product", weight
+            # Brands and categories rank by how many products carry them
+            yield doc.get("brand"), "brand", 1.0
+            yield doc.get("category"), "category", 1.0
+        elif source == "parking_lots":
+            yield doc.get("name"), "parking_lot", weight
+        else:
+            yield doc.get("name"), "service_center", weight
+
+    def _apply(self, index: SuggestionIndex, source: str, doc: dict, add: bool):
+        """Add or withdraw every completion a document contributes"""
+        for text, kind, weight in self._contributions(source, doc):
+            if add:
+                index.add(text, kind, doc["id"], weight)
+            else:
+                index.remove(text, kind, doc["id"])
+
+    def _update(self, index: SuggestionIndex, source: str,
+                previous: Optional[dict], doc: Optional[dict]):
+        if previous is not None:
+            self._apply(index, source, previous, add=False)
+        if doc is not None:
+            self._apply(index, source, doc, add=True)
+
+    def upsert(self, source: str, doc: dict):
+        """Incrementally index a created or updated document"""
+        indexed = self._indexed.setdefault(source, {})
+        previous = indexed.get(doc["id"])
+        indexed[doc["id"]] = doc
+        self._update(self.index, source, previous, doc)
+        if self._pending is not None:
+            self._pending.append((source, previous, doc))
+
+    def delete(self, source: str, doc_id: str):
+        """Incrementally drop a removed document"""
+        previous = self._indexed.get(source, {}).pop(doc_id, None)
+        if previous is not None:
+            self._update(self.index, source, previous, None)
+            if self._pending is not None:
+                self._pending.append((source, previous, None))
+
+    @classmethod
+    def _build(cls, snapshot: Dict[str, List[dict]]) -> SuggestionIndex:
+        return SuggestionIndex.build(
+            (text, kind, doc["id"], weight)
+            for source, docs in snapshot.items()
+            for doc in docs
+            for text, kind, weight in cls._contributions(source, doc)
+        )
+
+    async def refresh(self, force: bool = False):
+        """Rebuild the index when any source collection's fingerprint changed"""
+        async with self._lock:
+            changed = False
+            for source, (collection, query, projection) in self._sources().items():
+                fingerprint = await collection_fingerprint(collection)
+                if not force and self._fingerprints.get(source) == fingerprint:
+                    continue
+
+                docs = await collection.find(query, projection).to_list(length=None)
+                current = {}
+                for doc in docs:
+                    doc["id"] = str(doc.pop("_id"))
+                    current[doc["id"]] = doc
+                self._indexed[source] = current
+                self._fingerprints[source] = fingerprint
+                changed = True
+
+            if not changed:
+                return
+
+            # Build in a worker thread so lookups keep being served meanwhile
+            snapshot = {source: list(docs.values()) for source, docs in self._indexed.items()}
+            self._pending = []
+            try:
+                index = await asyncio.get_running_loop().run_in_executor(
+                    None, self._build, snapshot)
+                for source, previous, doc in self._pending:
+                    self._update(index, source, previous, doc)
+            finally:
+                self._pending = None
+
+            self.index = index
+            self.built_at = datetime.now()
+            logger.info(f"Suggestion index holds {len(self.index)} completions")
+
+    async def run_refresh_loop(self, interval_seconds: int):
+        """Periodically pick up catalogue changes"""
+        while True:
+            await asyncio.sleep(interval_seconds)
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.error(f"Failed to refresh suggestion index: {e}")
+
+    def suggest(self, prefix: str, limit: int = 8, kinds: Optional[List[str]] = None) -> List[dict]:
+        return self.index.top_k(prefix, limit, kinds)
+
+
+suggestion_service = SuggestionService()
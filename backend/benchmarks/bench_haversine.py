@@ -0,0 +1,66 @@
+"""
+Micro-benchmark: scalar Haversine loop vs the vectorized GeoPoints kernel
+
+Run from the backend directory:
+    python -m benchmarks.bench_haversine
+"""
+
+import random
+import timeit
+
+from app.core.geo import GeoPoints, calculate_distance
+
+ORIGIN = (28.6139, 77.2090)  # New Delhi
+RADIUS_KM = 10.0
+POINT_COUNTS = [1_000, 10_000, 100_000]
+
+
+def make_points(count: int):
+    """Random points scattered across roughly 100 km around the origin"""
+    rng = random.Random(42)
+    lats = [ORIGIN[0] + rng.uniform(-0.5, 0.5) for _ in range(count)]
+    lons = [ORIGIN[1] + rng.uniform(-0.5, 0.5) for _ in range(count)]
+    return lats, lons
+
+
+def scalar_loop(lats, lons):
+    """The per-document loop the nearby routes used to run"""
+    hits = []
+    for lat, lon in zip(lats, lons):
+        distance = calculate_distance(ORIGIN[0], ORIGIN[1], lat, lon)
+        if distance <= RADIUS_KM:
+            hits.append(distance)
+    return hits
+
+
+def best_of(func, repeat: int = 5) -> float:
+    """Best wall time of one call, in milliseconds"""
+    timer = timeit.Timer(func)
+    loops, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=loops)) / loops * 1000
+
+
+def main():
+    print(f"{'points':>8} {'scalar':>11} {'numpy':>11} {'numpy+bbox':>11} {'speedup':>8}")
+
+    for count in POINT_COUNTS:
+        lats, lons = make_points(count)
+        points = GeoPoints(lats, lons)
+
+        # Both kernels must agree on the result set
+        expected = len(scalar_loop(lats, lons))
+        assert len(points.within(*ORIGIN, RADIUS_KM)[0]) == expected
+
+        scalar_ms = best_of(lambda: scalar_loop(lats, lons))
+        numpy_ms = best_of(
+            lambda: points.within(*ORIGIN, RADIUS_KM, prefilter=False))
+        bbox_ms = best_of(lambda: points.within(*ORIGIN, RADIUS_KM))
+
+        print(
+            f"{count:>8} {scalar_ms:>9.3f}ms {numpy_ms:>9.3f}ms "
+            f"{bbox_ms:>9.3f}ms {scalar_ms / min(numpy_ms, bbox_ms):>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Micro-benchmark: rendering a 50-lot parking page, FastAPI's default
+response_model path vs the orjson envelope path
+
+Run from the backend directory:
+    python -m benchmarks.bench_response
+"""
+
+import asyncio
+import copy
+import json
+import random
+import timeit
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute, serialize_response
+
+from app.core.responses import FastJSONResponse, envelope_content
+from app.models.schemas import APIResponse
+
+PAGE_SIZE = 50
+FEATURES = ["CCTV", "Covered", "EV Charging", "Valet", "24x7", "Security Guard"]
+
+
+def make_lots(count: int):
+    """Parking lot documents shaped like the ones Mongo returns"""
+    rng = random.Random(42)
+    now = datetime.now()
+    return [
+        {
+            "_id": ObjectId(),
+            "name": f"Lot {index}",
+            "location": "Connaught Place",
+            "address": f"{index} Janpath, New Delhi",
+            "latitude": 28.6139 + rng.uniform(-0.1, 0.1),
+            "longitude": 77.2090 + rng.uniform(-0.1, 0.1),
+            "total_capacity": rng.randint(50, 500),
+            "available_spots": rng.randint(0, 50),
+            "price_per_hour": rng.choice([20.0, 30.0, 50.0]),
+            "features": rng.sample(FEATURES, 3),
+            "rating": round(rng.uniform(3, 5), 1),
+            "images": [f"https://cdn.gaadisetgo.com/lots/{index}/{n}.jpg" for n in range(3)],
+            "contact_info": {"phone": "+91-11-5550000", "manager": "Front desk"},
+            "created_at": now - timedelta(days=rng.randint(1, 900)),
+            "updated_at": now
+        }
+        for index in range(count)
+    ]
+
+
+async def list_lots(lots):
+    """What the list handler builds before returning"""
+    for lot in lots:
+        lot["id"] = str(lot["_id"])
+        lot.pop("_id", None)
+    return APIResponse(
+        message="Parking lots retrieved successfully",
+        data={"lots": lots, "pagination": {"current_page": 1, "items_per_page": PAGE_SIZE}}
+    )
+
+
+async def before(route: APIRoute, lots) -> bytes:
+    """Dump, re-validate and serialize through the response_model, then json.dumps"""
+    envelope = await list_lots(lots)
+    content = await serialize_response(
+        field=route.secure_cloned_response_field,
+        response_content=envelope,
+        is_coroutine=True
+    )
+    return JSONResponse(content).body
+
+
+async def after(lots) -> bytes:
+    """Envelope fields handed straight to orjson"""
+    envelope = await list_lots(lots)
+    return FastJSONResponse(envelope_content(envelope)).body
+
+
+def per_request_us(loop, make_call, repeat: int = 5) -> float:
+    """Best time of one request, in microseconds; each call gets fresh documents"""
+    def call():
+        loop.run_until_complete(make_call())
+    timer = timeit.Timer(call)
+    loops, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=loops)) / loops * 1_000_000
+
+
+def main():
+    lots = make_lots(PAGE_SIZE)
+    route = APIRoute("/parking/lots", list_lots, response_model=APIResponse)
+    loop = asyncio.new_event_loop()
+
+    # Both paths must agree on the rendered page (timestamps aside)
+    old = json.loads(loop.run_until_complete(before(route, copy.deepcopy(lots))))
+    new = json.loads(loop.run_until_complete(after(copy.deepcopy(lots))))
+    assert old["data"] == new["data"]
+
+    copy_us = per_request_us(loop, lambda: asyncio.sleep(0, copy.deepcopy(lots)))
+    before_us = per_request_us(loop, lambda: before(route, copy.deepcopy(lots))) - copy_us
+    after_us = per_request_us(loop, lambda: after(copy.deepcopy(lots))) - copy_us
+    size = len(loop.run_until_complete(after(copy.deepcopy(lots))))
+    loop.close()
+
+    print(f"{PAGE_SIZE} lots, {size} bytes per response")
+    print(f"{'response_model + json':>24} {before_us:>9.1f}us")
+    print(f"{'orjson envelope':>24} {after_us:>9.1f}us")
+    print(f"{'speedup':>24} {before_us / after_us:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
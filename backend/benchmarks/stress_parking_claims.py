@@ -0,0 +1,108 @@
+"""
+Concurrency stress test: hundreds of simultaneous booking claims on one hot
+parking lot must never push any slot past the lot's capacity.
+
+Needs a local mongod. Uses its own database, which is dropped at the end.
+Run from the backend directory:
+    python -m benchmarks.stress_parking_claims [--attempts 500] [--capacity 20]
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+# Point the app at a throwaway database before settings are loaded; an
+# exported DATABASE_NAME or .env value must never be used, as it is dropped
+STRESS_DATABASE = "gaadisetgo_stress"
+os.environ["DATABASE_NAME"] = STRESS_DATABASE
+
+from bson import ObjectId  # noqa: E402
+
+from app.database import connection  # noqa: E402
+from app.services.occupancy import (  # noqa: E402
+    SLOT,
+    LotFullError,
+    claim_slots,
+    slot_floor,
+    slot_starts
+)
+
+
+def random_window(origin: datetime, rng: random.Random):
+    """A 15 minute to 3 hour booking starting within the next 4 hours"""
+    start = origin + timedelta(minutes=rng.randrange(0, 240, 5))
+    return start, start + timedelta(minutes=rng.randrange(15, 180, 5))
+
+
+async def attempt(lot_id, start, end, capacity):
+    try:
+        await claim_slots(lot_id, start, end, capacity)
+        return start, end
+    except LotFullError:
+        return None
+
+
+async def run(attempts: int, capacity: int, seed: int) -> bool:
+    await connection.init_db()
+    database = connection.database
+    try:
+        lot_id = ObjectId()
+        rng = random.Random(seed)
+        origin = slot_floor(datetime.now()) + SLOT
+        windows = [random_window(origin, rng) for _ in range(attempts)]
+
+        started = time.perf_counter()
+        results = await asyncio.gather(*[
+            attempt(lot_id, start, end, capacity) for start, end in windows
+        ])
+        elapsed = time.perf_counter() - started
+        granted = [window for window in results if window]
+
+        # Expected counters, recomputed from the claims that succeeded
+        expected = {}
+        for start, end in granted:
+            for slot in slot_starts(start, end):
+                expected[slot] = expected.get(slot, 0) + 1
+
+        stored = {
+            doc["slot_start"]: doc["count"]
+            async for doc in database.parking_occupancy.find({"lot_id": lot_id})
+        }
+        stored = {slot: count for slot, count in stored.items() if count}
+
+        overbooked = {slot: count for slot, count in stored.items()
+                      if count > capacity}
+        consistent = stored == expected
+
+        print(f"{attempts} concurrent claims, capacity {capacity}: "
+              f"{len(granted)} granted, {attempts - len(granted)} rejected "
+              f"in {elapsed:.2f}s ({attempts / elapsed:.0f} claims/s)")
+        print(f"Peak slot occupancy: {max(stored.values(), default=0)}")
+        print(f"Overbooked slots: {len(overbooked)}")
+        print(f"Counters match granted claims: {consistent}")
+        return not overbooked and consistent
+    finally:
+        if database.name == STRESS_DATABASE:
+            await connection.client.drop_database(database.name)
+        else:
+            print(f"Not dropping {database.name}: only {STRESS_DATABASE} is ever dropped")
+        await connection.close_db()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Race concurrent parking claims against one lot")
+    parser.add_argument("--attempts", type=int, default=500)
+    parser.add_argument("--capacity", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    ok = asyncio.run(run(args.attempts, args.capacity, args.seed))
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
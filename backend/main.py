@@ -8,6 +8,7 @@ import uvicorn
 from datetime import datetime, timedelta
 from typing import Optional, List
 import os
+import asyncio
 from contextlib import asynccontextmanager
 
 # Import all route modules
@@ -21,12 +22,23 @@ from app.routes import (
     user_routes,  # Now has profile endpoint
     fastag_routes,
     challan_routes,
-    notification_routes
+    notification_routes,
+    search_routes,
+    dashboard_routes
 )
 
 # Import database and authentication
 from app.database.connection import init_db, close_db
 from app.core.config import get_settings
+from app.core.responses import FastJSONResponse
+from app.services.service_center_index import service_center_index
+from app.services.suggest import suggestion_service
+from app.services.appointment_scheduler import ensure_schedule_built
+from app.services.occupancy import ensure_counters_built
+from app.services.occupancy_feed import occupancy_feed
+from app.services.booking_sweeper import create_scheduler, sweeper_stats
+from app.core.user_cache import user_cache_stats
+from app.core.auth import password_hash_stats
 
 settings = get_settings()
 
@@ -37,11 +49,39 @@ async def lifespan(app: FastAPI):
     # Startup
     await init_db()
     print("🚀 Database initialized successfully")
+
+    await service_center_index.refresh(force=True)
+    index_refresh_task = asyncio.create_task(
+        service_center_index.run_refresh_loop(
+            settings.SERVICE_CENTER_INDEX_REFRESH_SECONDS)
+    )
+    print(f"📍 Service center index ready ({service_center_index.size} centers)")
+
+    await suggestion_service.refresh(force=True)
+    suggest_refresh_task = asyncio.create_task(
+        suggestion_service.run_refresh_loop(
+            settings.SUGGEST_INDEX_REFRESH_SECONDS)
+    )
+    print(f"⚡ Suggestion index ready ({len(suggestion_service.index)} completions)")
+
+    if await ensure_counters_built():
+        print("🅿️ Parking occupancy counters seeded from bookings")
+    if await ensure_schedule_built():
+        print("🔧 Service bay schedules seeded from appointments")
+
+    occupancy_feed_task = asyncio.create_task(occupancy_feed.run())
+
+    scheduler = create_scheduler()
+    scheduler.start()
     print("🚗 GaadiSetGo API Server is ready!")
 
     yield
 
     # Shutdown
+    index_refresh_task.cancel()
+    suggest_refresh_task.cancel()
+    occupancy_feed_task.cancel()
+    scheduler.shutdown(wait=False)
     await close_db()
     print("📴 Database connection closed")
 
@@ -58,6 +98,7 @@ app = FastAPI(
         "email": "support@gaadisetgo.com",
         "url": "https://gaadisetgo.com"
     },
+    default_response_class=FastJSONResponse,
     lifespan=lifespan
 )
 
@@ -69,6 +110,7 @@ app.add_middleware(
     allow_methods=["GET", "POST", "PUT", "DELETE", "PATCH",
                    "OPTIONS"],  # these are restful api methods
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 
@@ -129,7 +171,12 @@ async def health_check():
         "uptime": "Available",
         "database": "Connected",
         "version": "1.0.0",
-        "environment": settings.ENVIRONMENT
+        "environment": settings.ENVIRONMENT,
+        "caches": {
+            "users": user_cache_stats()
+        },
+        "password_hashing": password_hash_stats(),
+        "booking_sweeper": sweeper_stats()
     }
 
 # Include all route modules
@@ -153,6 +200,10 @@ app.include_router(challan_routes.router,
                    prefix="/api/v1/challans", tags=["📋 Challan Management"])
 app.include_router(notification_routes.router,
                    prefix="/api/v1/notifications", tags=["🔔 Notifications"])
+app.include_router(search_routes.router,
+                   prefix="/api/v1/search", tags=["🔎 Search"])
+app.include_router(dashboard_routes.router,
+                   prefix="/api/v1/dashboard", tags=["📊 Dashboard"])
 
 # Global exception handler
 